@@ -24,10 +24,14 @@ from ..schemas.task import (
     TaskResponse,
     TaskListResponse,
 )
-from ..core.crawler import Crawl4AIWrapper
+from ..core.browser_pool import BrowserPool, get_browser_pool
+from ..core.crawler import batch_timeout_result
 
 router = APIRouter(prefix="/api/crawl", tags=["爬取"])
 
+# 批量爬取时每保存多少条结果提交一次
+BATCH_COMMIT_SIZE = 20
+
 
 # ==================== 辅助函数 ====================
 
@@ -74,6 +78,7 @@ async def create_crawl_task(
     request: CrawlRequest,
     background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
+    pool: BrowserPool = Depends(get_browser_pool),
 ):
     """
     创建爬取任务
@@ -90,7 +95,7 @@ async def create_crawl_task(
                 raise HTTPException(status_code=404, detail="模板不存在")
 
         # 执行爬取（艹，暂时同步执行，后续改异步）
-        async with Crawl4AIWrapper() as crawler:
+        async with pool.acquire() as crawler:
             crawl_result = await crawler.crawl(request.url, request.config or {})
 
         # 保存到数据库
@@ -123,6 +128,7 @@ async def create_crawl_task(
 async def create_batch_crawl(
     request: BatchCrawlRequest,
     db: AsyncSession = Depends(get_db),
+    pool: BrowserPool = Depends(get_browser_pool),
 ):
     """
     批量爬取
@@ -141,35 +147,53 @@ async def create_batch_crawl(
             if not template:
                 raise HTTPException(status_code=404, detail="模板不存在")
 
-        # 批量爬取
-        async with Crawl4AIWrapper() as crawler:
-            results = await crawler.crawl_batch(
-                request.urls,
-                request.config or {},
-                request.max_concurrent,
-            )
-
-        # 保存结果
-        task_ids = []
+        # 流式批量爬取：完成一个保存一个，不用等最慢的URL
+        task_ids: list[int | None] = [None] * len(request.urls)
         completed = 0
         failed = 0
 
-        for i, result in enumerate(results):
-            task = Task(
-                url=request.urls[i],
-                template_id=request.template_id,
-                status=Task.Status.COMPLETED if result["success"] else Task.Status.FAILED,
-                config=request.config,
-                result=result if result["success"] else None,
-                error_message=result.get("error") if not result["success"] else None,
-            )
-            db.add(task)
-            await db.flush()  # 获取ID但不提交
-            task_ids.append(task.id)
-
-            if result["success"]:
-                completed += 1
-            else:
+        async with pool.acquire() as crawler:
+            async for i, result in crawler.crawl_batch_stream(
+                request.urls,
+                request.config or {},
+                request.max_concurrent,
+                adaptive=request.adaptive,
+                deadline=request.deadline,
+            ):
+                task = Task(
+                    url=request.urls[i],
+                    template_id=request.template_id,
+                    status=Task.Status.COMPLETED if result["success"] else Task.Status.FAILED,
+                    config=request.config,
+                    result=result if result["success"] else None,
+                    error_message=result.get("error") if not result["success"] else None,
+                )
+                db.add(task)
+                await db.flush()  # 获取ID
+                task_ids[i] = task.id
+
+                if result["success"]:
+                    completed += 1
+                else:
+                    failed += 1
+
+                # 艹，定期提交，别让结果全堆在会话里
+                if (completed + failed) % BATCH_COMMIT_SIZE == 0:
+                    await db.commit()
+
+        # 截止时间到了还没开始的URL也要留一条失败记录
+        for i, task_id in enumerate(task_ids):
+            if task_id is None:
+                task = Task(
+                    url=request.urls[i],
+                    template_id=request.template_id,
+                    status=Task.Status.FAILED,
+                    config=request.config,
+                    error_message=batch_timeout_result(started=False)["error"],
+                )
+                db.add(task)
+                await db.flush()
+                task_ids[i] = task.id
                 failed += 1
 
         await db.commit()
@@ -188,6 +212,58 @@ async def create_batch_crawl(
         raise HTTPException(status_code=500, detail=f"批量爬取失败: {str(e)}")
 
 
+@router.post("/deep", response_model=CrawlResponse)
+async def create_deep_crawl(
+    request: DeepCrawlRequest,
+    db: AsyncSession = Depends(get_db),
+    pool: BrowserPool = Depends(get_browser_pool),
+):
+    """
+    深度爬取
+    Deep crawl
+
+    艹，从起始URL按策略爬整个站点，所有页面的结果存成一个任务！
+    """
+    try:
+        async with pool.acquire() as crawler:
+            crawl_result = await crawler.deep_crawl(
+                request.url,
+                strategy=request.strategy,
+                max_pages=request.max_pages,
+                max_depth=request.max_depth,
+                config=request.config or {},
+                max_concurrent=request.max_concurrent,
+                keywords=request.keywords,
+            )
+
+        task = Task(
+            url=request.url,
+            status=Task.Status.COMPLETED if crawl_result["success"] else Task.Status.FAILED,
+            config=request.model_dump(exclude={"url"}),
+            result=crawl_result if crawl_result["success"] else None,
+            error_message=crawl_result.get("error") if not crawl_result["success"] else None,
+        )
+        db.add(task)
+        await db.commit()
+        await db.refresh(task)
+
+        return CrawlResponse(
+            success=crawl_result["success"],
+            task_id=task.id,
+            result=crawl_result if crawl_result["success"] else None,
+            error=crawl_result.get("error") if not crawl_result["success"] else None,
+        )
+
+    except ValueError as e:
+        # 未知的爬取策略之类的参数错误
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"深度爬取失败: {str(e)}")
+
+
 @router.get("/tasks", response_model=TaskListResponse)
 async def list_tasks(
     status: str | None = None,
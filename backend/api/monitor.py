@@ -14,6 +14,7 @@ from ..models.database import get_db
 from ..models.task import Task
 from ..models.template import Template
 from ..schemas.common import StatsResponse, HealthResponse
+from ..core.browser_pool import BrowserPool, get_browser_pool
 
 router = APIRouter(prefix="/api/monitor", tags=["监控"])
 
@@ -31,6 +32,17 @@ async def health_check():
     )
 
 
+@router.get("/browser-pool")
+async def get_browser_pool_stats(
+    pool: BrowserPool = Depends(get_browser_pool),
+):
+    """
+    获取浏览器池和标签页池计数
+    Get browser pool and page pool counters
+    """
+    return pool.stats()
+
+
 @router.get("/stats", response_model=StatsResponse)
 async def get_system_stats(
     db: AsyncSession = Depends(get_db),
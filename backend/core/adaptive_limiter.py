@@ -0,0 +1,249 @@
+"""
+自适应并发控制
+Adaptive Concurrency Control
+
+这个SB模块用AIMD（加性增、乘性减）按域名和全局两级自动调节并发上限
+This module tunes per-host and global concurrency limits with AIMD
+(additive increase, multiplicative decrease)
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from .page_pool import is_crash_error
+from .politeness import get_host
+
+
+# 这些状态码说明服务器扛不住了，必须退让
+OVERLOAD_STATUS_CODES = frozenset({429, 503})
+
+# 错误信息里出现这些关键字也算过载（超时、浏览器内存不够）
+OVERLOAD_MARKERS = ("timeout", "timed out", "超时", "out of memory")
+
+
+def classify_result(result: dict[str, Any], memory_pressure: bool = False) -> str:
+    """
+    把爬取结果归类为限流器的反馈信号
+    Classify a crawl result as limiter feedback
+
+    Args:
+        result: 爬取结果字典
+        memory_pressure: 本次爬取期间是否有标签页因内存超限被回收
+
+    Returns:
+        str: ok / overload / error
+    """
+    if memory_pressure or result.get("status_code") in OVERLOAD_STATUS_CODES:
+        return "overload"
+    if result.get("success"):
+        return "ok"
+    error = (result.get("error") or "").lower()
+    if is_crash_error(error) or any(marker in error for marker in OVERLOAD_MARKERS):
+        return "overload"
+    return "error"
+
+
+class _Window:
+    """一个并发窗口（全局或单个域名）"""
+
+    __slots__ = ("limit", "active", "min_limit", "max_limit", "latency", "last_decrease")
+
+    def __init__(self, limit: float, min_limit: int, max_limit: int):
+        self.limit = float(limit)
+        self.active = 0
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        # 健康请求的延迟EWMA（秒），按抓取方式分开：HTTP快速通道和浏览器差一个数量级
+        self.latency: dict[str, float] = {}
+        self.last_decrease = 0.0
+
+    def has_room(self) -> bool:
+        return self.active < max(self.min_limit, int(self.limit))
+
+
+class Permit:
+    """
+    借出的并发许可，调用方在退出前把outcome设成classify_result的结果，
+    mode设成实际的抓取方式（http/browser，延迟基线按它分开算）
+    Borrowed permit; set outcome to the classify_result verdict and mode to
+    the fetch route actually taken before exit
+    """
+
+    __slots__ = ("outcome", "mode")
+
+    def __init__(self):
+        self.outcome: Optional[str] = "ok"
+        self.mode = ""
+
+
+class AdaptiveLimiter:
+    """
+    AIMD自适应限流器
+    AIMD adaptive limiter
+
+    艹，max_concurrent靠用户瞎猜不靠谱！健康时每轮并发+1，超时/429/内存吃紧时并发减半，
+    域名窗口和全局窗口同时生效，取两者里更紧的那个。
+    延迟变慢只说明这个域名在排队，只减域名窗口，不连累别的域名。
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        max_limit: int = 32,
+        host_initial_limit: int = 2,
+        host_max_limit: int = 8,
+        min_limit: int = 1,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        cooldown: float = 1.0,
+        max_hosts: int = 10_000,
+    ):
+        """
+        初始化限流器
+
+        Args:
+            initial_limit: 全局初始并发
+            max_limit: 全局并发上限
+            host_initial_limit: 单域名初始并发
+            host_max_limit: 单域名并发上限
+            min_limit: 任何窗口的最小并发
+            backoff: 过载时的乘性减系数
+            latency_tolerance: 延迟超过健康基线多少倍算过载
+            cooldown: 两次减窗之间的最短间隔（秒），一波失败只减一次
+            max_hosts: 最多记住多少个域名的窗口
+        """
+        if not 0 < backoff < 1:
+            raise ValueError("艹，backoff必须在0和1之间")
+
+        self.host_initial_limit = host_initial_limit
+        self.host_max_limit = host_max_limit
+        self.min_limit = min_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.max_hosts = max_hosts
+
+        self._global = _Window(initial_limit, min_limit, max_limit)
+        self._hosts: OrderedDict[str, _Window] = OrderedDict()
+        self._condition = asyncio.Condition()
+        self._stats = {"ok": 0, "overload": 0, "error": 0, "increases": 0, "decreases": 0}
+
+    def _host_window(self, host: str) -> _Window:
+        window = self._hosts.get(host)
+        if window is None:
+            window = self._hosts[host] = _Window(
+                self.host_initial_limit, self.min_limit, self.host_max_limit
+            )
+            # 学到的窗口要记住，但别无限增长：淘汰最久没用的空闲域名
+            if len(self._hosts) > self.max_hosts:
+                for old_host, old in self._hosts.items():
+                    if old.active == 0 and old_host != host:
+                        del self._hosts[old_host]
+                        break
+        else:
+            self._hosts.move_to_end(host)
+        return window
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[Permit]:
+        """
+        等到域名窗口和全局窗口都有空位，占用一个许可
+        Wait until both the host and global windows have room, then hold a permit
+
+        使用方式:
+            async with limiter.slot(url) as permit:
+                result = await fetch(url)
+                permit.outcome = classify_result(result)
+
+        Yields:
+            Permit: 许可，退出时按outcome和耗时调整窗口（异常按error处理）
+        """
+        host = get_host(url)
+        async with self._condition:
+            window = self._host_window(host)
+            await self._condition.wait_for(
+                lambda: window.has_room() and self._global.has_room()
+            )
+            window.active += 1
+            self._global.active += 1
+
+        permit = Permit()
+        started = time.monotonic()
+        try:
+            yield permit
+        except asyncio.CancelledError:
+            # 被取消说明不了服务器的状况，不反馈
+            permit.outcome = None
+            raise
+        except asyncio.TimeoutError:
+            permit.outcome = "overload"
+            raise
+        except BaseException:
+            permit.outcome = "error"
+            raise
+        finally:
+            latency = time.monotonic() - started
+            async with self._condition:
+                window.active -= 1
+                self._global.active -= 1
+                self._feedback(window, permit.outcome, latency, permit.mode)
+                self._condition.notify_all()
+
+    def _feedback(
+        self,
+        window: _Window,
+        outcome: Optional[str],
+        latency: float,
+        mode: str = "",
+    ) -> None:
+        """按一次请求的结果调整域名窗口和全局窗口"""
+        if outcome is None:
+            return
+
+        # 要减哪些窗口：真正的过载信号（429/503、超时、崩溃、内存回收）两级都减
+        shrink: tuple[_Window, ...] = (window, self._global)
+        if outcome == "ok":
+            baseline = window.latency.get(mode)
+            # 基线也跟着慢慢走，站点本身变慢时不会一直减窗
+            window.latency[mode] = latency if baseline is None else 0.8 * baseline + 0.2 * latency
+            # 延迟明显超过这个域名这种抓取方式的健康基线，说明在排队，只减域名窗口
+            if baseline is not None and latency > baseline * self.latency_tolerance:
+                outcome = "overload"
+                shrink = (window,)
+
+        self._stats[outcome] += 1
+        if outcome == "ok":
+            for w in (window, self._global):
+                # 加性增：每个完整窗口的成功请求让并发+1
+                if w.limit < w.max_limit:
+                    w.limit = min(w.max_limit, w.limit + 1.0 / w.limit)
+            self._stats["increases"] += 1
+        elif outcome == "overload":
+            now = time.monotonic()
+            for w in shrink:
+                if now - w.last_decrease >= self.cooldown:
+                    w.limit = max(float(w.min_limit), w.limit * self.backoff)
+                    w.last_decrease = now
+                    self._stats["decreases"] += 1
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取当前窗口和反馈统计
+        Get current windows and feedback statistics
+
+        Returns:
+            dict: 全局窗口、各活跃域名窗口和计数
+        """
+        return {
+            **self._stats,
+            "global_limit": round(self._global.limit, 2),
+            "global_active": self._global.active,
+            "hosts": {
+                host: {"limit": round(w.limit, 2), "active": w.active}
+                for host, w in self._hosts.items()
+                if w.active
+            },
+        }
@@ -0,0 +1,205 @@
+"""
+域名黑名单
+Domain Blocklist
+
+这个SB模块把EasyList/hosts格式的统计广告域名列表编译成后缀树，请求拦截时按域名快速匹配
+This module compiles EasyList/hosts style tracker and ad host lists into a suffix trie
+so the request interception can match hosts quickly
+"""
+
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+
+# 默认黑名单文件（可以用环境变量BLOCKLIST_PATH指定，多个文件用系统路径分隔符隔开）
+DEFAULT_BLOCKLIST_PATH = Path(__file__).parent.parent.parent / "data" / "blocklists" / "hosts.txt"
+
+# 后缀树里标记"到这里为止是一条规则"的键（不可能是合法的域名label）
+_END = "$"
+
+_HOST_RE = re.compile(r"^[a-z0-9_-]+(\.[a-z0-9_-]+)+$")
+# EasyList里纯域名规则：||example.com^ 或 ||example.com^$third-party
+_EASYLIST_RE = re.compile(r"^(@@)?\|\|([a-z0-9._-]+)\^(\$[a-z0-9,~_-]*)?$")
+_HOSTS_IPS = {"0.0.0.0", "127.0.0.1", "::", "::1"}
+_HOSTS_SKIP = {"localhost", "localhost.localdomain", "local", "broadcasthost", "0.0.0.0"}
+
+
+def _parse_line(line: str) -> tuple[Optional[str], bool]:
+    """
+    解析一行规则
+
+    Returns:
+        tuple: (域名, 是否是例外规则)，不是域名规则时域名为None
+    """
+    line = line.strip().lower()
+    if not line or line[0] in "!#[":
+        return None, False
+
+    if line.startswith("||") or line.startswith("@@||"):
+        match = _EASYLIST_RE.match(line)
+        if match is None:
+            # 带路径或复杂选项的规则不是纯域名规则，后缀树处理不了，跳过
+            return None, False
+        return match.group(2).strip("."), bool(match.group(1))
+
+    parts = line.split("#", 1)[0].split()
+    if len(parts) >= 2 and parts[0] in _HOSTS_IPS:
+        host = parts[1]
+    elif len(parts) == 1:
+        host = parts[0]
+    else:
+        return None, False
+
+    if host in _HOSTS_SKIP or not _HOST_RE.match(host):
+        return None, False
+    return host, False
+
+
+def _count_rules(node: dict) -> int:
+    """数一个子树里的规则条数"""
+    count = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        for key, child in current.items():
+            if key == _END:
+                count += 1
+            else:
+                stack.append(child)
+    return count
+
+
+class DomainBlocklist:
+    """
+    域名后缀树
+    Domain suffix trie
+
+    艹，几万条规则挨个比对太慢！域名按label倒过来插进字典树，
+    匹配时从顶级域往下走，最多走label个数那么多步，跟规则数量无关。
+    规则example.com会同时命中example.com和它的所有子域名。
+    """
+
+    def __init__(self, hosts: Iterable[str] = ()):
+        self._root: dict = {}
+        self._allow: dict = {}
+        self.size = 0
+        for host in hosts:
+            self.add(host)
+
+    @staticmethod
+    def _insert(root: dict, host: str) -> Optional[int]:
+        """
+        插入一条规则
+
+        Returns:
+            int: 被这条规则覆盖掉的子域名规则数；规则多余（已被覆盖）时返回None
+        """
+        node = root
+        for label in reversed(host.split(".")):
+            if _END in node:
+                # 父域名已经在列表里了，子域名规则是多余的
+                return None
+            node = node.setdefault(label, {})
+        if _END in node:
+            return None
+        removed = _count_rules(node)
+        node.clear()  # 子域名规则都被这条覆盖了
+        node[_END] = True
+        return removed
+
+    @staticmethod
+    def _lookup(root: dict, host: str) -> bool:
+        node = root
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if _END in node:
+                return True
+        return False
+
+    def add(self, host: str, exception: bool = False) -> None:
+        """
+        添加一条域名规则
+        Add a host rule
+
+        Args:
+            host: 域名（命中它和它的子域名）
+            exception: 是否是例外规则（EasyList的@@，优先于拦截规则）
+        """
+        host = host.strip(".").lower()
+        if not host:
+            return
+        removed = self._insert(self._allow if exception else self._root, host)
+        if removed is not None and not exception:
+            self.size += 1 - removed
+
+    def load(self, path: Path | str) -> int:
+        """
+        从EasyList或hosts格式的文件加载规则
+        Load rules from an EasyList or hosts file
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            int: 规则数的净变化（父域名规则会合并掉已有的子域名规则）
+        """
+        before = self.size
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                host, exception = _parse_line(line)
+                if host:
+                    self.add(host, exception)
+        return self.size - before
+
+    def match_host(self, host: str) -> bool:
+        """域名（或它的父域名）是否在黑名单里"""
+        if not host or not self._root:
+            return False
+        host = host.lower()
+        return self._lookup(self._root, host) and not self._lookup(self._allow, host)
+
+    def match_url(self, url: str) -> bool:
+        """URL的域名是否在黑名单里"""
+        if not self._root:
+            return False
+        try:
+            host = urlsplit(url).hostname
+        except ValueError:
+            return False
+        return self.match_host(host or "")
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+
+@lru_cache(maxsize=1)
+def default_blocklist() -> DomainBlocklist:
+    """
+    加载默认黑名单（进程内只加载一次）
+    Load the default blocklist (once per process)
+
+    读取环境变量BLOCKLIST_PATH指定的文件，没设置就读data/blocklists/hosts.txt，都没有返回空列表。
+    艹，读文件是同步I/O，BrowserPool.start()会在线程池里先加载好，别让第一次请求拦截卡事件循环
+
+    Returns:
+        DomainBlocklist: 黑名单
+    """
+    blocklist = DomainBlocklist()
+    env_paths = os.getenv("BLOCKLIST_PATH")
+    paths = env_paths.split(os.pathsep) if env_paths else [DEFAULT_BLOCKLIST_PATH]
+    for path in paths:
+        if path and Path(path).is_file():
+            try:
+                blocklist.load(path)
+            except OSError as e:
+                print(f"艹，加载黑名单失败 {path}: {str(e)}")
+    return blocklist
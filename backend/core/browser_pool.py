@@ -0,0 +1,364 @@
+"""
+浏览器池
+Browser Pool
+
+这个SB模块维护一组常驻的AsyncWebCrawler，由FastAPI的lifespan负责启动和关闭
+This module keeps a set of long-lived AsyncWebCrawler instances owned by the FastAPI lifespan
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig
+
+from .blocklist import default_blocklist
+from .crawler import Crawl4AIWrapper
+from .page_pool import PagePool
+from .http_fetcher import HttpFetcher
+from .revalidation import ValidatorStore
+from .result_cache import ResultCache
+from .single_flight import SingleFlight
+from .adaptive_limiter import AdaptiveLimiter
+from .retry import CircuitBreaker, RetryPolicy
+from .extract_pool import ExtractionPool, default_workers
+from .politeness import HostScheduler
+
+
+# 默认池大小（艹，每个浏览器都吃几百MB内存，别开太大）
+DEFAULT_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+
+# 每个浏览器最多同时开几个标签页
+DEFAULT_TABS_PER_BROWSER = int(os.getenv("BROWSER_POOL_TABS", "4"))
+
+# 关闭时等待借出的浏览器归还的最长时间（秒）
+DEFAULT_DRAIN_TIMEOUT = float(os.getenv("BROWSER_POOL_DRAIN_TIMEOUT", "30"))
+
+# 默认抓取模式（auto：静态页面走HTTP快速通道，需要JS的才用浏览器）
+DEFAULT_FETCH_MODE = os.getenv("CRAWL_FETCH_MODE", "auto")
+
+# 单次抓取超时（秒），超时的抓取被取消、标签页关掉换新的
+PAGE_TIMEOUT = float(os.getenv("CRAWL_PAGE_TIMEOUT", "60"))
+
+# 模板字段提取的进程数，0表示不用进程池（在事件循环里提取）
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(default_workers())))
+
+# 结果缓存配置
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "True").lower() in ("1", "true", "yes")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+CACHE_MEMORY_MB = int(os.getenv("RESULT_CACHE_MEMORY_MB", "64"))
+CACHE_DISK_MB = int(os.getenv("RESULT_CACHE_DISK_MB", "512"))
+CACHE_PATH = Path(__file__).parent.parent.parent / "data" / "cache" / "results.db"
+
+# 域名熔断：连续失败多少次后熔断，熔断多少秒
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN", "60"))
+
+
+class BrowserPool:
+    """
+    浏览器池
+    Browser Pool
+
+    艹，启动浏览器要好几秒，请求只管借用已经跑起来的，用完还回来！
+
+    浏览器是共享借出的：每次借给当前借出数最少的那个，不用排队等别人还。
+    一个浏览器里真正的并发由它的标签页池（tabs_per_browser）卡住，
+    独占借出的话BROWSER_POOL_SIZE=2时一个长批量就能把其他请求全堵死。
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_POOL_SIZE,
+        headless: bool = True,
+        browser_type: str = "chromium",
+        verbose: bool = False,
+        fetch_mode: str = DEFAULT_FETCH_MODE,
+        tabs_per_browser: int = DEFAULT_TABS_PER_BROWSER,
+    ):
+        """
+        初始化浏览器池
+
+        Args:
+            size: 池中浏览器数量
+            headless: 是否无头模式
+            browser_type: 浏览器类型（chromium/firefox/webkit）
+            verbose: 是否输出详细日志
+            fetch_mode: 借出的封装器默认抓取模式（browser/http/auto）
+            tabs_per_browser: 每个浏览器的标签页池大小
+        """
+        if size < 1:
+            raise ValueError("艹，浏览器池大小至少为1")
+        if tabs_per_browser < 1:
+            raise ValueError("艹，每个浏览器至少要有1个标签页")
+
+        self.size = size
+        self.headless = headless
+        self.browser_type = browser_type
+        self.verbose = verbose
+        self.fetch_mode = fetch_mode
+        self.tabs_per_browser = tabs_per_browser
+
+        self._browser_config = BrowserConfig(
+            headless=headless,
+            browser_type=browser_type,
+            verbose=verbose,
+        )
+        self._crawlers: list[AsyncWebCrawler] = []
+        # 每个浏览器当前借出了几次
+        self._leases: dict[int, int] = {}
+        # 每个浏览器各有一个标签页池，跨请求复用标签页
+        self._page_pools: dict[int, PagePool] = {}
+        # 所有浏览器共享一个域名调度器，礼貌限制才是全局的
+        self.scheduler = HostScheduler()
+        # HTTP快速通道的连接池和域名学习结果也是全局共享的
+        self.http_fetcher: Optional[HttpFetcher] = None
+        # 条件重验证的记录跨请求共享，监控任务重爬时才能命中
+        self.validator_store = ValidatorStore()
+        self.result_cache: Optional[ResultCache] = None
+        self.extract_pool: Optional[ExtractionPool] = None
+        # 同一时刻相同的爬取跨所有浏览器合并成一次
+        self.single_flight = SingleFlight()
+        # 自适应并发窗口也是全局的，多个批量请求一起抢同一个站点时才退让得对
+        self.limiter = AdaptiveLimiter()
+        # 熔断状态必须全局共享，不然每个请求都要自己撞一遍死站
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+            cooldown=CIRCUIT_COOLDOWN,
+        )
+        self._in_use = 0
+        self._all_returned = asyncio.Event()
+        self._all_returned.set()
+        self._started = False
+        self._closing = False
+
+    async def start(self) -> None:
+        """
+        启动并预热所有浏览器
+        Launch and warm up all browsers
+        """
+        if self._started:
+            return
+
+        # 并行启动，启动时间只付一次
+        crawlers = [AsyncWebCrawler(config=self._browser_config) for _ in range(self.size)]
+        launched = await asyncio.gather(
+            *(c.__aenter__() for c in crawlers), return_exceptions=True
+        )
+        errors = [e for e in launched if isinstance(e, BaseException)]
+        if errors:
+            # 艹，有一个没起来就全部关掉，别留几个没人管的浏览器进程
+            for crawler, outcome in zip(crawlers, launched):
+                if not isinstance(outcome, BaseException):
+                    try:
+                        await crawler.__aexit__(None, None, None)
+                    except Exception as e:
+                        print(f"艹，关闭浏览器失败: {str(e)}")
+            raise errors[0]
+
+        # 域名黑名单是同步读文件，在线程池里先加载好，请求拦截时直接用缓存的
+        await asyncio.to_thread(default_blocklist)
+
+        self.http_fetcher = HttpFetcher()
+        if CACHE_ENABLED:
+            self.result_cache = ResultCache(
+                default_ttl=CACHE_TTL,
+                max_memory_bytes=CACHE_MEMORY_MB * 1024 * 1024,
+                disk_path=CACHE_PATH,
+                max_disk_bytes=CACHE_DISK_MB * 1024 * 1024,
+            )
+        if EXTRACT_WORKERS > 0:
+            # 子进程第一次提取时才启动，不拖慢启动
+            self.extract_pool = ExtractionPool(max_workers=EXTRACT_WORKERS)
+
+        for crawler in crawlers:
+            self._crawlers.append(crawler)
+            self._page_pools[id(crawler)] = PagePool(crawler, max_pages=self.tabs_per_browser)
+            self._leases[id(crawler)] = 0
+
+        self._started = True
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Crawl4AIWrapper]:
+        """
+        借用一个浏览器（借出数最少的那个，不等待）
+        Borrow the least-loaded browser from the pool
+
+        使用方式:
+            async with pool.acquire() as crawler:
+                result = await crawler.crawl(url)
+
+        Yields:
+            Crawl4AIWrapper: 绑定到借来浏览器的封装器
+        """
+        if not self._started:
+            raise RuntimeError("艹，浏览器池未启动！先调用 start()")
+        if self._closing:
+            raise RuntimeError("艹，浏览器池正在关闭，不再接受新请求")
+
+        crawler = min(self._crawlers, key=lambda c: self._leases[id(c)])
+        self._leases[id(crawler)] += 1
+        self._in_use += 1
+        self._all_returned.clear()
+
+        try:
+            async with Crawl4AIWrapper(
+                verbose=self.verbose,
+                crawler=crawler,
+                page_pool=self._page_pools[id(crawler)],
+                scheduler=self.scheduler,
+                fetch_mode=self.fetch_mode,
+                http_fetcher=self.http_fetcher,
+                validator_store=self.validator_store,
+                result_cache=self.result_cache,
+                single_flight=self.single_flight,
+                limiter=self.limiter,
+                retry_policy=self.retry_policy,
+                circuit_breaker=self.circuit_breaker,
+                page_timeout=PAGE_TIMEOUT,
+                extract_pool=self.extract_pool,
+            ) as wrapper:
+                yield wrapper
+        finally:
+            self._in_use -= 1
+            # 关闭超时后才归还的浏览器已经关了，不用再记
+            if id(crawler) in self._leases:
+                self._leases[id(crawler)] -= 1
+            if self._in_use == 0:
+                self._all_returned.set()
+
+    async def close(self, drain_timeout: float = DEFAULT_DRAIN_TIMEOUT) -> None:
+        """
+        优雅关闭：等待借出的浏览器归还后再关闭
+        Graceful shutdown: wait for borrowed browsers to return, then close
+
+        Args:
+            drain_timeout: 等待归还的最长时间（秒）
+        """
+        if not self._started:
+            return
+
+        self._closing = True
+
+        try:
+            await asyncio.wait_for(self._all_returned.wait(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"[WARN] Browser pool drain timed out, {self._in_use} still in use")
+
+        for crawler in self._crawlers:
+            try:
+                await self._page_pools[id(crawler)].close()
+                await crawler.__aexit__(None, None, None)
+            except Exception as e:
+                print(f"艹，关闭浏览器失败: {str(e)}")
+
+        if self.http_fetcher:
+            await self.http_fetcher.close()
+            self.http_fetcher = None
+        if self.result_cache:
+            self.result_cache.close()
+            self.result_cache = None
+        if self.extract_pool:
+            self.extract_pool.close()
+            self.extract_pool = None
+
+        self._crawlers.clear()
+        self._page_pools.clear()
+        self._leases.clear()
+        self._started = False
+        self._closing = False
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取池状态
+        Get pool statistics
+
+        Returns:
+            dict: 池大小、空闲浏览器数、借出数、每个浏览器的借出数，以及所有标签页池的计数汇总
+        """
+        pages = {
+            "created": 0, "reused": 0, "evicted": 0, "memory_evicted": 0,
+            "crashed": 0, "abandoned": 0, "reset_failed": 0, "live": 0, "idle": 0,
+        }
+        blocked = {"blocked": 0, "bytes_saved_estimate": 0}
+        for page_pool in self._page_pools.values():
+            for key, value in page_pool.stats().items():
+                pages[key] += value
+            blocker_stats = page_pool.blocker.stats()
+            for key in blocked:
+                blocked[key] += blocker_stats[key]
+
+        return {
+            "size": self.size,
+            "idle": sum(1 for count in self._leases.values() if count == 0),
+            "in_use": self._in_use,
+            "leases": list(self._leases.values()),
+            "started": self._started,
+            "pages": pages,
+            "blocked": blocked,
+            "hosts": self.scheduler.stats(),
+            "fetch": self.http_fetcher.learner.stats() if self.http_fetcher else {},
+            "revalidation": self.validator_store.stats(),
+            "result_cache": self.result_cache.stats() if self.result_cache else {},
+            "single_flight": self.single_flight.stats(),
+            "adaptive": self.limiter.stats(),
+            "circuit_breaker": self.circuit_breaker.stats(),
+            "extraction": self.extract_pool.stats() if self.extract_pool else {},
+        }
+
+
+# ==================== 全局浏览器池实例 ====================
+
+# 艹，全局唯一浏览器池，由lifespan创建，别tm到处new！
+_browser_pool: Optional[BrowserPool] = None
+
+
+async def init_browser_pool(size: int = DEFAULT_POOL_SIZE) -> BrowserPool:
+    """
+    创建并预热全局浏览器池（在lifespan启动时调用）
+    Create and warm up the global browser pool (called at lifespan startup)
+
+    Args:
+        size: 池中浏览器数量
+
+    Returns:
+        BrowserPool: 全局浏览器池
+    """
+    global _browser_pool
+
+    if _browser_pool is None:
+        _browser_pool = BrowserPool(size=size)
+        await _browser_pool.start()
+
+    return _browser_pool
+
+
+async def close_browser_pool() -> None:
+    """
+    关闭全局浏览器池（在lifespan退出时调用）
+    Close the global browser pool (called at lifespan shutdown)
+    """
+    global _browser_pool
+
+    if _browser_pool is not None:
+        await _browser_pool.close()
+        _browser_pool = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """
+    依赖注入：获取全局浏览器池
+    Dependency injection: Get the global browser pool
+
+    Returns:
+        BrowserPool: 全局浏览器池
+
+    Raises:
+        RuntimeError: 浏览器池未初始化
+    """
+    if _browser_pool is None:
+        raise RuntimeError("艹，浏览器池未初始化！检查lifespan")
+    return _browser_pool
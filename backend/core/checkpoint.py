@@ -0,0 +1,271 @@
+"""
+深度爬取断点
+Deep Crawl Checkpoint
+
+这个SB模块把深度爬取的待爬队列、已见集合和页面状态存到本地SQLite，进程重启后可以续爬
+This module persists the deep crawl frontier, seen set and per-page status
+to a local SQLite file so a crawl can resume after a restart
+"""
+
+import asyncio
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Optional
+
+from .frontier import FrontierEntry
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frontier (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    depth INTEGER NOT NULL,
+    parent TEXT,
+    score REAL NOT NULL DEFAULT 0,
+    inlinks INTEGER NOT NULL DEFAULT 1,
+    link_text TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS seen (
+    fingerprint INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT NOT NULL,
+    finished_seq INTEGER NOT NULL
+);
+"""
+
+
+class CheckpointState:
+    """
+    从断点恢复出来的状态
+    State restored from a checkpoint
+    """
+
+    def __init__(
+        self,
+        params: dict[str, Any],
+        frontier: list[FrontierEntry],
+        fingerprints: list[int],
+        results: list[dict[str, Any]],
+        finished: bool,
+        inlinks: Optional[dict[str, tuple[int, str]]] = None,
+    ):
+        self.params = params
+        self.frontier = frontier
+        # best_first用：待爬URL -> (入链数, 链接文字)
+        self.inlinks = inlinks or {}
+        self.fingerprints = fingerprints
+        self.results = results
+        self.finished = finished
+
+
+class CrawlCheckpoint:
+    """
+    深度爬取断点文件
+    Deep crawl checkpoint file
+
+    艹，写操作先攒在内存里，攒够一批再一次性落盘，别每爬一页就开一次事务！
+
+    - frontier表：待爬+正在爬的条目，页面完成后才删除（崩溃时正在爬的页面会重爬）；
+      best_first的分数、入链数和链接文字重新打分时跟着更新
+    - seen表：已见URL的64位指纹
+    - pages表：已完成页面的状态和结果
+    """
+
+    def __init__(self, path: Path | str, flush_every: int = 20):
+        """
+        初始化断点
+
+        Args:
+            path: SQLite文件路径
+            flush_every: 攒多少个完成页面后落盘一次
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._conn.commit()
+
+        self._pushed: list[tuple[FrontierEntry, int, str]] = []
+        self._rescored: dict[str, tuple[float, int, str]] = {}
+        self._seen: list[int] = []
+        self._pages: list[tuple[FrontierEntry, dict[str, Any]]] = []
+        self._page_seq = 0
+        self._lock = asyncio.Lock()
+
+    def _migrate(self) -> None:
+        # 艹，老断点文件的frontier表没有入链数和链接文字两列，补上
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(frontier)")}
+        if "inlinks" not in columns:
+            self._conn.execute("ALTER TABLE frontier ADD COLUMN inlinks INTEGER NOT NULL DEFAULT 1")
+        if "link_text" not in columns:
+            self._conn.execute("ALTER TABLE frontier ADD COLUMN link_text TEXT NOT NULL DEFAULT ''")
+
+    # ==================== 读取 ====================
+
+    def load(self) -> Optional[CheckpointState]:
+        """
+        读取断点状态
+        Load checkpoint state
+
+        Returns:
+            CheckpointState: 断点状态，文件里没有爬取记录时返回None
+        """
+        meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        if "params" not in meta:
+            return None
+
+        frontier = []
+        inlinks = {}
+        for url, depth, parent, score, count, text in self._conn.execute(
+            "SELECT url, depth, parent, score, inlinks, link_text FROM frontier ORDER BY seq"
+        ):
+            frontier.append(FrontierEntry(url, depth, parent, score))
+            inlinks[url] = (count, text)
+        fingerprints = [
+            _to_unsigned(row[0]) for row in self._conn.execute("SELECT fingerprint FROM seen")
+        ]
+        results = [
+            {"url": url, "depth": depth, "result": json.loads(result)}
+            for url, depth, result in self._conn.execute(
+                "SELECT url, depth, result FROM pages ORDER BY finished_seq"
+            )
+        ]
+        self._page_seq = len(results)
+
+        return CheckpointState(
+            params=json.loads(meta["params"]),
+            frontier=frontier,
+            fingerprints=fingerprints,
+            results=results,
+            finished=meta.get("finished") == "1",
+            inlinks=inlinks,
+        )
+
+    def reset(self) -> None:
+        """清空文件里的爬取记录（上一次爬取已经完成，这次从头开始）"""
+        with self._conn:
+            for table in ("meta", "frontier", "seen", "pages"):
+                self._conn.execute(f"DELETE FROM {table}")
+        self._pushed, self._seen, self._pages = [], [], []
+        self._rescored = {}
+        self._page_seq = 0
+
+    # ==================== 记录（先攒在内存里） ====================
+
+    def start(self, params: dict[str, Any]) -> None:
+        """记录本次爬取的参数（续爬时用）"""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('params', ?)",
+            (json.dumps(params, ensure_ascii=False),),
+        )
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('finished', '0')")
+        self._conn.commit()
+
+    def record_push(
+        self,
+        entry: FrontierEntry,
+        fingerprint: int,
+        inlinks: int = 1,
+        text: str = "",
+    ) -> None:
+        """记录新加入待爬队列的URL（inlinks/text是best_first打分用的入链数和链接文字）"""
+        self._pushed.append((entry, inlinks, text))
+        self._seen.append(fingerprint)
+
+    def record_rescore(self, url: str, score: float, inlinks: int, text: str) -> None:
+        """记录待爬URL重新打分（同一URL只保留最新一次）"""
+        self._rescored[url] = (score, inlinks, text)
+
+    def record_page(self, entry: FrontierEntry, result: dict[str, Any]) -> bool:
+        """
+        记录完成的页面
+
+        Returns:
+            bool: 是否攒够了一批，该落盘了
+        """
+        self._pages.append((entry, result))
+        return len(self._pages) >= self.flush_every
+
+    # ==================== 落盘 ====================
+
+    async def flush(self) -> None:
+        """把攒下的记录一次性写入SQLite（在线程池里执行，不卡事件循环）"""
+        async with self._lock:
+            pushed, self._pushed = self._pushed, []
+            rescored, self._rescored = self._rescored, {}
+            seen, self._seen = self._seen, []
+            pages, self._pages = self._pages, []
+            if pushed or rescored or seen or pages:
+                await asyncio.to_thread(self._write_batch, pushed, rescored, seen, pages)
+
+    def _write_batch(
+        self,
+        pushed: list[tuple[FrontierEntry, int, str]],
+        rescored: dict[str, tuple[float, int, str]],
+        seen: list[int],
+        pages: list[tuple[FrontierEntry, dict[str, Any]]],
+    ) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier (url, depth, parent, score, inlinks, link_text) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(e.url, e.depth, e.parent, e.score, count, text) for e, count, text in pushed],
+            )
+            self._conn.executemany(
+                "UPDATE frontier SET score = ?, inlinks = ?, link_text = ? WHERE url = ?",
+                [(score, count, text, url) for url, (score, count, text) in rescored.items()],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen (fingerprint) VALUES (?)",
+                [(_to_signed(fp),) for fp in seen],
+            )
+            rows = []
+            for entry, result in pages:
+                self._page_seq += 1
+                rows.append((
+                    entry.url,
+                    entry.depth,
+                    "done" if result.get("success") else "failed",
+                    json.dumps(result, ensure_ascii=False, default=str),
+                    self._page_seq,
+                ))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (url, depth, status, result, finished_seq) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.executemany(
+                "DELETE FROM frontier WHERE url = ?",
+                [(entry.url,) for entry, _ in pages],
+            )
+
+    async def finish(self) -> None:
+        """落盘剩余记录并标记爬取完成"""
+        await self.flush()
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('finished', '1')")
+        self._conn.commit()
+
+    def close(self) -> None:
+        """关闭SQLite连接"""
+        self._conn.close()
+
+
+# SQLite的INTEGER是有符号64位，指纹存取时要转一下
+def _to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
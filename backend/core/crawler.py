@@ -7,12 +7,133 @@ This module wraps Crawl4AI's AsyncWebCrawler for unified crawl interface
 """
 
 import asyncio
-from typing import Any, Optional
+import httpx
+from typing import Any, AsyncIterator, Iterable, Optional
 from pathlib import Path
+from urllib.parse import urljoin
 
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.extraction_strategy import LLMExtractionStrategy, JsonCssExtractionStrategy
 
+from .page_pool import PagePool, is_crash_error
+from .resource_blocking import resolve_profile
+from .scroll_loader import ScrollPlan
+from .http_fetcher import (
+    HttpFetcher,
+    is_html_response,
+    missing_selectors,
+    needs_js_rendering,
+    visible_text_length,
+)
+from .politeness import HostScheduler
+from .frontier import FrontierEntry, make_frontier
+from .url_utils import SeenURLSet, canonicalize_url, crawl_cache_key, url_fingerprint
+from .revalidation import ValidatorStore, content_hash
+from .result_cache import ResultCache
+from .single_flight import SingleFlight
+from .adaptive_limiter import AdaptiveLimiter, Permit, classify_result
+from .retry import CircuitBreaker, RetryPolicy, classify_error
+from .checkpoint import CrawlCheckpoint
+from .extract_pool import ExtractionPool
+from .url_scoring import URLScorer, default_scorer
+
+
+# 抓取模式
+FETCH_MODES = {"browser", "http", "auto"}
+
+# 单页默认超时（秒）：导航+渲染+滚动整个过程的硬上限
+DEFAULT_PAGE_TIMEOUT = 60.0
+
+# crawl4ai的导航超时比外层硬超时早这么多秒（最多留出超时的20%），让它先干净地失败
+PAGE_TIMEOUT_MARGIN = 5.0
+
+# 结果里可以按include投影的字段（success/status_code/error等状态字段总是返回）
+RESULT_FIELDS = (
+    "html",
+    "markdown",
+    "fit_markdown",
+    "extracted_content",
+    "links",
+    "media",
+    "metadata",
+    "screenshot",
+)
+
+# 不指定include时返回的字段（原始HTML太大，要提取字段的调用方自己要）
+DEFAULT_RESULT_FIELDS = tuple(field for field in RESULT_FIELDS if field != "html")
+
+
+def resolve_include(include: Optional[Iterable[str]]) -> Optional[list[str]]:
+    """
+    规范化crawl配置里的include
+    Normalize the crawl config "include" entry
+
+    Args:
+        include: 要返回的结果字段，None表示默认字段（DEFAULT_RESULT_FIELDS）
+
+    Returns:
+        list: 排好序的字段列表（缓存键稳定），None表示默认字段
+
+    Raises:
+        ValueError: 未知字段
+    """
+    if include is None:
+        return None
+    if isinstance(include, str):
+        include = [include]
+    fields = set(include)
+    unknown = fields - set(RESULT_FIELDS)
+    if unknown:
+        raise ValueError(f"艹，未知的结果字段: {sorted(unknown)}，可选: {list(RESULT_FIELDS)}")
+    return sorted(fields)
+
+
+def batch_timeout_result(started: bool) -> dict[str, Any]:
+    """批量截止时间到了还没完成的URL的结果"""
+    return {
+        "success": False,
+        "error": "批量爬取超时，已取消" if started else "批量爬取超时，未开始",
+        "timed_out": True,
+    }
+
+
+def ready_selectors(config: dict[str, Any]) -> Optional[list[str]]:
+    """
+    就绪条件里能在静态HTML上检查的CSS选择器
+    CSS selectors of the readiness condition that can be checked on static HTML
+
+    ready_selectors（模板必需字段的选择器）和"css:"开头的wait_for可以检查；
+    只有一段"js:"条件、不知道它在等什么的，只能交给浏览器
+
+    Returns:
+        list: 要检查的选择器（没有就绪条件时为空）；只能用浏览器判断时返回None
+    """
+    selectors = list(config.get("ready_selectors") or ())
+    wait_for = config.get("wait_for")
+    if wait_for:
+        if wait_for.startswith("css:"):
+            selectors.append(wait_for[4:].strip())
+        elif not selectors:
+            return None
+    return selectors
+
+
+def is_cacheable(result: dict[str, Any]) -> bool:
+    """
+    结果能不能进结果缓存
+    Whether a result may be stored in the result cache
+
+    艹，crawl4ai对404/5xx页面也返回success=True，这种错误页缓存下来就一直命中，
+    只缓存没有可重试错误、状态码在[200, 400)里的结果
+    """
+    status = result.get("status_code")
+    return (
+        bool(result.get("success"))
+        and classify_error(result) is None
+        and status is not None
+        and 200 <= status < 400
+    )
+
 
 class Crawl4AIWrapper:
     """
@@ -27,6 +148,22 @@ class Crawl4AIWrapper:
         headless: bool = True,
         browser_type: str = "chromium",
         verbose: bool = True,
+        crawler: Optional[AsyncWebCrawler] = None,
+        page_pool: Optional[PagePool] = None,
+        max_pages: int = 4,
+        max_navigations_per_page: int = 50,
+        max_page_memory_mb: float = 512.0,
+        scheduler: Optional[HostScheduler] = None,
+        fetch_mode: str = "browser",
+        http_fetcher: Optional[HttpFetcher] = None,
+        validator_store: Optional[ValidatorStore] = None,
+        result_cache: Optional[ResultCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        page_timeout: float = DEFAULT_PAGE_TIMEOUT,
+        extract_pool: Optional[ExtractionPool] = None,
     ):
         """
         初始化封装器
@@ -35,25 +172,89 @@ class Crawl4AIWrapper:
             headless: 是否无头模式
             browser_type: 浏览器类型（chromium/firefox/webkit）
             verbose: 是否输出详细日志
+            crawler: 已启动的AsyncWebCrawler（来自浏览器池，可选）。
+                传入时封装器只借用它，退出时不会关闭浏览器
+            page_pool: 已有的标签页池（来自浏览器池，可选）
+            max_pages: 标签页池大小（自建标签页池时生效）
+            max_navigations_per_page: 单个标签页导航多少次后回收
+            max_page_memory_mb: 单个标签页JS堆超过多少MB后回收
+            scheduler: 域名礼貌调度器（可选，浏览器池会传入共享实例）
+            fetch_mode: 抓取模式。browser=总是用浏览器；http=只用HTTP客户端；
+                auto=先用HTTP抓，判断需要JS渲染时回退浏览器（按域名学习）
+            http_fetcher: 共享的HTTP抓取器（可选，浏览器池会传入共享实例）
+            validator_store: 条件重验证仓库（可选）。传入后重复爬取同一URL时发条件请求，
+                304或内容哈希没变就直接复用上一次的结果
+            result_cache: 结果缓存（可选）。按规范化URL+配置哈希缓存成功的结果，
+                config的cache_ttl覆盖默认过期时间，cache_mode为bypass时不读、disable时不读不写
+            single_flight: 并发请求合并器（可选，浏览器池会传入共享实例）。
+                同一时刻相同URL+配置的爬取只抓一次，所有调用方共享结果
+            limiter: AIMD自适应限流器（可选，浏览器池会传入共享实例）。
+                config里adaptive为True时真正的抓取要先拿到它的许可
+            retry_policy: 重试策略（可选）。超时/导航错误/5xx按类型重试，指数退避+抖动，
+                config的retries可以覆盖重试次数（整数或{错误类型: 次数}）
+            circuit_breaker: 域名熔断器（可选，浏览器池会传入共享实例）
+            page_timeout: 单次抓取的超时（秒），config的timeout可以覆盖。
+                超时的抓取会被取消，占着的标签页直接关掉换新的
+            extract_pool: 提取进程池（可选，浏览器池会传入共享实例）。
+                模板字段提取在进程池里跑，没有时在当前进程提取
         """
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"艹，无效的抓取模式: {fetch_mode}，必须是: {FETCH_MODES}")
+
         self.browser_config = BrowserConfig(
             headless=headless,
             browser_type=browser_type,
             verbose=verbose,
         )
         self.verbose = verbose
-        self._crawler: Optional[AsyncWebCrawler] = None
+        self._crawler: Optional[AsyncWebCrawler] = crawler
+        # 艹，借来的浏览器不归我们管，别在__aexit__里把它关了！
+        self._owns_crawler = crawler is None
+
+        self._page_pool: Optional[PagePool] = page_pool
+        self._owns_page_pool = page_pool is None
+        self._page_pool_options = {
+            "max_pages": max_pages,
+            "max_navigations": max_navigations_per_page,
+            "max_memory_mb": max_page_memory_mb,
+        }
+        self.scheduler = scheduler or HostScheduler()
+
+        self.fetch_mode = fetch_mode
+        self._http_fetcher: Optional[HttpFetcher] = http_fetcher
+        self._owns_http_fetcher = http_fetcher is None
+        self.validator_store = validator_store
+        self.result_cache = result_cache
+        self.single_flight = single_flight or SingleFlight()
+        self.limiter = limiter or AdaptiveLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.page_timeout = page_timeout
+        self.extract_pool = extract_pool
 
     async def __aenter__(self):
         """异步上下文管理器入口"""
-        self._crawler = AsyncWebCrawler(config=self.browser_config)
-        await self._crawler.__aenter__()
+        if self._owns_crawler:
+            self._crawler = AsyncWebCrawler(config=self.browser_config)
+            await self._crawler.__aenter__()
+        if self._owns_page_pool:
+            self._page_pool = PagePool(self._crawler, **self._page_pool_options)
+        if self._owns_http_fetcher:
+            # browser模式下crawl也可以通过config切到http/auto，所以总是备一个
+            self._http_fetcher = HttpFetcher()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器退出"""
-        if self._crawler:
+        if self._page_pool and self._owns_page_pool:
+            await self._page_pool.close()
+            self._page_pool = None
+        if self._http_fetcher and self._owns_http_fetcher:
+            await self._http_fetcher.close()
+            self._http_fetcher = None
+        if self._crawler and self._owns_crawler:
             await self._crawler.__aexit__(exc_type, exc_val, exc_tb)
+            self._crawler = None
 
     async def crawl(
         self,
@@ -66,86 +267,440 @@ class Crawl4AIWrapper:
 
         Args:
             url: 目标URL
-            config: 爬取配置（可选）
+            config: 爬取配置（可选），其中delay/max_per_host由域名调度器执行（没给max_per_host不限域名并发），
+                fetch_mode可覆盖封装器的抓取模式（browser/http/auto），
+                block指定浏览器请求拦截配置：内置配置名（none/trackers/lean/text/minimal）
+                或 {"profile": ..., "resource_types": [...], "url_patterns": [...]}，
+                wait_for/wait_for_timeout（秒）是浏览器抓取HTML前的就绪条件，
+                ready_selectors是就绪条件等的CSS选择器，auto模式下HTTP拿到的HTML里
+                缺了它们就回退浏览器（"css:"开头的wait_for同理，只有"js:"条件的直接用浏览器），
+                scroll是滚动加载计划（见ScrollPlan.from_config），
+                include是要返回的结果字段（见RESULT_FIELDS，默认DEFAULT_RESULT_FIELDS），
+                没要的字段不组装，screenshot只有显式要了才截图，
+                timeout是单次抓取的超时（秒，不含排队和重试退避），0表示不限
 
         Returns:
             dict: 爬取结果字典
             {
                 "success": bool,
+                "html": str,  # 只有include里有html时才返回
                 "markdown": str,
                 "fit_markdown": str,
                 "extracted_content": str,
                 "links": dict,
                 "media": dict,
                 "metadata": dict,
-                "screenshot": str,
+                "screenshot": str,  # 只有include里有screenshot时才有值
+                "blocked": dict,  # 配置了block时：拦截的请求数和估算省下的字节数
+                "scroll": dict,  # 配置了scroll时：滚动次数、停止原因、每步耗时
+                "timed_out": bool,  # 超时被取消时为True
                 "error": str  # 如果失败
             }
         """
         if not self._crawler:
             raise RuntimeError("艹，爬虫未初始化！请使用 async with 语句。")
 
+        config = config or {}
+        if config.get("include") is not None:
+            # 集合转成排好序的列表，同样的投影得到同一个缓存键
+            config = {**config, "include": resolve_include(config["include"])}
+        cache_key = crawl_cache_key(url, config)
+        revalidate_key = (
+            cache_key if self.validator_store and config.get("revalidate", True) else None
+        )
+        cache_mode = config.get("cache_mode")
+
         try:
-            # 构建爬取配置
-            run_config = self._build_run_config(config or {})
+            if self.result_cache and cache_mode not in ("bypass", "disable"):
+                cached = await self.result_cache.get(cache_key)
+                if cached is not None:
+                    if self.verbose:
+                        print(f"⚡ 命中缓存: {url}")
+                    return cached
 
-            # 执行爬取
-            if self.verbose:
-                print(f"🔍 开始爬取: {url}")
+            # 同一时刻同一缓存键的爬取合并成一次
+            return await self.single_flight.do(
+                cache_key,
+                lambda: self._crawl_uncached(url, config, cache_key, revalidate_key),
+            )
 
-            result = await self._crawler.arun(url=url, config=run_config)
+        except Exception as e:
+            error_msg = f"爬取异常: {str(e)}"
+            if self.verbose:
+                print(f"❌ {error_msg}")
 
-            # 处理结果
-            if result.success:
-                if self.verbose:
-                    print(f"✅ 爬取成功: {url}")
+            return {
+                "success": False,
+                "error": error_msg,
+            }
 
+    async def _crawl_uncached(
+        self,
+        url: str,
+        config: dict[str, Any],
+        cache_key: str,
+        revalidate_key: Optional[str],
+    ) -> dict[str, Any]:
+        """真正执行一次抓取（HTTP快速通道或浏览器，按重试策略重试），成功后写入结果缓存"""
+        policy = self.retry_policy.with_overrides(config.get("retries"))
+        attempt = 0
+        while True:
+            # 熔断中的域名直接快速失败，别占浏览器槽位
+            if not self.circuit_breaker.allow(url):
                 return {
-                    "success": True,
-                    "markdown": result.markdown.raw_markdown if result.markdown else "",
-                    "fit_markdown": result.markdown.fit_markdown if result.markdown else "",
-                    "extracted_content": result.extracted_content,
-                    "links": {
-                        "internal": result.links.get("internal", []),
-                        "external": result.links.get("external", []),
-                    } if result.links else {},
-                    "media": {
-                        "images": result.media.get("images", []),
-                        "videos": result.media.get("videos", []),
-                        "audio": result.media.get("audio", []),
-                    } if result.media else {},
-                    "metadata": {
-                        "title": result.metadata.get("title"),
-                        "description": result.metadata.get("description"),
-                        "keywords": result.metadata.get("keywords", []),
-                    } if result.metadata else {},
-                    "screenshot": result.screenshot,
+                    "success": False,
+                    "error": f"域名熔断中，{self.circuit_breaker.retry_after(url):.0f}秒后再试",
+                    "circuit_open": True,
                 }
+
+            result = await self._attempt(url, config, revalidate_key)
+            error_class = classify_error(result)
+            self.circuit_breaker.record(url, failed=error_class is not None)
+            if not policy.should_retry(error_class, attempt):
+                break
+
+            delay = policy.backoff(attempt)
+            attempt += 1
+            if self.verbose:
+                print(f"🔁 {error_class}错误，{delay:.1f}秒后第{attempt}次重试: {url}")
+            # 退避期间不占域名槽位
+            await asyncio.sleep(delay)
+
+        if attempt:
+            result["retries"] = attempt
+
+        if self.verbose:
+            if result["success"]:
+                print(f"✅ 爬取成功: {url}")
+            else:
+                print(f"❌ 爬取失败: {url} - {result['error']}")
+
+        if self.result_cache and is_cacheable(result) and config.get("cache_mode") != "disable":
+            await self.result_cache.put(cache_key, result, ttl=config.get("cache_ttl"))
+
+        return result
+
+    async def _attempt(
+        self,
+        url: str,
+        config: dict[str, Any],
+        revalidate_key: Optional[str],
+    ) -> dict[str, Any]:
+        """在域名槽位（和自适应许可）里抓取一次"""
+        # 艹，先拿域名槽位再借标签页，排队时别占着标签页
+        async with self.scheduler.slot(
+            url,
+            delay=config.get("delay"),
+            max_per_host=config.get("max_per_host"),
+        ):
+            if self.verbose:
+                print(f"🔍 开始爬取: {url}")
+
+            if not config.get("adaptive"):
+                return await self._fetch(url, config, revalidate_key)
+
+            # 延迟只算真正抓取的时间，所以在域名礼貌等待之后再拿许可
+            async with self.limiter.slot(url) as permit:
+                evicted = self._memory_evictions()
+                result = await self._fetch(url, config, revalidate_key, permit)
+                permit.outcome = classify_result(
+                    result, memory_pressure=self._memory_evictions() > evicted
+                )
+            return result
+
+    async def _fetch(
+        self,
+        url: str,
+        config: dict[str, Any],
+        revalidate_key: Optional[str],
+        permit: Optional[Permit] = None,
+    ) -> dict[str, Any]:
+        """
+        在超时限制内抓取一次（异常也转成失败结果，好让重试策略归类）
+
+        艹，卡死的页面会一直占着域名槽位和标签页！超时就取消，标签页池会把它关掉换新的
+
+        Args:
+            permit: 自适应许可（可选），记下这次实际走的抓取方式
+        """
+        timeout = config.get("timeout", self.page_timeout)
+
+        try:
+            return await asyncio.wait_for(
+                self._fetch_by_mode(url, config, revalidate_key, permit), timeout or None
+            )
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "error": f"爬取异常: 超时 (timeout)，{timeout:g}秒内没有完成",
+                "timed_out": True,
+            }
+        except Exception as e:
+            return {"success": False, "error": f"爬取异常: {str(e)}"}
+
+    async def _fetch_by_mode(
+        self,
+        url: str,
+        config: dict[str, Any],
+        revalidate_key: Optional[str],
+        permit: Optional[Permit] = None,
+    ) -> dict[str, Any]:
+        """按抓取模式选择HTTP快速通道或浏览器（permit.mode记下实际走的是哪条）"""
+        fetch_mode = config.get("fetch_mode", self.fetch_mode)
+
+        result = None
+        selectors = ready_selectors(config)
+        # 要滚动加载、截图，或者就绪条件只能在浏览器里判断的页面只能用浏览器
+        needs_browser = (
+            config.get("scroll")
+            or "screenshot" in (config.get("include") or ())
+            or selectors is None
+        )
+        # auto模式下学习结果让这次走浏览器的：静态域名的定期复查，渲染完要对比一下
+        recheck = False
+        if fetch_mode != "browser" and self._http_fetcher:
+            if fetch_mode == "http" or (
+                not needs_browser and self._http_fetcher.learner.prefer_http(url)
+            ):
+                result = await self._crawl_http(
+                    url,
+                    config,
+                    force=fetch_mode == "http",
+                    revalidate_key=revalidate_key,
+                    selectors=selectors,
+                )
+            else:
+                recheck = not needs_browser
+
+        if permit is not None:
+            permit.mode = "browser" if result is None else "http"
+        if result is None:
+            result = await self._crawl_browser(
+                url, config, revalidate_key=revalidate_key, recheck=recheck
+            )
+        return result
+
+    def _memory_evictions(self) -> int:
+        """标签页池因内存超限回收的累计次数"""
+        if isinstance(self._page_pool, PagePool):
+            return self._page_pool.stats()["memory_evicted"]
+        return 0
+
+    async def _crawl_browser(
+        self,
+        url: str,
+        config: dict[str, Any],
+        revalidate_key: Optional[str] = None,
+        recheck: bool = False,
+    ) -> dict[str, Any]:
+        """
+        用浏览器标签页爬取（渲染后的HTML哈希没变时复用上一次结果）
+
+        Args:
+            url: 目标URL
+            config: 爬取配置
+            revalidate_key: 条件重验证键（可选）
+            recheck: 拿渲染后的HTML复查这个域名是不是真的静态（RenderModeLearner.check_rendered）
+        """
+        profile = resolve_profile(config.get("block"))
+        scroll_plan = ScrollPlan.from_config(config.get("scroll"))
+
+        async with self._page_pool.lease() as page:
+            # 构建爬取配置（绑定到借来的标签页）
+            run_config = self._build_run_config(config, session_id=page.session_id)
+            with self._page_pool.blocker.activate(page.session_id, profile) as blocked, \
+                    self._page_pool.scroller.activate(page.session_id, scroll_plan) as scrolled:
+                result = await self._crawler.arun(url=url, config=run_config)
+
+            if not result.success and is_crash_error(result.error_message):
+                page.mark_crashed()
+
+        if self._http_fetcher:
+            self._http_fetcher.learner.count("browser")
+            if recheck and result.success:
+                self._http_fetcher.learner.check_rendered(url, result.html or "")
+
+        if revalidate_key and result.success:
+            digest = content_hash(result.html or "")
+            reused = self._reuse_if_unchanged(revalidate_key, digest)
+            if reused is not None:
+                formatted = reused
             else:
-                error_msg = result.error_message or "爬取失败，未知错误"
-                if self.verbose:
-                    print(f"❌ 爬取失败: {url} - {error_msg}")
+                formatted = self._format_result(result, config.get("include"))
+                self.validator_store.put(revalidate_key, digest, formatted)
+        else:
+            formatted = self._format_result(result, config.get("include"))
+
+        if blocked is not None:
+            formatted["blocked"] = blocked.as_dict()
+        if scrolled is not None:
+            formatted["scroll"] = scrolled.as_dict()
+        return formatted
+
+    def _reuse_if_unchanged(self, key: str, digest: str) -> Optional[dict[str, Any]]:
+        """内容哈希和上次一样就复用上次的结果，否则记一次changed/miss"""
+        record = self.validator_store.get(key)
+        if record is None:
+            self.validator_store.count("miss")
+            return None
+        if record.content_hash == digest:
+            return self.validator_store.reuse(key, "unchanged")
+        self.validator_store.count("changed")
+        return None
+
+    async def _crawl_http(
+        self,
+        url: str,
+        config: dict[str, Any],
+        force: bool = False,
+        revalidate_key: Optional[str] = None,
+        selectors: Optional[list[str]] = None,
+    ) -> Optional[dict[str, Any]]:
+        """
+        HTTP快速通道：直接抓HTML，交给crawl4ai按raw HTML处理（不开标签页）
+
+        Args:
+            url: 目标URL
+            config: 爬取配置
+            force: fetch_mode为http时不回退浏览器
+            revalidate_key: 条件重验证键（可选）
+            selectors: 就绪条件要的CSS选择器（见ready_selectors），HTML里缺了就回退浏览器
+
+        Returns:
+            dict: 爬取结果；需要回退到浏览器时返回None
+        """
+        learner = self._http_fetcher.learner
+
+        headers = (
+            self.validator_store.conditional_headers(revalidate_key) if revalidate_key else None
+        )
+
+        try:
+            response = await self._http_fetcher.fetch(url, headers=headers)
+        except httpx.HTTPError as e:
+            if force:
+                return {"success": False, "error": f"HTTP抓取失败: {str(e)}"}
+            learner.count("fallback")
+            return None
+
+        if response.status_code == 304 and revalidate_key:
+            # 艹，服务器说没变，连body都没下载
+            reused = self.validator_store.reuse(revalidate_key, "not_modified")
+            if reused is not None:
+                learner.count("http")
+                return reused
 
+        if response.status_code >= 300 or not is_html_response(response):
+            if force:
                 return {
                     "success": False,
-                    "error": error_msg,
+                    "error": f"HTTP抓取失败: 状态码 {response.status_code}",
+                    "status_code": response.status_code,
                 }
+            learner.count("fallback")
+            return None
 
-        except Exception as e:
-            error_msg = f"爬取异常: {str(e)}"
-            if self.verbose:
-                print(f"❌ {error_msg}")
+        html = response.text
+        text_chars = visible_text_length(html)
+        if not force and (
+            needs_js_rendering(html, text_chars) or missing_selectors(html, selectors or ())
+        ):
+            # 艹，这个域名要JS渲染（或者要的元素服务端HTML里没有），记下来，后面直接走浏览器
+            learner.record(url, needs_js=True)
+            learner.count("fallback")
+            return None
+
+        learner.record(url, needs_js=False, text_chars=text_chars)
+
+        digest = None
+        if revalidate_key:
+            digest = content_hash(response.content)
+            reused = self._reuse_if_unchanged(revalidate_key, digest)
+            if reused is not None:
+                learner.count("http")
+                return reused
 
+        # 就绪条件上面已经在HTML上检查过了，raw HTML不会再变，不用再等；
+        # raw HTML没有页面URL，把最终URL交给crawl4ai解析相对链接
+        run_config = self._build_run_config(
+            {**config, "cache_mode": "bypass", "wait_for": None},
+            base_url=str(response.url),
+        )
+        result = await self._crawler.arun(url="raw:" + html, config=run_config)
+        learner.count("http")
+
+        include = config.get("include")
+        formatted = self._format_result(result, include)
+        if formatted["success"] and revalidate_key:
+            self.validator_store.put(
+                revalidate_key,
+                digest,
+                formatted,
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+            )
+        return formatted
+
+    def _format_result(
+        self,
+        result: Any,
+        include: Optional[Iterable[str]] = None,
+    ) -> dict[str, Any]:
+        """
+        把crawl4ai的CrawlResult转换成结果字典
+
+        Args:
+            result: crawl4ai的CrawlResult
+            include: 要返回的结果字段（None为默认字段），没要的字段连读都不读
+        """
+        if not result.success:
             return {
                 "success": False,
-                "error": error_msg,
+                "error": result.error_message or "爬取失败，未知错误",
+                "status_code": getattr(result, "status_code", None),
             }
 
+        fields = DEFAULT_RESULT_FIELDS if include is None else include
+        formatted: dict[str, Any] = {
+            "success": True,
+            "status_code": getattr(result, "status_code", None),
+        }
+        if "html" in fields:
+            formatted["html"] = result.html or ""
+        if "markdown" in fields:
+            formatted["markdown"] = result.markdown.raw_markdown if result.markdown else ""
+        if "fit_markdown" in fields:
+            formatted["fit_markdown"] = result.markdown.fit_markdown if result.markdown else ""
+        if "extracted_content" in fields:
+            formatted["extracted_content"] = result.extracted_content
+        if "links" in fields:
+            formatted["links"] = {
+                "internal": result.links.get("internal", []),
+                "external": result.links.get("external", []),
+            } if result.links else {}
+        if "media" in fields:
+            formatted["media"] = {
+                "images": result.media.get("images", []),
+                "videos": result.media.get("videos", []),
+                "audio": result.media.get("audio", []),
+            } if result.media else {}
+        if "metadata" in fields:
+            formatted["metadata"] = {
+                "title": result.metadata.get("title"),
+                "description": result.metadata.get("description"),
+                "keywords": result.metadata.get("keywords", []),
+            } if result.metadata else {}
+        if "screenshot" in fields:
+            formatted["screenshot"] = result.screenshot
+        return formatted
+
     async def crawl_batch(
         self,
         urls: list[str],
         config: Optional[dict[str, Any]] = None,
         max_concurrent: int = 5,
+        adaptive: bool = False,
+        deadline: Optional[float] = None,
     ) -> list[dict[str, Any]]:
         """
         批量爬取URL
@@ -154,35 +709,121 @@ class Crawl4AIWrapper:
         Args:
             urls: URL列表
             config: 爬取配置（可选）
-            max_concurrent: 最大并发数
+            max_concurrent: 最大并发数（adaptive时是并发上限）
+            adaptive: 是否用AIMD自适应限流器自动调节并发
+            deadline: 整个批量的截止时间（秒，可选）。到点后没完成的URL标记timed_out
 
         Returns:
-            list: 爬取结果列表
+            list: 爬取结果列表（与输入顺序一致）
+        """
+        formatted_results: list[Optional[dict[str, Any]]] = [None] * len(urls)
+
+        async for index, result in self.crawl_batch_stream(
+            urls, config, max_concurrent, adaptive=adaptive, deadline=deadline
+        ):
+            formatted_results[index] = result
+
+        # 截止时间到了还没开始的URL
+        return [
+            result if result is not None else batch_timeout_result(started=False)
+            for result in formatted_results
+        ]
+
+    async def crawl_batch_stream(
+        self,
+        urls: Iterable[str],
+        config: Optional[dict[str, Any]] = None,
+        max_concurrent: int = 5,
+        adaptive: bool = False,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[tuple[int, dict[str, Any]]]:
+        """
+        流式批量爬取，按完成顺序产出结果
+        Streaming batch crawl, yields results in completion order
+
+        艹，最多只有max_concurrent个任务在飞，URL可以是惰性迭代器，内存跟批量大小无关！
+
+        使用方式:
+            async for index, result in crawler.crawl_batch_stream(urls):
+                save(urls[index], result)
+
+        Args:
+            urls: URL可迭代对象（可以是生成器）
+            config: 爬取配置（可选）
+            max_concurrent: 同时在飞的最大任务数
+            adaptive: 是否用AIMD自适应限流器调节实际抓取并发（max_concurrent只作上限），
+                健康时逐步加并发，超时/429/内存吃紧时减半，域名和全局两级生效
+            deadline: 整个批量的截止时间（秒，可选）。到点后取消还在飞的任务，
+                它们产出timed_out的失败结果；还没开始的URL不再取出，也不会产出
+
+        Yields:
+            tuple: (输入中的下标, 爬取结果字典)
         """
         if not self._crawler:
             raise RuntimeError("艹，爬虫未初始化！请使用 async with 语句。")
 
-        semaphore = asyncio.Semaphore(max_concurrent)
+        if max_concurrent < 1:
+            raise ValueError("艹，max_concurrent至少为1")
 
-        async def crawl_with_semaphore(url: str) -> dict[str, Any]:
-            async with semaphore:
-                return await self.crawl(url, config)
+        if adaptive:
+            config = {**(config or {}), "adaptive": True}
 
-        tasks = [crawl_with_semaphore(url) for url in urls]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        pending: dict[asyncio.Task, int] = {}
+        url_iter = enumerate(urls)
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + deadline if deadline else None
 
-        # 处理异常
-        formatted_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                formatted_results.append({
-                    "success": False,
-                    "error": f"任务异常: {str(result)}",
-                })
-            else:
-                formatted_results.append(result)
+        def remaining() -> Optional[float]:
+            return None if expires is None else expires - loop.time()
+
+        def fill_window() -> None:
+            while len(pending) < max_concurrent:
+                left = remaining()
+                if left is not None and left <= 0:
+                    return
+                try:
+                    index, url = next(url_iter)
+                except StopIteration:
+                    return
+                task = asyncio.create_task(self.crawl(url, config))
+                pending[task] = index
 
-        return formatted_results
+        try:
+            fill_window()
+            while pending:
+                left = remaining()
+                if left is not None and left <= 0:
+                    break
+                done, _ = await asyncio.wait(
+                    pending, timeout=left, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    index = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        result = {
+                            "success": False,
+                            "error": f"任务异常: {str(e)}",
+                        }
+                    yield index, result
+                fill_window()
+
+            if pending:
+                # 艹，截止时间到了：剩下的全部取消，标签页由标签页池回收
+                timed_out = sorted(pending.values())
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                pending.clear()
+                for index in timed_out:
+                    yield index, batch_timeout_result(started=True)
+        finally:
+            # 调用方提前退出时，别让剩下的任务在后台白跑
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
 
     async def deep_crawl(
         self,
@@ -191,66 +832,184 @@ class Crawl4AIWrapper:
         max_pages: int = 10,
         max_depth: int = 3,
         config: Optional[dict[str, Any]] = None,
+        max_concurrent: int = 5,
+        checkpoint_path: Optional[Path | str] = None,
+        scorer: Optional[URLScorer] = None,
+        keywords: Optional[list[str]] = None,
     ) -> dict[str, Any]:
         """
         深度爬取（爬取整个网站）
         Deep crawl (crawl entire website)
 
+        艹，固定数量的worker消费一个待爬队列，max_pages/max_depth严格生效，不会超！
+
         Args:
             url: 起始URL
-            strategy: 爬取策略（bfs/dfs）
+            strategy: 爬取策略（bfs/dfs/best_first）
             max_pages: 最大页面数
-            max_depth: 最大深度
+            max_depth: 最大深度（起始页深度为0）
             config: 爬取配置（可选）
+            max_concurrent: 并发worker数量
+            checkpoint_path: 断点文件路径（可选）。文件里已有同一起始URL和策略的未完成爬取时
+                从断点继续，已完成的页面不会重爬；文件里的爬取已经完成时清空重新爬
+            scorer: best_first策略的URL打分器（可选，默认按keywords组合打分）
+            keywords: best_first策略的关键词（一般来自模板）
 
         Returns:
             dict: 深度爬取结果
+
+        Raises:
+            ValueError: 断点文件里是另一个起始URL或策略的未完成爬取
         """
         if not self._crawler:
             raise RuntimeError("艹，爬虫未初始化！请使用 async with 语句。")
 
-        # 艹，深度爬取需要使用Crawl4AI的深度爬取功能
-        # 这里先实现基础版本，后续可以优化
-        visited_urls = set()
+        if max_concurrent < 1:
+            raise ValueError("艹，max_concurrent至少为1")
+
+        include = resolve_include((config or {}).get("include"))
+        if include is not None and "links" not in include:
+            # 艹，深度爬取靠links扩展队列，投影里没要也得取
+            config = {**config, "include": include + ["links"]}
+
+        # 艹，/a、/a/、/a#x、/a?utm_source=..是同一页，去重按规范化URL，爬的还是原URL
+        # （有些站点认末尾斜杠或query大小写，规范化的URL不一定能打开）
+        canonical_url = canonicalize_url(url)
+        frontier = make_frontier(strategy)
+        seen_urls = SeenURLSet()
         results = []
 
-        async def crawl_recursive(current_url: str, depth: int):
-            if depth > max_depth or len(visited_urls) >= max_pages:
-                return
-
-            if current_url in visited_urls:
-                return
-
-            visited_urls.add(current_url)
-
-            # 爬取当前页面
-            result = await self.crawl(current_url, config)
-            results.append({
-                "url": current_url,
-                "depth": depth,
-                "result": result,
-            })
-
-            if not result.get("success"):
-                return
-
-            # 获取链接
-            links = result.get("links", {}).get("internal", [])
-
-            # BFS或DFS策略
-            if strategy == "bfs":
-                # BFS：按层级爬取
-                tasks = []
-                for link in links[:max_pages]:
-                    if link not in visited_urls:
-                        tasks.append(crawl_recursive(link, depth + 1))
-                await asyncio.gather(*tasks)
-            else:
-                # DFS：深度优先
-                for link in links[:max_pages]:
-                    await crawl_recursive(link, depth + 1)
+        # best_first：给新链接打分；已在队列里的链接再被发现时按入链数重新打分
+        best_first = strategy == "best_first"
+        if best_first and scorer is None:
+            scorer = default_scorer(keywords)
+        queued_links: dict[str, list] = {}  # 规范化URL -> [入链数, 链接文字, 队列里的URL]
+
+        checkpoint = CrawlCheckpoint(checkpoint_path) if checkpoint_path else None
+        state = checkpoint.load() if checkpoint else None
+        if state is not None and state.finished:
+            # 艹，完成的爬取不算断点，拿它的结果冒充这次的爬取就出大事了
+            checkpoint.reset()
+            state = None
+        elif state is not None and (
+            canonicalize_url(state.params.get("url", "")) != canonical_url
+            or state.params.get("strategy") != strategy
+        ):
+            checkpoint.close()
+            raise ValueError(
+                f"艹，断点文件里是另一次未完成的爬取（{state.params.get('url')}，"
+                f"{state.params.get('strategy')}），换个断点文件或者用resume_deep_crawl续爬"
+            )
+
+        if state is not None:
+            # 从断点恢复：已完成页面直接用存下的结果，待爬队列接着爬
+            results.extend(state.results)
+            for fingerprint in state.fingerprints:
+                seen_urls.add_fingerprint(fingerprint)
+            for entry in state.frontier:
+                frontier.push(entry)
+                if best_first:
+                    # 艹，入链数和链接文字跟着断点恢复，不然续爬后重新打分全从1开始
+                    count, text = state.inlinks.get(entry.url, (1, ""))
+                    queued_links[canonicalize_url(entry.url)] = [count, text, entry.url]
+        else:
+            start_entry = FrontierEntry(url, 0)
+            frontier.push(start_entry)
+            seen_urls.add(url)
+            if checkpoint:
+                checkpoint.start({
+                    "url": url,
+                    "strategy": strategy,
+                    "max_pages": max_pages,
+                    "max_depth": max_depth,
+                    "keywords": keywords,
+                })
+                checkpoint.record_push(start_entry, url_fingerprint(canonical_url))
+
+        # 已领取的页面数（领取时就占名额，worker再多也不会超过max_pages）
+        claimed = len(results)
+        in_flight = 0
+        changed = asyncio.Condition()
+
+        async def worker() -> None:
+            nonlocal claimed, in_flight
+
+            while True:
+                async with changed:
+                    # 队列空了但还有页面在爬，它们可能带回新链接，等着
+                    await changed.wait_for(
+                        lambda: len(frontier) > 0 or in_flight == 0 or claimed >= max_pages
+                    )
+                    if claimed >= max_pages or len(frontier) == 0:
+                        changed.notify_all()
+                        return
+                    entry = frontier.pop()
+                    queued_links.pop(canonicalize_url(entry.url), None)
+                    claimed += 1
+                    in_flight += 1
+
+                try:
+                    result = await self.crawl(entry.url, config)
+                    results.append({
+                        "url": entry.url,
+                        "depth": entry.depth,
+                        "result": result,
+                    })
+
+                    if result.get("success") and entry.depth < max_depth:
+                        for link in result.get("links", {}).get("internal", []):
+                            href = link.get("href") if isinstance(link, dict) else link
+                            if not href:
+                                continue
+                            # 相对链接按原URL解析，规范化形式只当去重键
+                            href = urljoin(entry.url, href)
+                            canonical = canonicalize_url(href)
+                            text = (link.get("text") or "") if isinstance(link, dict) else ""
+                            if seen_urls.add(canonical):
+                                child = FrontierEntry(href, entry.depth + 1, entry.url)
+                                if best_first:
+                                    queued_links[canonical] = [1, text, href]
+                                    child.score = scorer.score(canonical, child.depth, text, 1)
+                                frontier.push(child)
+                                if checkpoint:
+                                    checkpoint.record_push(
+                                        child, url_fingerprint(canonical), 1, text
+                                    )
+                            elif best_first and canonical in queued_links:
+                                queued = queued_links[canonical]
+                                queued[0] += 1
+                                queued[1] = queued[1] or text
+                                score = scorer.score(
+                                    canonical, entry.depth + 1, queued[1], queued[0]
+                                )
+                                if frontier.reprioritize(queued[2], score) and checkpoint:
+                                    checkpoint.record_rescore(queued[2], score, queued[0], queued[1])
+
+                    if checkpoint and checkpoint.record_page(entry, result):
+                        await checkpoint.flush()
+                finally:
+                    async with changed:
+                        in_flight -= 1
+                        changed.notify_all()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max_concurrent)]
+        completed = False
+        try:
+            await asyncio.gather(*workers)
+            completed = True
+        finally:
+            # 一个worker出错时其他worker也要停下，否则断点落盘后它们还在写
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
-        await crawl_recursive(url, 0)
+            if checkpoint:
+                # 正常结束标记完成；中途异常（队列可能已经空了，正在爬的页面没完成）只落盘，方便续爬
+                if completed:
+                    await checkpoint.finish()
+                else:
+                    await checkpoint.flush()
+                checkpoint.close()
 
         return {
             "success": True,
@@ -258,13 +1017,75 @@ class Crawl4AIWrapper:
             "results": results,
         }
 
-    def _build_run_config(self, config: dict[str, Any]) -> CrawlerRunConfig:
+    async def resume_deep_crawl(
+        self,
+        checkpoint_path: Path | str,
+        config: Optional[dict[str, Any]] = None,
+        max_concurrent: int = 5,
+        scorer: Optional[URLScorer] = None,
+    ) -> dict[str, Any]:
+        """
+        从断点继续深度爬取
+        Resume a deep crawl from its checkpoint
+
+        Args:
+            checkpoint_path: deep_crawl时指定的断点文件路径
+            config: 爬取配置（可选）
+            max_concurrent: 并发worker数量
+            scorer: best_first策略的URL打分器（可选）
+
+        Returns:
+            dict: 深度爬取结果（包含断点前已完成的页面）
+
+        Raises:
+            ValueError: 断点文件里没有爬取记录
+        """
+        checkpoint = CrawlCheckpoint(checkpoint_path)
+        try:
+            state = checkpoint.load()
+        finally:
+            checkpoint.close()
+
+        if state is None:
+            raise ValueError(f"艹，断点文件里没有爬取记录: {checkpoint_path}")
+
+        params = state.params
+        return await self.deep_crawl(
+            params["url"],
+            strategy=params["strategy"],
+            max_pages=params["max_pages"],
+            max_depth=params["max_depth"],
+            config=config,
+            max_concurrent=max_concurrent,
+            checkpoint_path=checkpoint_path,
+            scorer=scorer,
+            keywords=params.get("keywords"),
+        )
+
+    def page_pool_stats(self) -> dict[str, Any]:
+        """
+        获取标签页池计数器
+        Get page pool counters
+
+        Returns:
+            dict: created/reused/evicted/crashed等计数
+        """
+        return self._page_pool.stats() if self._page_pool else {}
+
+    def _build_run_config(
+        self,
+        config: dict[str, Any],
+        session_id: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ) -> CrawlerRunConfig:
         """
         构建爬取配置
         Build crawl run configuration
 
         Args:
             config: 配置字典
+            session_id: 复用的标签页会话ID（可选）
+            base_url: raw HTML的页面URL，用于解析相对链接（可选）
 
         Returns:
             CrawlerRunConfig: Crawl4AI运行配置对象
@@ -282,11 +1103,29 @@ class Crawl4AIWrapper:
             # 艹，这里可以添加各种提取策略
             pass
 
-        # 构建配置
+        # 就绪条件：必需的选择器渲染出来就抓取（见TemplateConfigSchema.to_crawl_config）
+        wait_options = {}
+        if config.get("wait_for"):
+            wait_options["wait_for"] = config["wait_for"]
+            if config.get("wait_for_timeout"):
+                wait_options["wait_for_timeout"] = int(config["wait_for_timeout"] * 1000)
+
+        # 导航超时交给crawl4ai，留出余量让它先于外层的硬超时干净地失败（标签页还能放回池子）
+        timeout = config.get("timeout", self.page_timeout)
+        if timeout:
+            inner = timeout - min(PAGE_TIMEOUT_MARGIN, timeout * 0.2)
+            wait_options["page_timeout"] = int(inner * 1000)
+
+        # 构建配置（艹，截图要重新渲染整页再base64编码，没人要就别截）
         run_config = CrawlerRunConfig(
             cache_mode=cache_mode,
             word_count_threshold=config.get("word_count_threshold", 1),
             extraction_strategy=extraction_strategy,
+            session_id=session_id,
+            base_url=base_url,
+            # raw HTML不开标签页，截不了图
+            screenshot=session_id is not None and "screenshot" in (config.get("include") or ()),
+            **wait_options,
         )
 
         return run_config
@@ -0,0 +1,159 @@
+"""
+提取进程池
+Extraction Process Pool
+
+这个SB模块把HTML解析和字段提取丢到进程池里跑，别卡住同时在服务API、驱动浏览器的事件循环
+This module runs HTML parsing and field extraction in a process pool so the event loop
+that serves the API and drives the browsers is never blocked by CPU-bound work
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Optional, Sequence
+
+from .extractor import ExtractionPlan, extract_pages
+
+
+def default_workers() -> int:
+    """默认进程数：留一个核给事件循环和浏览器"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+class ExtractionPool:
+    """
+    提取进程池
+    Extraction process pool
+
+    艹，几百KB的页面解析+提取要几十毫秒，在事件循环里跑所有请求都跟着等！
+    任务只传HTML的UTF-8字节和提取计划（计划pickle后只有字段定义，子进程按定义缓存编译结果），
+    批量提取时一个任务带多页，摊薄进程间通信的开销。
+    小页面的IPC比提取本身还贵，低于inline_below字节的直接在当前进程提取。
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        batch_size: int = 8,
+        inline_below: int = 16 * 1024,
+    ):
+        """
+        初始化进程池（子进程在第一次提交任务时才启动）
+
+        Args:
+            max_workers: 进程数，默认CPU核数-1
+            batch_size: 批量提取时每个任务带的页面数
+            inline_below: HTML小于这么多字节时不进进程池
+        """
+        if batch_size < 1:
+            raise ValueError("艹，batch_size至少为1")
+
+        self.max_workers = max_workers or default_workers()
+        self.batch_size = batch_size
+        self.inline_below = inline_below
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._stats = {"pages": 0, "inline": 0, "jobs": 0, "broken": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 艹，别fork！父进程开着事件循环、浏览器和一堆线程，fork出来的子进程会出事
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _submit(
+        self,
+        plan: ExtractionPlan,
+        pages: list[tuple],
+    ) -> list[dict[str, Any]]:
+        """提交一个任务，进程池坏了（子进程被OOM杀掉之类）就重建，这一批在当前进程提取"""
+        loop = asyncio.get_running_loop()
+        self._stats["jobs"] += 1
+        try:
+            return await loop.run_in_executor(self._get_executor(), extract_pages, plan, pages)
+        except BrokenProcessPool:
+            self._stats["broken"] += 1
+            broken, self._executor = self._executor, None
+            if broken is not None:
+                broken.shutdown(wait=False, cancel_futures=True)
+            return extract_pages(plan, pages)
+
+    async def extract(
+        self,
+        plan: ExtractionPlan,
+        html: str,
+        base_url: Optional[str] = None,
+        markdown: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        提取单个页面
+        Extract one page
+
+        Args:
+            plan: 提取计划
+            html: 页面HTML
+            base_url: 页面URL
+            markdown: 页面markdown（计划里有正则字段时才传给子进程）
+
+        Returns:
+            dict: 字段名 -> 值
+        """
+        self._stats["pages"] += 1
+        data = html.encode("utf-8")
+        markdown = markdown if plan.needs_markdown else None
+        if len(data) < self.inline_below:
+            self._stats["inline"] += 1
+            return plan.extract(data, base_url, markdown)
+        return (await self._submit(plan, [(data, base_url, markdown)]))[0]
+
+    async def extract_many(
+        self,
+        plan: ExtractionPlan,
+        pages: Sequence[tuple],
+    ) -> list[dict[str, Any]]:
+        """
+        批量提取，每batch_size页一个任务，各任务并行
+        Extract many pages, batch_size pages per job, jobs run in parallel
+
+        Args:
+            plan: 提取计划
+            pages: [(HTML, 页面URL)] 或 [(HTML, 页面URL, markdown)]
+
+        Returns:
+            list: 每页的提取结果，顺序与输入一致
+        """
+        self._stats["pages"] += len(pages)
+        encoded = [
+            (html.encode("utf-8"), base_url, markdown[0] if markdown and plan.needs_markdown else None)
+            for html, base_url, *markdown in pages
+        ]
+        if sum(len(page[0]) for page in encoded) < self.inline_below:
+            self._stats["inline"] += len(pages)
+            return extract_pages(plan, encoded)
+
+        batches = [
+            encoded[start:start + self.batch_size]
+            for start in range(0, len(encoded), self.batch_size)
+        ]
+        results = await asyncio.gather(*(self._submit(plan, batch) for batch in batches))
+        return [data for batch in results for data in batch]
+
+    def close(self) -> None:
+        """关闭进程池（排队的任务取消，不等子进程退出，别卡住事件循环）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取提取统计
+        Get extraction statistics
+
+        Returns:
+            dict: 页面数、在当前进程提取的页面数、任务数、进程池重建次数
+        """
+        return {**self._stats, "workers": self.max_workers}
@@ -0,0 +1,539 @@
+"""
+字段提取
+Field Extraction
+
+这个SB模块把模板的提取字段（CSS/XPath/正则）编译一次，HTML只解析一次就提取出所有字段
+This module compiles template extraction fields (CSS, XPath or regex) once
+so the HTML is parsed once and every field is evaluated against the same tree
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+from urllib.parse import urljoin
+
+from cssselect import HTMLTranslator, SelectorError, parse as parse_css
+from lxml import etree
+
+
+# 艹，cssselect的HTML翻译器按HTML规则处理大小写和:checked之类的伪类
+_TRANSLATOR = HTMLTranslator()
+
+_NUMBER_RE = re.compile(r"-?\d[\d,]*(?:\.\d+)?|-?\.\d+")
+
+# 选择器类型：css/xpath在解析好的文档上求值，regex在markdown（没有就是文档文本）上匹配
+SELECTOR_TYPES = ("css", "xpath", "regex")
+
+# 编译计划的缓存键：(name, selector, type, attribute, multiple, required, limit, selector_type)
+FieldSpec = tuple[str, str, str, Optional[str], bool, bool, Optional[int], str]
+
+
+def compile_selector(selector: str) -> etree.XPath:
+    """
+    把CSS选择器编译成lxml的XPath对象
+    Compile a CSS selector into an lxml XPath object
+
+    Raises:
+        ValueError: 选择器语法错误
+    """
+    try:
+        return etree.XPath(_TRANSLATOR.css_to_xpath(selector))
+    except SelectorError as e:
+        raise ValueError(f"艹，无效的CSS选择器 {selector!r}: {str(e)}") from e
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(selector: str, selector_type: str = "css") -> Any:
+    """
+    编译选择器表达式（跨模板、跨请求共享缓存，同一个表达式只编译一次）
+    Compile a selector expression (cached across templates and requests)
+
+    Args:
+        selector: 选择器表达式
+        selector_type: css/xpath/regex
+
+    Returns:
+        css/xpath返回etree.XPath，regex返回re.Pattern（多行模式，^和$按行匹配）
+
+    Raises:
+        ValueError: 表达式语法错误或不支持的选择器类型
+    """
+    if selector_type == "css":
+        return compile_selector(selector)
+    if selector_type == "xpath":
+        try:
+            # 艹，smart string带着整棵树的引用，结果要送回主进程，只要普通字符串
+            return etree.XPath(selector, smart_strings=False)
+        except etree.XPathError as e:
+            raise ValueError(f"艹，无效的XPath {selector!r}: {str(e)}") from e
+    if selector_type == "regex":
+        try:
+            return re.compile(selector, re.MULTILINE)
+        except re.error as e:
+            raise ValueError(f"艹，无效的正则表达式 {selector!r}: {str(e)}") from e
+    raise ValueError(f"艹，无效的选择器类型: {selector_type}，必须是: {SELECTOR_TYPES}")
+
+
+def _text(node: Any) -> str:
+    """元素的文本（空白压成一个空格）"""
+    if isinstance(node, str):
+        return " ".join(node.split())
+    return " ".join("".join(node.itertext()).split())
+
+
+def parse_number(text: Optional[str]) -> Optional[float]:
+    """从文本里取第一个数字（去掉千分位逗号），没有返回None"""
+    if not text:
+        return None
+    match = _NUMBER_RE.search(text)
+    if match is None:
+        return None
+    return float(match.group().replace(",", ""))
+
+
+def _url(node: Any, attributes: tuple[str, ...], base_url: Optional[str]) -> Optional[str]:
+    """元素的链接/图片地址：先看自己的属性，没有再找第一个带属性的后代"""
+    if isinstance(node, str):
+        value = node
+    else:
+        value = next((node.get(a) for a in attributes if node.get(a)), None)
+        if value is None:
+            for child in node.iterdescendants():
+                value = next((child.get(a) for a in attributes if child.get(a)), None)
+                if value:
+                    break
+    if not value:
+        return None
+    value = value.strip()
+    return urljoin(base_url, value) if base_url else value
+
+
+# 属性选择器的比较方式（值都是非空字符串，空值的^=、$=、*=按CSS规范什么都不匹配）
+_ATTR_OPS = {
+    "=": lambda actual, value: actual == value,
+    "~=": lambda actual, value: value in actual.split(),
+    "|=": lambda actual, value: actual == value or actual.startswith(value + "-"),
+    "^=": lambda actual, value: bool(value) and actual.startswith(value),
+    "$=": lambda actual, value: bool(value) and actual.endswith(value),
+    "*=": lambda actual, value: bool(value) and value in actual,
+}
+
+
+class _Compound:
+    """一个复合选择器（tag#id.class[attr]），直接在元素上比对，不走XPath"""
+
+    __slots__ = ("tag", "id", "classes", "attrs")
+
+    def __init__(self):
+        self.tag: Optional[str] = None
+        self.id: Optional[str] = None
+        self.classes: frozenset[str] = frozenset()
+        self.attrs: list[tuple[str, str, Optional[str]]] = []
+
+    def matches(self, element: Any) -> bool:
+        if self.tag is not None and element.tag != self.tag:
+            return False
+        if self.id is not None and element.get("id") != self.id:
+            return False
+        if self.classes:
+            classes = element.get("class")
+            if not classes or not self.classes.issubset(classes.split()):
+                return False
+        for name, op, value in self.attrs:
+            actual = element.get(name)
+            if actual is None or (op != "exists" and not _ATTR_OPS[op](actual, value)):
+                return False
+        return True
+
+
+def _compound(tree: Any) -> Optional[_Compound]:
+    """cssselect的语法树 -> _Compound，有伪类之类处理不了的返回None"""
+    compound = _Compound()
+    classes = set()
+    while True:
+        kind = type(tree).__name__
+        if kind == "Element":
+            if tree.element is not None:
+                compound.tag = tree.element.lower()
+            compound.classes = frozenset(classes)
+            return compound
+        if kind == "Class":
+            classes.add(tree.class_name)
+        elif kind == "Hash":
+            compound.id = tree.id
+        elif kind == "Attrib" and tree.namespace is None and tree.operator in ("exists", *_ATTR_OPS):
+            value = tree.value.value if tree.value is not None else None
+            compound.attrs.append((tree.attrib.lower(), tree.operator, value))
+        else:
+            return None
+        tree = tree.selector
+
+
+class _Chain:
+    """
+    带后代（空格）和子（>）组合符的选择器，从右往左匹配
+
+    只有最右边的复合选择器匹配上的元素才往上查祖先，大部分元素一次比对就排除了
+    """
+
+    __slots__ = ("compounds", "combinators")
+
+    def __init__(self, compounds: list[_Compound], combinators: list[str]):
+        self.compounds = compounds  # 从右到左
+        self.combinators = combinators
+
+    @property
+    def key(self) -> str:
+        """按最右边的复合选择器分桶：#id > .class > tag > *"""
+        last = self.compounds[0]
+        if last.id is not None:
+            return "#" + last.id
+        if last.classes:
+            return "." + min(last.classes)
+        return last.tag or "*"
+
+    def matches(self, element: Any, index: int = 0) -> bool:
+        if index == 0 and not self.compounds[0].matches(element):
+            return False
+        if index + 1 == len(self.compounds):
+            return True
+
+        compound = self.compounds[index + 1]
+        if self.combinators[index] == ">":
+            parent = element.getparent()
+            return parent is not None and compound.matches(parent) and self.matches(parent, index + 1)
+        for ancestor in element.iterancestors():
+            if compound.matches(ancestor) and self.matches(ancestor, index + 1):
+                return True
+        return False
+
+
+def compile_chains(selector: str) -> Optional[list[_Chain]]:
+    """
+    把CSS选择器编译成能在一次遍历里直接比对的形式
+    Compile a CSS selector into chains matchable during a single tree walk
+
+    Returns:
+        list: 逗号分隔的每一组各一个_Chain；有伪类、+、~等处理不了的语法时返回None（走XPath）
+    """
+    try:
+        selectors = parse_css(selector)
+    except SelectorError:
+        return None
+
+    chains = []
+    for parsed in selectors:
+        if parsed.pseudo_element is not None:
+            return None
+        compounds, combinators = [], []
+        tree = parsed.parsed_tree
+        while type(tree).__name__ == "CombinedSelector":
+            if tree.combinator not in (" ", ">"):
+                return None
+            compound = _compound(tree.subselector)
+            if compound is None:
+                return None
+            compounds.append(compound)
+            combinators.append(tree.combinator)
+            tree = tree.selector
+        compound = _compound(tree)
+        if compound is None:
+            return None
+        compounds.append(compound)
+        chains.append(_Chain(compounds, combinators))
+    return chains
+
+
+class CompiledField:
+    """
+    编译好的提取字段
+    Compiled extraction field
+    """
+
+    __slots__ = (
+        "name", "type", "attribute", "multiple", "required", "limit", "selector_type",
+        "chains", "_xpath", "_pattern",
+    )
+
+    def __init__(self, spec: FieldSpec):
+        name, selector, type_, attribute, multiple, required, limit, selector_type = spec
+        self.name = name
+        self.type = type_
+        self.attribute = attribute
+        self.multiple = multiple
+        self.required = required
+        self.limit = limit
+        self.selector_type = selector_type
+        self.chains = None
+        self._xpath = None
+        self._pattern = None
+        if selector_type == "regex":
+            self._pattern = compile_expression(selector, "regex")
+        else:
+            self._xpath = compile_expression(selector, selector_type)
+            if selector_type == "css":
+                # 能直接比对的选择器在共享遍历里求值，其余的走XPath
+                self.chains = compile_chains(selector)
+
+    def value(self, node: Any, base_url: Optional[str]) -> Any:
+        """从匹配到的节点取值"""
+        if self.type == "text":
+            return _text(node) or None
+        if self.type == "number":
+            return parse_number(_text(node))
+        if self.type == "link":
+            return _url(node, ("href",), base_url)
+        if self.type == "image":
+            # 懒加载的图片真实地址一般在data-src里
+            return _url(node, ("src", "data-src", "data-original"), base_url)
+        if isinstance(node, str):
+            return node
+        return node.get(self.attribute)
+
+    def collect(self, values: list, node: Any, base_url: Optional[str]) -> bool:
+        """
+        收下一个匹配节点的值
+
+        Returns:
+            bool: 这个字段是否已经取够了（单值取到一个，multiple到了limit）
+        """
+        value = self.value(node, base_url)
+        if value is not None:
+            values.append(value)
+        if not self.multiple:
+            return bool(values)
+        return bool(self.limit) and len(values) >= self.limit
+
+    def finish(self, values: list) -> Any:
+        """收集到的值 -> 字段结果"""
+        if self.multiple:
+            return values
+        return values[0] if values else None
+
+    def evaluate(self, tree: Any, base_url: Optional[str] = None) -> Any:
+        """
+        用XPath在解析好的文档上单独求值
+
+        Returns:
+            单值字段返回第一个非空值（没有为None），multiple字段返回非空值列表
+        """
+        nodes = self._xpath(tree)
+        if not isinstance(nodes, list):
+            # count()、string()之类的XPath返回的是单个数字/字符串/布尔
+            nodes = [] if nodes is None or nodes == "" else [str(nodes)]
+        values: list = []
+        for node in nodes:
+            if self.collect(values, node, base_url):
+                break
+        return self.finish(values)
+
+    def search(self, text: str, base_url: Optional[str] = None) -> Any:
+        """
+        用正则在文本上匹配（有分组取第一个分组，没有取整个匹配）
+
+        Returns:
+            同evaluate
+        """
+        values: list = []
+        groups = self._pattern.groups
+        for match in self._pattern.finditer(text):
+            if self.collect(values, match.group(1) if groups else match.group(), base_url):
+                break
+        return self.finish(values)
+
+
+class ExtractionPlan:
+    """
+    提取计划（一个模板编译一次）
+    Extraction plan (compiled once per template)
+
+    艹，每次提取都重新解析选择器、每个字段各解析一遍HTML纯属浪费！
+    HTML用lxml（C实现）解析一次；简单选择器（标签/id/class/属性，加后代和子组合符）
+    按最右边的复合选择器分桶，所有字段在同一次遍历里比对，单值字段取到就不再比对，
+    全部取够提前结束遍历；剩下的复杂选择器和XPath字段用预编译的XPath求值；
+    正则字段直接在爬取结果现成的markdown字符串上匹配，不用再解码一遍HTML。
+    """
+
+    __slots__ = ("specs", "fields", "needs_markdown", "_buckets", "_walked")
+
+    def __init__(self, specs: Iterable[FieldSpec]):
+        self.specs = tuple(specs)
+        self.fields = tuple(CompiledField(spec) for spec in self.specs)
+        # 分桶键 -> [(字段下标, 链)]
+        self._buckets: dict[str, list[tuple[int, _Chain]]] = {}
+        self._walked: list[int] = []
+        # 有正则字段时才需要markdown（进程池没必要多传一份）
+        self.needs_markdown = any(f.selector_type == "regex" for f in self.fields)
+        for index, field in enumerate(self.fields):
+            if field.chains is None:
+                continue
+            self._walked.append(index)
+            for chain in field.chains:
+                self._buckets.setdefault(chain.key, []).append((index, chain))
+
+    def __reduce__(self):
+        # 编译好的XPath不能pickle，只传字段定义，子进程里按定义从缓存取（每个进程只编译一次）
+        return _compile, (self.specs,)
+
+    def _walk(self, tree: Any, base_url: Optional[str]) -> dict[int, list]:
+        """一次遍历求出所有简单选择器字段的值"""
+        collected = {index: [] for index in self._walked}
+        if not collected:
+            return collected
+
+        buckets = self._buckets
+        wildcard = buckets.get("*", ())
+        fields = self.fields
+        open_fields = set(collected)
+
+        for element in tree.iter(etree.Element):
+            candidates = []
+            bucket = buckets.get(element.tag)
+            if bucket:
+                candidates.extend(bucket)
+            element_id = element.get("id")
+            if element_id is not None:
+                bucket = buckets.get("#" + element_id)
+                if bucket:
+                    candidates.extend(bucket)
+            classes = element.get("class")
+            if classes:
+                for name in classes.split():
+                    bucket = buckets.get("." + name)
+                    if bucket:
+                        candidates.extend(bucket)
+            if wildcard:
+                candidates.extend(wildcard)
+            if not candidates:
+                continue
+
+            matched = set()
+            for index, chain in candidates:
+                # 同一个元素被同一字段的多组选择器命中时只算一次
+                if index in matched or index not in open_fields or not chain.matches(element):
+                    continue
+                matched.add(index)
+                if fields[index].collect(collected[index], element, base_url):
+                    open_fields.discard(index)
+            if matched and not open_fields:
+                break
+
+        return collected
+
+    def extract(
+        self,
+        html: str | bytes,
+        base_url: Optional[str] = None,
+        markdown: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        从HTML提取所有字段
+        Extract every field from HTML
+
+        Args:
+            html: 页面HTML（bytes按UTF-8解析）
+            base_url: 页面URL（把相对链接转成绝对链接）
+            markdown: 页面markdown，正则字段在它上面匹配（没有就用文档文本）
+
+        Returns:
+            dict: 字段名 -> 值（没取到的单值字段为None，multiple字段为空列表）
+        """
+        tree = parse_html(html)
+        if self.needs_markdown and markdown is None:
+            markdown = "".join(tree.itertext()) if tree is not None else ""
+
+        walked = self._walk(tree, base_url) if tree is not None else {}
+        data = {}
+        for index, field in enumerate(self.fields):
+            if field.selector_type == "regex":
+                data[field.name] = field.search(markdown, base_url)
+            elif index in walked:
+                data[field.name] = field.finish(walked[index])
+            elif tree is not None:
+                data[field.name] = field.evaluate(tree, base_url)
+            else:
+                data[field.name] = field.finish([])
+        return data
+
+    def missing_required(self, data: dict[str, Any]) -> list[str]:
+        """没取到值的必需字段"""
+        return [f.name for f in self.fields if f.required and not data.get(f.name)]
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+
+def parse_html(html: str | bytes) -> Any:
+    """
+    解析HTML，空文档或解析失败返回None
+
+    艹，别用lxml.html！它给每个元素查一次Python层的元素类，遍历慢一倍，这里只要普通元素
+    """
+    if not html or not html.strip():
+        return None
+    # 解析器不是线程安全的，每次新建一个（很便宜）
+    if isinstance(html, bytes):
+        try:
+            return etree.fromstring(html, etree.HTMLParser(encoding="utf-8"))
+        except etree.XMLSyntaxError:
+            return None
+    parser = etree.HTMLParser()
+    try:
+        return etree.fromstring(html, parser)
+    except ValueError:
+        # 带encoding声明的str会被lxml拒绝，转成bytes让它自己识别
+        return etree.fromstring(html.encode("utf-8"), parser)
+    except etree.XMLSyntaxError:
+        return None
+
+
+def field_spec(field: Any) -> FieldSpec:
+    """ExtractField -> 编译缓存键"""
+    return (
+        field.name,
+        field.selector,
+        field.type,
+        field.attribute,
+        field.multiple,
+        field.required,
+        getattr(field, "limit", None),
+        getattr(field, "selector_type", "css"),
+    )
+
+
+@lru_cache(maxsize=256)
+def _compile(specs: tuple[FieldSpec, ...]) -> ExtractionPlan:
+    return ExtractionPlan(specs)
+
+
+def compile_plan(fields: Iterable[Any]) -> Optional[ExtractionPlan]:
+    """
+    把模板的提取字段编译成提取计划（字段定义相同的模板共享同一个计划）
+    Compile template fields into an extraction plan (cached by field definitions)
+
+    Args:
+        fields: ExtractField列表
+
+    Returns:
+        ExtractionPlan: 提取计划，没有字段时返回None
+    """
+    specs = tuple(field_spec(f) for f in fields)
+    return _compile(specs) if specs else None
+
+
+def extract_pages(
+    plan: ExtractionPlan,
+    pages: list[tuple],
+) -> list[dict[str, Any]]:
+    """
+    用同一个计划提取一批页面（进程池的任务函数，一次IPC处理多页）
+    Extract a batch of pages with one plan (process pool job, many pages per IPC round trip)
+
+    Args:
+        plan: 提取计划
+        pages: [(HTML, 页面URL)] 或 [(HTML, 页面URL, markdown)]
+
+    Returns:
+        list: 每页的提取结果，顺序与输入一致
+    """
+    return [plan.extract(*page) for page in pages]
@@ -0,0 +1,134 @@
+"""
+深度爬取待爬队列
+Deep Crawl Frontier
+
+这个SB模块管理深度爬取时待爬取的URL队列
+This module manages the queue of URLs waiting to be crawled during a deep crawl
+"""
+
+import heapq
+import itertools
+from collections import deque
+from typing import Optional
+
+
+class FrontierEntry:
+    """
+    待爬条目
+    Frontier entry
+    """
+
+    __slots__ = ("url", "depth", "parent", "score")
+
+    def __init__(
+        self,
+        url: str,
+        depth: int,
+        parent: Optional[str] = None,
+        score: float = 0.0,
+    ):
+        self.url = url
+        self.depth = depth
+        self.parent = parent
+        self.score = score
+
+
+class BFSFrontier:
+    """
+    广度优先队列（先进先出，按层级出队）
+    Breadth-first frontier (FIFO, dequeued level by level)
+    """
+
+    def __init__(self):
+        self._queue: deque[FrontierEntry] = deque()
+
+    def push(self, entry: FrontierEntry) -> None:
+        """加入待爬条目"""
+        self._queue.append(entry)
+
+    def pop(self) -> FrontierEntry:
+        """取出下一个待爬条目"""
+        return self._queue.popleft()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+
+class DFSFrontier(BFSFrontier):
+    """
+    深度优先队列（后进先出）
+    Depth-first frontier (LIFO)
+    """
+
+    def pop(self) -> FrontierEntry:
+        """取出最近加入的条目"""
+        return self._queue.pop()
+
+
+class BestFirstFrontier:
+    """
+    最优优先队列（按score从高到低出队，同分先进先出）
+    Best-first frontier (highest score first, FIFO among ties)
+
+    艹，分数会随着入链数变化，用惰性删除：改分就再压一条，出队时跳过过期的
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, FrontierEntry]] = []
+        # url -> 当前有效的条目（堆里其他同url条目都算过期）
+        self._entries: dict[str, FrontierEntry] = {}
+        self._counter = itertools.count()
+
+    def push(self, entry: FrontierEntry) -> None:
+        """加入待爬条目"""
+        self._entries[entry.url] = entry
+        heapq.heappush(self._heap, (-entry.score, next(self._counter), entry))
+
+    def reprioritize(self, url: str, score: float) -> bool:
+        """
+        更新仍在队列中的URL的分数
+
+        Returns:
+            bool: URL是否还在队列中
+        """
+        old = self._entries.get(url)
+        if old is None:
+            return False
+        if score != old.score:
+            self.push(FrontierEntry(url, old.depth, old.parent, score))
+        return True
+
+    def pop(self) -> FrontierEntry:
+        """取出分数最高的条目"""
+        while self._heap:
+            _, _, entry = heapq.heappop(self._heap)
+            if self._entries.get(entry.url) is entry:
+                del self._entries[entry.url]
+                return entry
+        raise IndexError("pop from empty frontier")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def make_frontier(strategy: str):
+    """
+    按策略创建待爬队列
+    Create a frontier for the given strategy
+
+    Args:
+        strategy: 爬取策略（bfs/dfs/best_first）
+
+    Returns:
+        待爬队列实例
+
+    Raises:
+        ValueError: 未知策略
+    """
+    if strategy == "bfs":
+        return BFSFrontier()
+    if strategy == "dfs":
+        return DFSFrontier()
+    if strategy == "best_first":
+        return BestFirstFrontier()
+    raise ValueError(f"艹，未知的爬取策略: {strategy}")
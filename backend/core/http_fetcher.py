@@ -0,0 +1,232 @@
+"""
+HTTP快速通道
+HTTP Fast Path
+
+这个SB模块用连接池化的httpx客户端直接抓取服务端渲染的页面，跳过浏览器
+This module fetches server-rendered pages with a pooled httpx client, skipping the browser
+"""
+
+import re
+from typing import Any, Iterable, Optional
+
+import httpx
+
+from .extractor import compile_expression, parse_html
+from .politeness import get_host
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    # 艹，没装h2就只能用HTTP/1.1，keep-alive照样有
+    HTTP2_AVAILABLE = False
+
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    # 没有brotli解不了br，别让服务器发过来
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# 页面可见文字少于这个字数，又带脚本，基本就是靠JS渲染的
+MIN_STATIC_TEXT_CHARS = 200
+
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style|noscript|template)\b.*?</\1\s*>", re.I | re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
+_EMPTY_APP_ROOT_RE = re.compile(
+    r"<div[^>]+id=[\"'](root|app|__next|__nuxt)[\"'][^>]*>\s*</div>", re.I
+)
+_NOSCRIPT_JS_RE = re.compile(
+    r"<noscript[^>]*>[^<]*(enable javascript|requires javascript|javascript is disabled|"
+    r"启用javascript|开启javascript)",
+    re.I,
+)
+
+
+def visible_text_length(html: str) -> int:
+    """页面可见文字的字数（去掉脚本、样式和标签，空白压成一个）"""
+    return len(_WS_RE.sub(" ", _TAG_RE.sub(" ", _SCRIPT_STYLE_RE.sub(" ", html))).strip())
+
+
+def needs_js_rendering(html: str, text_chars: Optional[int] = None) -> bool:
+    """
+    判断页面是否需要浏览器执行JS才能拿到内容
+    Decide whether a page needs JS rendering to expose its content
+
+    Args:
+        html: 原始HTML
+        text_chars: 已经算好的可见字数（可选，省一遍正则）
+
+    Returns:
+        bool: 是否需要浏览器渲染
+    """
+    if _NOSCRIPT_JS_RE.search(html) or _EMPTY_APP_ROOT_RE.search(html):
+        return True
+
+    if text_chars is None:
+        text_chars = visible_text_length(html)
+    return text_chars < MIN_STATIC_TEXT_CHARS and "<script" in html.lower()
+
+
+def missing_selectors(html: str, selectors: Iterable[str]) -> list[str]:
+    """
+    静态HTML里一个元素都匹配不到的CSS选择器
+    Return the CSS selectors that match nothing in static HTML
+
+    艹，启发式判断页面"像是静态的"不代表要的数据在HTML里，就绪条件要的元素找不到就得上浏览器
+
+    Args:
+        html: 原始HTML
+        selectors: CSS选择器（写错的当作已出现，跟浏览器里的就绪条件一致）
+
+    Returns:
+        list: 没匹配到的选择器
+    """
+    selectors = list(selectors)
+    if not selectors:
+        return []
+    root = parse_html(html)
+    missing = []
+    for selector in selectors:
+        try:
+            xpath = compile_expression(selector, "css")
+        except ValueError:
+            continue
+        if root is None or not xpath(root):
+            missing.append(selector)
+    return missing
+
+
+class RenderModeLearner:
+    """
+    按域名学习是否需要浏览器渲染
+    Learn per host whether browser rendering is needed
+
+    艹，一个域名探测出要JS，后面就直接走浏览器；每隔reprobe_every次再用HTTP试一次，站点改版也能跟上。
+    反过来也一样：判成静态的域名每隔reprobe_every次走一次浏览器，渲染后的可见文字
+    比HTTP拿到的多出一大截（check_rendered），说明内容是JS填的，改记为需要JS。
+    """
+
+    def __init__(self, reprobe_every: int = 50):
+        self.reprobe_every = reprobe_every
+        # host -> [是否需要JS, 自上次探测以来的次数, 上次HTTP拿到的可见字数]
+        self._hosts: dict[str, list] = {}
+        self._stats = {"http": 0, "browser": 0, "fallback": 0, "relearned": 0}
+
+    def prefer_http(self, url: str) -> bool:
+        """这个域名这次是否先试HTTP（到了复查的那次反过来）"""
+        state = self._hosts.get(get_host(url))
+        if state is None:
+            return True
+        state[1] += 1
+        if state[1] >= self.reprobe_every:
+            state[1] = 0
+            return state[0]
+        return not state[0]
+
+    def record(self, url: str, needs_js: bool, text_chars: int = 0) -> None:
+        """记录一次探测结果（结论没变时不重置复查计数）"""
+        host = get_host(url)
+        state = self._hosts.get(host)
+        if state is None or state[0] != needs_js:
+            self._hosts[host] = [needs_js, 0, text_chars]
+        else:
+            state[2] = text_chars
+
+    def check_rendered(self, url: str, html: str) -> bool:
+        """
+        静态域名的浏览器复查：渲染后的可见文字远多于HTTP拿到的，改记为需要JS
+
+        Returns:
+            bool: 是否改记为需要JS
+        """
+        state = self._hosts.get(get_host(url))
+        if state is None or state[0]:
+            return False
+        if visible_text_length(html) <= 2 * state[2] + MIN_STATIC_TEXT_CHARS:
+            return False
+        self.record(url, needs_js=True)
+        self._stats["relearned"] += 1
+        return True
+
+    def count(self, outcome: str) -> None:
+        """计数：http/browser/fallback"""
+        self._stats[outcome] += 1
+
+    def stats(self) -> dict[str, Any]:
+        """获取统计"""
+        return {
+            **self._stats,
+            "js_hosts": sum(1 for state in self._hosts.values() if state[0]),
+            "static_hosts": sum(1 for state in self._hosts.values() if not state[0]),
+        }
+
+
+class HttpFetcher:
+    """
+    连接池化的HTTP抓取器
+    Pooled HTTP fetcher
+
+    keep-alive + HTTP/2（装了h2时）+ gzip/br压缩，整个进程共用一个
+    """
+
+    def __init__(
+        self,
+        timeout: float = 15.0,
+        max_connections: int = 100,
+        user_agent: str = DEFAULT_USER_AGENT,
+    ):
+        """
+        初始化抓取器
+
+        Args:
+            timeout: 单次请求超时（秒）
+            max_connections: 连接池最大连接数
+            user_agent: User-Agent
+        """
+        self.learner = RenderModeLearner()
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            headers={
+                "User-Agent": user_agent,
+                "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+                "Accept-Encoding": ACCEPT_ENCODING,
+            },
+        )
+
+    async def fetch(self, url: str, headers: Optional[dict[str, str]] = None) -> httpx.Response:
+        """
+        抓取URL
+        Fetch URL
+
+        Args:
+            url: 目标URL
+            headers: 额外请求头
+
+        Returns:
+            httpx.Response: 响应
+        """
+        return await self._client.get(url, headers=headers)
+
+    async def close(self) -> None:
+        """关闭连接池"""
+        await self._client.aclose()
+
+
+def is_html_response(response: httpx.Response) -> bool:
+    """响应是否是HTML"""
+    content_type = response.headers.get("content-type", "")
+    return "html" in content_type or not content_type
@@ -0,0 +1,548 @@
+"""
+字段归一化
+Field Normalization
+
+这个SB模块把提取出来的数字、价格、日期文本整列转换成数值和ISO日期，格式按域名识别一次就缓存
+This module converts whole columns of extracted number, price and date strings into
+numbers and ISO dates, detecting each domain's formats once and caching them
+"""
+
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, Sequence
+
+from .politeness import get_host
+
+
+# 支持的归一化类型
+NORMALIZE_KINDS = ("number", "price", "date")
+
+# 艹，整列拼成一个字符串处理，记录之间用这个分隔（正常文本里不会有）
+_SEP = "\x1e"
+
+# 一条记录里的第一个数字（前面的"-"后面紧跟数字才算负号，".5"这种省略整数部分的也算），
+# 每条记录正好一个匹配。数字后面紧跟空格再跟数字（"."小数点的列里的"1 234,5"）分不清是不是
+# 千分位，宁可不要也别取成1
+# 艹，前缀写成展开的循环，别写(?:a|b)*，一百万条记录慢一倍
+_RECORD_PREFIX = (
+    r"[^\x1e\d.-]*(?:[.-](?!\.?\d)[^\x1e\d.-]*)*"
+    r"(-?\d*\.?\d+(?!\.?\d|[ \t]\d))?"
+)
+_RECORD_RE = re.compile(_RECORD_PREFIX + r"[^\x1e]*(?:\x1e|\Z)")
+# 列里有万/亿时才用带单位分组的版本（多一个分组findall就要建元组）
+_RECORD_UNIT_RE = re.compile(_RECORD_PREFIX + r"[ \t]*([万亿])?[^\x1e]*(?:\x1e|\Z)")
+_MULTIPLIERS = {"万": 1e4, "亿": 1e8}
+
+# 带分隔符的数字串，用来识别小数点是"."还是","
+_NUMBER_TOKEN_RE = re.compile("\\d[\\d.,'\u00a0\u202f ]*\\d|\\d")
+
+# 货币符号和代码（按出现顺序取第一个）
+_CURRENCY_RE = re.compile(
+    r"US\$|HK\$|NT\$|C\$|A\$|R\$|[$€£¥￥₩₹₽₺₫฿]|\b(?:USD|EUR|GBP|JPY|CNY|RMB|HKD|TWD|KRW|INR|RUB|AUD|CAD|CHF)\b|元"
+)
+_CURRENCY_CODES = {
+    "$": "USD", "US$": "USD", "€": "EUR", "£": "GBP", "¥": "CNY", "￥": "CNY", "元": "CNY",
+    "RMB": "CNY", "HK$": "HKD", "NT$": "TWD", "C$": "CAD", "A$": "AUD", "R$": "BRL",
+    "₩": "KRW", "₹": "INR", "₽": "RUB", "₺": "TRY", "₫": "VND", "฿": "THB",
+}
+
+# 两种小数点写法各一组替换：千分位和空白删掉，小数点统一成"."，
+# 排版用的负号（U+2212）和短横线（U+2013）统一成"-"
+# 艹，别用str.translate，带删除的映射表在非ASCII字符串上逐字符查字典，比几次replace慢二十倍
+_MINUS_SIGNS = (("\u2212", "-"), ("\u2013", "-"))
+_REPLACEMENTS = {
+    ".": ((",", ""), ("'", ""), ("\u00a0", ""), ("\u202f", "")) + _MINUS_SIGNS,
+    # 小数点是","的地区千分位常用空格，普通空格也删
+    ",": ((".", ""), ("'", ""), ("\u00a0", ""), ("\u202f", ""), (" ", ""), (",", "."))
+    + _MINUS_SIGNS,
+}
+
+
+def _vote_decimal(values: Sequence[str], sample: int = 200) -> Optional[str]:
+    """
+    从一列值里判断小数点是"."还是","，全是"1,299"这种分不清的返回None
+
+    两种符号都有时后出现的是小数点；只有一种、出现一次且后面不是3位数字时是小数点；
+    出现多次的是千分位
+    """
+    votes = {".": 0, ",": 0}
+    for value in values[:sample]:
+        match = _NUMBER_TOKEN_RE.search(value)
+        if match is None:
+            continue
+        token = match.group()
+        dot, comma = token.rfind("."), token.rfind(",")
+        if dot >= 0 and comma >= 0:
+            votes["." if dot > comma else ","] += 1
+            continue
+        mark = "." if dot >= 0 else "," if comma >= 0 else None
+        if mark is None:
+            continue
+        if token.count(mark) > 1:
+            votes["," if mark == "." else "."] += 1
+        elif len(token) - token.rfind(mark) - 1 != 3:
+            votes[mark] += 1
+    if votes["."] == votes[","]:
+        return None
+    return "." if votes["."] > votes[","] else ","
+
+
+# ==================== 日期 ====================
+
+_MONTHS = {
+    name: index
+    for index, names in enumerate((
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+        ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+        ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december"),
+    ), start=1)
+    for name in names
+}
+
+_RELATIVE_UNITS = {
+    "秒": "seconds", "second": "seconds", "分钟": "minutes", "minute": "minutes",
+    "小时": "hours", "hour": "hours", "天": "days", "day": "days",
+    "周": "weeks", "星期": "weeks", "week": "weeks",
+    "个月": "months", "月": "months", "month": "months", "年": "years", "year": "years",
+}
+_RELATIVE_WORDS = {
+    "刚刚": 0, "just now": 0, "今天": 0, "today": 0,
+    "昨天": 1, "yesterday": 1, "前天": 2,
+}
+
+
+def _iso(year: int, month: int, day: int, hour=None, minute=None, second=None, tz=None) -> Optional[str]:
+    """拼ISO 8601字符串，日期不合法返回None；没有时间只给日期"""
+    try:
+        if hour is None:
+            return datetime(year, month, day).date().isoformat()
+        moment = datetime(year, month, day, int(hour), int(minute or 0), int(second or 0))
+    except ValueError:
+        return None
+    text = moment.isoformat()
+    if tz:
+        text += "+00:00" if tz == "Z" else f"{tz[:3]}:{tz[-2:]}"
+    return text
+
+
+def _relative(amount: int, unit: str, now: datetime) -> str:
+    """N单位前 -> 时间点（按天及以上的只给日期）"""
+    unit = _RELATIVE_UNITS[unit]
+    if unit == "months":
+        moment = now - timedelta(days=30 * amount)
+    elif unit == "years":
+        moment = now - timedelta(days=365 * amount)
+    else:
+        moment = now - timedelta(**{unit: amount})
+    if unit in ("seconds", "minutes", "hours"):
+        return moment.replace(microsecond=0).isoformat()
+    return moment.date().isoformat()
+
+
+# 日期格式：(名字, 正则, 构造函数(match, now, day_first) -> ISO字符串)
+_DateFormat = tuple[str, re.Pattern, Callable[[re.Match, datetime, bool], Optional[str]]]
+
+_DATE_FORMATS: tuple[_DateFormat, ...] = (
+    (
+        "iso",
+        re.compile(
+            r"(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})"
+            r"(?:[T ]\s*(\d{1,2}):(\d{2})(?::(\d{2}))?(?:\.\d+)?\s*(Z|[+-]\d{2}:?\d{2})?)?"
+        ),
+        lambda m, now, day_first: _iso(int(m[1]), int(m[2]), int(m[3]), m[4], m[5], m[6], m[7]),
+    ),
+    (
+        "cjk",
+        re.compile(r"(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日(?:\s*(\d{1,2})[:：时](\d{2}))?"),
+        lambda m, now, day_first: _iso(int(m[1]), int(m[2]), int(m[3]), m[4], m[5]),
+    ),
+    (
+        "month_day_year",
+        re.compile(r"\b([A-Za-z]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})"),
+        lambda m, now, day_first: (
+            _iso(int(m[3]), _MONTHS[m[1].lower()], int(m[2])) if m[1].lower() in _MONTHS else None
+        ),
+    ),
+    (
+        "day_month_year",
+        re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9})\.?,?\s+(\d{4})"),
+        lambda m, now, day_first: (
+            _iso(int(m[3]), _MONTHS[m[2].lower()], int(m[1])) if m[2].lower() in _MONTHS else None
+        ),
+    ),
+    (
+        "numeric",
+        re.compile(r"\b(\d{1,2})[/.](\d{1,2})[/.](\d{4})\b"),
+        lambda m, now, day_first: (
+            _iso(int(m[3]), int(m[2]), int(m[1])) if day_first
+            else _iso(int(m[3]), int(m[1]), int(m[2]))
+        ),
+    ),
+    (
+        "relative",
+        re.compile(
+            r"(\d+)\s*(秒|分钟|小时|天|周|星期|个月|月|年)前"
+            r"|(\d+)\s+(second|minute|hour|day|week|month|year)s?\s+ago",
+            re.IGNORECASE,
+        ),
+        lambda m, now, day_first: _relative(
+            int(m[1] or m[3]), (m[2] or m[4]).lower(), now
+        ),
+    ),
+    (
+        "relative_word",
+        re.compile("|".join(_RELATIVE_WORDS), re.IGNORECASE),
+        lambda m, now, day_first: (
+            now.replace(microsecond=0).isoformat() if m[0].lower() in ("刚刚", "just now")
+            else (now - timedelta(days=_RELATIVE_WORDS[m[0].lower()])).date().isoformat()
+        ),
+    ),
+    (
+        "timestamp",
+        re.compile(r"^\s*(\d{10})(\d{3})?\s*$"),
+        lambda m, now, day_first: (
+            datetime.fromtimestamp(int(m[1]), timezone.utc).replace(tzinfo=None).isoformat()
+        ),
+    ),
+)
+
+
+class _DomainFormats:
+    """一个域名识别出来的格式"""
+
+    __slots__ = ("decimal", "date", "day_first", "currency")
+
+    def __init__(self):
+        self.decimal: Optional[str] = None
+        self.date: Optional[int] = None  # _DATE_FORMATS的下标
+        self.day_first: Optional[bool] = None
+        self.currency: Optional[str] = None
+
+
+class ColumnNormalizer:
+    """
+    整列归一化
+    Column normalizer
+
+    艹，一个值一个值地正则、替换、转float，几百万条监控价格全耗在Python循环上！
+    数字和价格整列拼成一个字符串，几次replace去掉千分位和空白、统一小数点，
+    再一次findall取出每条记录的数字，只剩float()是逐个调的。
+    小数点写法、货币、日期格式按(域名, 字段)识别一次就记住，后面的列直接用，不再挨个格式试。
+    艹，记住的小数点写法只用来兜底"1,299"这种分不清的列：每列都抽样投票，
+    列里有明确相反的证据（"4.5"、"12,50"）就按这一列的来，并改记新写法。
+    """
+
+    def __init__(self, max_domains: int = 10000):
+        """
+        初始化归一化器
+
+        Args:
+            max_domains: 最多记住多少个(域名, 字段)的格式（LRU淘汰）
+        """
+        self.max_domains = max_domains
+        self._domains: OrderedDict[tuple[str, Optional[str]], _DomainFormats] = OrderedDict()
+        self._stats = {"values": 0, "parsed": 0, "format_hits": 0, "format_misses": 0}
+
+    def _formats(self, domain: Optional[str], field: Optional[str] = None) -> _DomainFormats:
+        """(域名, 字段)的格式记录（没给域名时每次新建，不缓存）"""
+        if not domain:
+            return _DomainFormats()
+        key = (domain, field)
+        formats = self._domains.get(key)
+        if formats is None:
+            formats = self._domains[key] = _DomainFormats()
+            if len(self._domains) > self.max_domains:
+                self._domains.popitem(last=False)
+        else:
+            self._domains.move_to_end(key)
+        return formats
+
+    def numbers(
+        self,
+        values: Sequence[Any],
+        domain: Optional[str] = None,
+        field: Optional[str] = None,
+    ) -> list[Optional[float]]:
+        """
+        整列转数字（货币符号、千分位、地区小数点、万/亿）
+        Convert a column to numbers
+
+        Args:
+            values: 原始值（字符串；已经是数字的原样返回，None和取不到数字的为None）
+            domain: 来源域名（URL也行），用来缓存小数点写法
+            field: 字段名或列名，同一个域名下不同字段的写法分开记
+
+        Returns:
+            list: 与输入等长
+        """
+        return self._numbers(values, self._formats(_domain(domain), field))
+
+    def _numbers(self, values: Sequence[Any], formats: _DomainFormats) -> list[Optional[float]]:
+        self._stats["values"] += len(values)
+        # 艹，逐个值的Python循环能省就省：全是字符串（最常见）时不用记位置
+        positions = [i for i, value in enumerate(values) if isinstance(value, str)]
+        texts = values if len(positions) == len(values) else [values[i] for i in positions]
+        if not texts:
+            return [_as_float(value) for value in values]
+
+        vote = _vote_decimal(texts)
+        if vote is None:
+            # 全是"1,299"这种分不清的，按记住的写法算，没记住就按最常见的"."
+            decimal = formats.decimal or "."
+            hit = formats.decimal is not None
+        else:
+            # 这一列有明确证据，以它为准（跟记住的不一样就改记）
+            decimal = vote
+            hit = formats.decimal == vote
+            formats.decimal = vote
+        self._stats["format_hits" if hit else "format_misses"] += 1
+
+        joined = _SEP.join(texts)
+        for old, new in _REPLACEMENTS[decimal]:
+            joined = joined.replace(old, new)
+
+        # findall在末尾会多一个空匹配，按记录数截掉
+        if "万" in joined or "亿" in joined:
+            converted = [
+                (float(number) * _MULTIPLIERS[unit] if unit else float(number)) if number else None
+                for number, unit in _RECORD_UNIT_RE.findall(joined)[:len(texts)]
+            ]
+        else:
+            converted = [
+                float(number) if number else None
+                for number in _RECORD_RE.findall(joined)[:len(texts)]
+            ]
+        self._stats["parsed"] += len(converted) - converted.count(None)
+
+        if texts is values:
+            return converted
+        results = [_as_float(value) for value in values]
+        for position, value in zip(positions, converted):
+            results[position] = value
+        return results
+
+    def prices(
+        self,
+        values: Sequence[Any],
+        domain: Optional[str] = None,
+        field: Optional[str] = None,
+    ) -> tuple[list[Optional[float]], Optional[str]]:
+        """
+        整列转价格
+        Convert a column to prices
+
+        艹，同一个站点的价格基本是同一种货币，货币按列识别（列里第一个货币符号），按(域名, 字段)记住
+
+        Args:
+            values: 原始值
+            domain: 来源域名（URL也行）
+            field: 字段名或列名
+
+        Returns:
+            tuple: (金额列表, ISO货币代码或None)
+        """
+        formats = self._formats(_domain(domain), field)
+        if formats.currency is None:
+            texts = [value for value in values[:200] if isinstance(value, str)]
+            match = _CURRENCY_RE.search(_SEP.join(texts))
+            if match is not None:
+                symbol = match.group()
+                formats.currency = _CURRENCY_CODES.get(symbol, symbol)
+        return self._numbers(values, formats), formats.currency
+
+    def dates(
+        self,
+        values: Sequence[Any],
+        domain: Optional[str] = None,
+        now: Optional[datetime] = None,
+        field: Optional[str] = None,
+    ) -> list[Optional[str]]:
+        """
+        整列转ISO 8601日期（"3小时前"、"yesterday"这种相对时间按now算）
+        Convert a column to ISO 8601 dates
+
+        Args:
+            values: 原始值
+            domain: 来源域名（URL也行），用来缓存日期格式和日月顺序
+            now: 相对时间的基准，默认当前本地时间
+            field: 字段名或列名
+
+        Returns:
+            list: 与输入等长，认不出的为None
+        """
+        formats = self._formats(_domain(domain), field)
+        now = now or datetime.now().astimezone().replace(tzinfo=None)
+        texts = [value if isinstance(value, str) else None for value in values]
+        self._stats["values"] += len(values)
+
+        # 跟小数点一样：这一列能确定日月顺序就以它为准，确定不了才用记住的
+        day_first = _vote_day_first(texts)
+        if day_first is not None:
+            formats.day_first = day_first
+
+        results: list[Optional[str]] = []
+        counts: dict[int, int] = {}
+        cached = formats.date
+        for text in texts:
+            result = None
+            if text:
+                if cached is not None:
+                    result = _apply_format(cached, text, now, formats.day_first)
+                if result is None:
+                    for index in range(len(_DATE_FORMATS)):
+                        if index == cached:
+                            continue
+                        result = _apply_format(index, text, now, formats.day_first)
+                        if result is not None:
+                            counts[index] = counts.get(index, 0) + 1
+                            break
+                    self._stats["format_misses"] += 1
+                else:
+                    self._stats["format_hits"] += 1
+            results.append(result)
+
+        if counts and (cached is None or max(counts.values()) > len(values) // 2):
+            # 这一列大部分值换了格式（站点改版），跟着换
+            formats.date = max(counts, key=counts.get)
+        self._stats["parsed"] += sum(1 for result in results if result is not None)
+        return results
+
+    def normalize(
+        self,
+        kind: str,
+        values: Sequence[Any],
+        domain: Optional[str] = None,
+        field: Optional[str] = None,
+    ) -> tuple[list[Any], Optional[str]]:
+        """
+        按类型整列归一化
+        Normalize a column by kind
+
+        Args:
+            kind: number/price/date
+            values: 原始值
+            domain: 来源域名
+            field: 字段名或列名
+
+        Returns:
+            tuple: (归一化后的值, 货币代码；非price为None)
+        """
+        if kind == "price":
+            return self.prices(values, domain, field)
+        if kind == "number":
+            return self.numbers(values, domain, field), None
+        if kind == "date":
+            return self.dates(values, domain, field=field), None
+        raise ValueError(f"艹，无效的归一化类型: {kind}，必须是: {NORMALIZE_KINDS}")
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取统计
+        Get statistics
+
+        Returns:
+            dict: 处理的值数、成功转换数、格式缓存命中/未命中、记住的(域名, 字段)数
+        """
+        return {**self._stats, "domains": len(self._domains)}
+
+
+def _domain(domain: Optional[str]) -> Optional[str]:
+    """URL也能当域名传"""
+    if domain and "/" in domain:
+        return get_host(domain)
+    return domain
+
+
+def _as_float(value: Any) -> Optional[float]:
+    """已经是数字的原样转float（bool不算），其他为None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def _apply_format(index: int, text: str, now: datetime, day_first: bool) -> Optional[str]:
+    _, pattern, build = _DATE_FORMATS[index]
+    match = pattern.search(text)
+    return build(match, now, day_first) if match is not None else None
+
+
+def _vote_day_first(texts: Sequence[Optional[str]], sample: int = 200) -> Optional[bool]:
+    """纯数字日期（03/04/2024）是日在前还是月在前：有一个位置大于12就能确定，确定不了返回None"""
+    pattern = _DATE_FORMATS[4][1]
+    for text in texts[:sample]:
+        match = pattern.search(text) if text else None
+        if match is None:
+            continue
+        if int(match[1]) > 12:
+            return True
+        if int(match[2]) > 12:
+            return False
+    return None
+
+
+# ==================== 记录归一化 ====================
+
+def normalize_records(
+    records: Sequence[dict[str, Any]],
+    kinds: dict[str, str],
+    domains: Sequence[Optional[str]],
+    normalizer: Optional["ColumnNormalizer"] = None,
+) -> None:
+    """
+    按字段整列归一化一批提取结果（原地修改）
+    Normalize a batch of extraction results column by column (in place)
+
+    同一个域名的记录凑成一列一起转换；multiple字段的列表摊平进同一列。
+    价格字段额外写一个"<字段名>_currency"。
+
+    Args:
+        records: 每页的extracted_data
+        kinds: 字段名 -> number/price/date
+        domains: 每条记录的来源域名或URL
+        normalizer: 归一化器，默认全局共享的那个
+    """
+    normalizer = normalizer or get_normalizer()
+    groups: dict[Optional[str], list[int]] = {}
+    for index, domain in enumerate(domains):
+        groups.setdefault(_domain(domain), []).append(index)
+
+    for name, kind in kinds.items():
+        for domain, indexes in groups.items():
+            # 列里每个值的(记录下标, 列表下标或None)
+            column, slots = [], []
+            for index in indexes:
+                value = records[index].get(name)
+                if isinstance(value, list):
+                    column.extend(value)
+                    slots.extend((index, position) for position in range(len(value)))
+                elif value is not None:
+                    column.append(value)
+                    slots.append((index, None))
+            if not column:
+                continue
+
+            normalized, currency = normalizer.normalize(kind, column, domain, name)
+            for (index, position), value in zip(slots, normalized):
+                if position is None:
+                    records[index][name] = value
+                else:
+                    records[index][name][position] = value
+            if kind == "price":
+                for index in indexes:
+                    records[index][f"{name}_currency"] = currency
+
+
+# 艹，全进程共享一个，域名格式缓存才有用
+_normalizer: Optional[ColumnNormalizer] = None
+
+
+def get_normalizer() -> ColumnNormalizer:
+    """
+    获取全局归一化器
+    Get the process-wide column normalizer
+    """
+    global _normalizer
+    if _normalizer is None:
+        _normalizer = ColumnNormalizer()
+    return _normalizer
@@ -0,0 +1,281 @@
+"""
+页面池
+Page Pool
+
+这个SB模块在一个浏览器内部复用标签页（crawl4ai会话），按导航次数和内存回收，崩溃自动替换
+This module reuses browser tabs (crawl4ai sessions) inside one browser,
+recycling them by navigation count or memory and replacing crashed ones
+"""
+
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from crawl4ai import AsyncWebCrawler
+
+from .resource_blocking import RequestBlocker
+from .scroll_loader import ScrollDriver
+
+
+# 判断标签页崩溃的错误关键字（Playwright/Chromium的报错信息）
+CRASH_MARKERS = (
+    "target crashed",
+    "page crashed",
+    "target closed",
+    "has been closed",
+    "browser has disconnected",
+)
+
+# 读取渲染进程JS堆内存的脚本（只有Chromium支持performance.memory）
+_MEMORY_PROBE_JS = "() => (performance.memory ? performance.memory.usedJSHeapSize : 0)"
+
+# 清掉标签页当前源的localStorage/sessionStorage（about:blank上没有存储，只能在离开前清）
+_CLEAR_STORAGE_JS = (
+    "() => { try { localStorage.clear(); sessionStorage.clear(); } catch (e) {} }"
+)
+
+
+def is_crash_error(message: Optional[str]) -> bool:
+    """
+    判断错误信息是否表示标签页崩溃
+    Check whether an error message indicates a crashed tab
+
+    Args:
+        message: 错误信息
+
+    Returns:
+        bool: 是否崩溃
+    """
+    if not message:
+        return False
+    lowered = message.lower()
+    return any(marker in lowered for marker in CRASH_MARKERS)
+
+
+class PageLease:
+    """
+    借出的标签页
+    Leased page
+
+    crawl时把session_id传给CrawlerRunConfig，crawl4ai就会复用同一个标签页
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.navigations = 0
+        self.crashed = False
+        # 爬取中途被取消（超时）：标签页可能还卡在导航里，不能放回池子
+        self.abandoned = False
+
+    def mark_crashed(self) -> None:
+        """标记标签页已崩溃，归还时直接替换"""
+        self.crashed = True
+
+
+class PagePool:
+    """
+    标签页池
+    Page Pool
+
+    艹，每次crawl都新建context太浪费了，而且长跑进程RSS越涨越高，用这个池子压住！
+
+    标签页放回池子前先重置：清掉当前源的存储、导航到about:blank，上一个站点的
+    页面和登录态不会带到下一次爬取。cookie在context上，crawl4ai让同配置的会话
+    共用一个context，所以只有没有别的借出中的标签页在用这个context时才清cookie
+    （不然会把别的标签页爬到一半的cookie清掉）。重置失败的标签页直接关掉换新的。
+    """
+
+    def __init__(
+        self,
+        crawler: AsyncWebCrawler,
+        max_pages: int = 4,
+        max_navigations: int = 50,
+        max_memory_mb: float = 512.0,
+    ):
+        """
+        初始化标签页池
+
+        Args:
+            crawler: 已启动的AsyncWebCrawler
+            max_pages: 同时存在的最大标签页数量
+            max_navigations: 单个标签页导航多少次后回收
+            max_memory_mb: 单个标签页JS堆超过多少MB后回收
+        """
+        if max_pages < 1:
+            raise ValueError("艹，标签页池大小至少为1")
+
+        self.crawler = crawler
+        self.max_pages = max_pages
+        self.max_navigations = max_navigations
+        self.max_memory_mb = max_memory_mb
+
+        # 标签页创建时装好请求拦截路由，每次爬取再按会话激活拦截配置
+        self.blocker = RequestBlocker()
+        self.blocker.install(crawler)
+        # 滚动加载同理：钩子装一次，按会话激活滚动计划
+        self.scroller = ScrollDriver()
+        self.scroller.install(crawler)
+
+        self._idle: asyncio.Queue[PageLease] = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max_pages)
+        self._ids = itertools.count(1)
+        self._prefix = f"pool-{id(self):x}"
+        self._live: set[str] = set()
+        self._leased: set[str] = set()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "evicted": 0,
+            "memory_evicted": 0,   # 其中因内存超限回收的（自适应限流据此判断内存吃紧）
+            "crashed": 0,
+            "abandoned": 0,        # 爬取被取消（超时）后关掉的
+            "reset_failed": 0,     # 归还时重置失败关掉的
+        }
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[PageLease]:
+        """
+        借用一个标签页
+        Lease a page
+
+        Yields:
+            PageLease: 标签页租约
+        """
+        await self._slots.acquire()
+
+        try:
+            page = self._idle.get_nowait()
+            self._stats["reused"] += 1
+        except asyncio.QueueEmpty:
+            page = PageLease(f"{self._prefix}-{next(self._ids)}")
+            self._live.add(page.session_id)
+            self._stats["created"] += 1
+
+        self._leased.add(page.session_id)
+        try:
+            yield page
+            page.navigations += 1
+        except asyncio.CancelledError:
+            page.abandoned = True
+            raise
+        except BaseException as e:
+            if is_crash_error(str(e)):
+                page.mark_crashed()
+            raise
+        finally:
+            self._leased.discard(page.session_id)
+            try:
+                await self._release(page)
+            finally:
+                self._slots.release()
+
+    async def _release(self, page: PageLease) -> None:
+        """归还标签页：健康的放回池里，不健康的关掉"""
+        if page.crashed:
+            self._stats["crashed"] += 1
+            await self._kill(page)
+            return
+
+        if page.abandoned:
+            self._stats["abandoned"] += 1
+            await self._kill(page)
+            return
+
+        if page.navigations >= self.max_navigations:
+            self._stats["evicted"] += 1
+            await self._kill(page)
+            return
+
+        memory_mb = await self._probe_memory_mb(page.session_id)
+        if memory_mb is not None and memory_mb > self.max_memory_mb:
+            self._stats["evicted"] += 1
+            self._stats["memory_evicted"] += 1
+            await self._kill(page)
+            return
+
+        if not await self._reset(page.session_id):
+            self._stats["reset_failed"] += 1
+            await self._kill(page)
+            return
+
+        self._idle.put_nowait(page)
+
+    async def _reset(self, session_id: str) -> bool:
+        """
+        重置标签页：清存储、（context没被共用时）清cookie、导航到about:blank
+
+        Returns:
+            bool: 是否重置成功（会话不存在也算成功，下次爬取会新建）
+        """
+        try:
+            manager = self.crawler.crawler_strategy.browser_manager
+            session = manager.sessions.get(session_id)
+        except Exception:
+            return True
+        if not session:
+            return True
+
+        context, page = session[0], session[1]
+        try:
+            await page.evaluate(_CLEAR_STORAGE_JS)
+            # 空闲的标签页归还时已经重置过，下次借出前清它们的cookie也无所谓
+            shared = any(
+                other[0] is context
+                for other_id, other in manager.sessions.items()
+                if other_id in self._leased
+            )
+            if not shared:
+                await context.clear_cookies()
+            await page.goto("about:blank")
+            return True
+        except Exception:
+            return False
+
+    async def _probe_memory_mb(self, session_id: str) -> Optional[float]:
+        """
+        读取标签页的JS堆内存（MB），拿不到返回None
+
+        艹，crawl4ai没公开这个接口，只能去browser_manager里捞page对象
+        """
+        try:
+            manager = self.crawler.crawler_strategy.browser_manager
+            session = manager.sessions.get(session_id)
+            if not session:
+                return None
+            page = session[1]
+            used = await page.evaluate(_MEMORY_PROBE_JS)
+            return float(used) / (1024 * 1024)
+        except Exception:
+            return None
+
+    async def _kill(self, page: PageLease) -> None:
+        """关闭标签页对应的crawl4ai会话"""
+        self._live.discard(page.session_id)
+        try:
+            await self.crawler.crawler_strategy.kill_session(page.session_id)
+        except Exception:
+            # 已经崩溃的标签页关不掉也无所谓
+            pass
+
+    async def close(self) -> None:
+        """关闭池中所有标签页"""
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+        for session_id in list(self._live):
+            await self._kill(PageLease(session_id))
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取池计数器
+        Get pool counters
+
+        Returns:
+            dict: created/reused/evicted/crashed/abandoned/reset_failed计数以及当前存活数
+        """
+        return {
+            **self._stats,
+            "live": len(self._live),
+            "idle": self._idle.qsize(),
+        }
@@ -0,0 +1,154 @@
+"""
+按域名礼貌调度
+Per-host Politeness Scheduler
+
+这个SB模块按域名限制请求间隔和并发，不同域名之间互不影响
+This module enforces per-host minimum intervals and concurrency caps,
+while different hosts proceed in parallel
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+
+def get_host(url: str) -> str:
+    """
+    提取URL的域名（小写）
+    Extract lowercase host from URL
+
+    Args:
+        url: 目标URL
+
+    Returns:
+        str: 域名，解析失败返回空字符串
+    """
+    try:
+        return (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+class _HostState:
+    """单个域名的调度状态"""
+
+    def __init__(self):
+        self.active = 0
+        self.users = 0
+        self.next_allowed = 0.0
+        self.condition = asyncio.Condition()
+        self.interval_lock = asyncio.Lock()
+        # 间隔还没过完时空闲下来：到点再删状态的定时器
+        self.prune_handle: Optional[asyncio.TimerHandle] = None
+
+
+class HostScheduler:
+    """
+    域名调度器
+    Host Scheduler
+
+    艹，一个站点别tm狂刷，同一域名保持最小间隔、限制并发，其他域名照常跑满！
+    默认不限并发：只有模板或配置显式给了max_per_host才按域名卡并发，
+    不然单站点的批量爬取会被悄悄压成2路。
+    """
+
+    def __init__(self, default_delay: float = 0.0, max_per_host: Optional[int] = None):
+        """
+        初始化调度器
+
+        Args:
+            default_delay: 同一域名两次请求之间的默认最小间隔（秒）
+            max_per_host: 同一域名的默认最大并发数，None不限
+        """
+        if max_per_host is not None and max_per_host < 1:
+            raise ValueError("艹，max_per_host至少为1")
+
+        self.default_delay = default_delay
+        self.max_per_host = max_per_host
+        self._hosts: dict[str, _HostState] = {}
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState()
+        return state
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        url: str,
+        delay: Optional[float] = None,
+        max_per_host: Optional[int] = None,
+    ) -> AsyncIterator[None]:
+        """
+        占用一个域名槽位，退出时释放
+        Occupy a per-host slot, released on exit
+
+        Args:
+            url: 目标URL
+            delay: 本次请求要求的最小间隔（秒），None使用默认值
+            max_per_host: 本次请求允许的域名并发上限，None使用默认值（默认值也是None时不限）
+        """
+        host = get_host(url)
+        delay = self.default_delay if delay is None else delay
+        cap = self.max_per_host if max_per_host is None else max(1, max_per_host)
+        state = self._state(host)
+        state.users += 1
+
+        # 1. 并发上限
+        try:
+            async with state.condition:
+                if cap is not None:
+                    await state.condition.wait_for(lambda: state.active < cap)
+                state.active += 1
+        except BaseException:
+            state.users -= 1
+            raise
+
+        try:
+            # 2. 最小间隔（串行预约发车时间，避免多个请求同时醒来）
+            if delay > 0:
+                async with state.interval_lock:
+                    now = time.monotonic()
+                    wait = state.next_allowed - now
+                    state.next_allowed = max(now, state.next_allowed) + delay
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+            yield
+        finally:
+            async with state.condition:
+                state.active -= 1
+                state.condition.notify_all()
+            state.users -= 1
+
+            if state.users == 0:
+                # 空闲域名的状态没用了，删掉免得字典无限增长；
+                # 间隔还没过完就删的话下一个请求会提前发车，所以到点再删
+                wait = state.next_allowed - time.monotonic()
+                if wait <= 0:
+                    self._prune(host, state)
+                else:
+                    if state.prune_handle is not None:
+                        state.prune_handle.cancel()
+                    state.prune_handle = asyncio.get_running_loop().call_later(
+                        wait, self._prune, host, state
+                    )
+
+    def _prune(self, host: str, state: _HostState) -> None:
+        """删掉空闲且间隔已过的域名状态（期间又有请求进来就留着）"""
+        state.prune_handle = None
+        if state.users == 0 and self._hosts.get(host) is state:
+            del self._hosts[host]
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取各域名当前并发数
+        Get current per-host concurrency
+
+        Returns:
+            dict: {域名: 活跃请求数}
+        """
+        return {host: state.active for host, state in self._hosts.items()}
@@ -0,0 +1,269 @@
+"""
+资源拦截
+Resource Blocking
+
+这个SB模块在浏览器请求拦截层按资源类型和URL模式拦掉用不到的请求（字体、视频、统计、广告……）
+This module aborts unneeded requests (fonts, video, analytics, ads...) at the browser
+request-interception layer, by resource type and URL pattern
+"""
+
+import fnmatch
+import re
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional
+
+from crawl4ai import AsyncWebCrawler
+
+from .blocklist import DomainBlocklist, default_blocklist
+
+
+# Playwright的资源类型
+RESOURCE_TYPES = frozenset({
+    "document", "stylesheet", "image", "media", "font", "script", "texttrack",
+    "xhr", "fetch", "eventsource", "websocket", "manifest", "other",
+})
+
+# 每类资源的平均传输大小（字节）。请求没发出去拿不到真实大小，省下的流量只能按这个估算
+ESTIMATED_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 50_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+# 统计、广告、社交挂件（艹，这些东西没有一个场景用得上）
+TRACKER_PATTERNS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.*",
+    "connect.facebook.net",
+    "facebook.com/tr",
+    "analytics.twitter.com",
+    "hotjar.com",
+    "segment.io",
+    "cdn.segment.com",
+    "scorecardresearch.com",
+    "hm.baidu.com",
+    "cnzz.com",
+)
+
+
+class BlockingProfile:
+    """
+    拦截配置
+    Blocking profile
+
+    resource_types按Playwright的request.resource_type匹配；url_patterns是子串，带*的按通配符匹配；
+    use_blocklist为True时还会查域名黑名单（见blocklist.default_blocklist）
+    """
+
+    __slots__ = ("name", "resource_types", "url_patterns", "use_blocklist", "_url_re")
+
+    def __init__(
+        self,
+        name: str = "custom",
+        resource_types: Iterable[str] = (),
+        url_patterns: Iterable[str] = (),
+        use_blocklist: bool = False,
+    ):
+        self.name = name
+        self.use_blocklist = use_blocklist
+        self.resource_types = frozenset(resource_types)
+        unknown = self.resource_types - RESOURCE_TYPES
+        if unknown:
+            raise ValueError(f"艹，未知的资源类型: {sorted(unknown)}")
+        if "document" in self.resource_types:
+            raise ValueError("艹，不能拦截document，页面本身都加载不了了")
+
+        self.url_patterns = tuple(url_patterns)
+        # 所有模式编译成一个正则，每个请求只扫一遍
+        parts = [
+            fnmatch.translate(p).replace(r"\Z", "") if "*" in p else re.escape(p)
+            for p in self.url_patterns
+        ]
+        self._url_re = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+
+    def blocks(
+        self,
+        resource_type: str,
+        url: str,
+        blocklist: Optional[DomainBlocklist] = None,
+    ) -> bool:
+        """
+        这个请求是否要拦截
+
+        Args:
+            resource_type: Playwright的资源类型
+            url: 请求URL
+            blocklist: 域名黑名单（None时用默认黑名单）
+        """
+        if resource_type in self.resource_types:
+            return True
+        if self.use_blocklist and (blocklist or default_blocklist()).match_url(url):
+            return True
+        return self._url_re is not None and self._url_re.search(url) is not None
+
+    def __bool__(self) -> bool:
+        return bool(self.resource_types or self.url_patterns or self.use_blocklist)
+
+
+# 内置配置
+BUILTIN_PROFILES: dict[str, BlockingProfile] = {
+    "none": BlockingProfile("none"),
+    # 只拦统计和广告（内置模式 + 域名黑名单）
+    "trackers": BlockingProfile("trackers", (), TRACKER_PATTERNS, use_blocklist=True),
+    # 字体、音视频、统计广告（页面布局和图片都保留）
+    "lean": BlockingProfile("lean", {"font", "media"}, TRACKER_PATTERNS, use_blocklist=True),
+    # 只要文字：再去掉图片（<img>标签和src还在，只是不下载）
+    "text": BlockingProfile(
+        "text", {"image", "media", "font"}, TRACKER_PATTERNS, use_blocklist=True
+    ),
+    # 极简：连样式表也不要（依赖布局的懒加载可能失效）
+    "minimal": BlockingProfile(
+        "minimal", {"image", "media", "font", "stylesheet"}, TRACKER_PATTERNS, use_blocklist=True
+    ),
+}
+
+
+def resolve_profile(spec: Any) -> Optional[BlockingProfile]:
+    """
+    把crawl配置里的block解析成拦截配置
+    Resolve the crawl config "block" entry into a profile
+
+    Args:
+        spec: None、内置配置名、BlockingProfile，或
+            {"profile": 基础配置名, "resource_types": [...], "url_patterns": [...], "blocklist": bool}
+
+    Returns:
+        BlockingProfile: 拦截配置，什么都不拦时返回None
+
+    Raises:
+        ValueError: 未知的配置名或资源类型
+    """
+    if spec is None or isinstance(spec, BlockingProfile):
+        return spec or None
+
+    if isinstance(spec, str):
+        if spec not in BUILTIN_PROFILES:
+            raise ValueError(f"艹，未知的拦截配置: {spec}，可选: {sorted(BUILTIN_PROFILES)}")
+        return BUILTIN_PROFILES[spec] or None
+
+    base = resolve_profile(spec.get("profile")) or BUILTIN_PROFILES["none"]
+    profile = BlockingProfile(
+        spec.get("profile") or "custom",
+        base.resource_types | set(spec.get("resource_types") or ()),
+        base.url_patterns + tuple(spec.get("url_patterns") or ()),
+        use_blocklist=spec.get("blocklist", base.use_blocklist),
+    )
+    return profile or None
+
+
+class BlockStats:
+    """单次爬取的拦截计数"""
+
+    __slots__ = ("blocked", "bytes_saved", "by_type")
+
+    def __init__(self):
+        self.blocked = 0
+        self.bytes_saved = 0
+        self.by_type: dict[str, int] = {}
+
+    def record(self, resource_type: str) -> None:
+        self.blocked += 1
+        self.bytes_saved += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+        self.by_type[resource_type] = self.by_type.get(resource_type, 0) + 1
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "blocked": self.blocked,
+            "bytes_saved_estimate": self.bytes_saved,
+            "by_type": dict(self.by_type),
+        }
+
+
+def _is_main_document(request) -> bool:
+    """主框架的页面请求本身永远不拦（要爬的页面就在黑名单域名上也得能打开）"""
+    if request.resource_type != "document":
+        return False
+    try:
+        return request.frame.parent_frame is None
+    except Exception:
+        return True
+
+
+class RequestBlocker:
+    """
+    请求拦截器（每个浏览器一个）
+    Request blocker (one per browser)
+
+    艹，标签页是复用的，每次爬取的拦截配置却不一样！所以路由只在标签页创建时装一次，
+    请求来了再按标签页的会话ID去查本次爬取激活的配置。
+    """
+
+    def __init__(self):
+        # session_id -> (本次爬取的配置, 本次爬取的计数)
+        self._active: dict[str, tuple[BlockingProfile, BlockStats]] = {}
+        self._totals = BlockStats()
+
+    def install(self, crawler: AsyncWebCrawler) -> None:
+        """在浏览器上注册on_page_context_created钩子"""
+        try:
+            crawler.crawler_strategy.set_hook("on_page_context_created", self._on_page_created)
+        except AttributeError:
+            # 没有钩子机制的爬虫（比如测试里的假爬虫）就不拦截
+            pass
+
+    @contextmanager
+    def activate(
+        self,
+        session_id: str,
+        profile: Optional[BlockingProfile],
+    ) -> Iterator[Optional[BlockStats]]:
+        """
+        在一次爬取期间给标签页激活拦截配置
+        Activate a profile on a tab for the duration of one crawl
+
+        Yields:
+            BlockStats: 本次爬取的拦截计数（没有配置时为None）
+        """
+        if not profile:
+            yield None
+            return
+
+        stats = BlockStats()
+        self._active[session_id] = (profile, stats)
+        try:
+            yield stats
+        finally:
+            self._active.pop(session_id, None)
+
+    async def _on_page_created(self, page, context=None, **kwargs):
+        """crawl4ai钩子：给新标签页装上路由"""
+        config = kwargs.get("config")
+        session_id = getattr(config, "session_id", None)
+        if session_id is None:
+            return page
+
+        async def handle(route):
+            active = self._active.get(session_id)
+            request = route.request
+            if active is not None and not _is_main_document(request) and active[0].blocks(
+                request.resource_type, request.url
+            ):
+                active[1].record(request.resource_type)
+                self._totals.record(request.resource_type)
+                await route.abort("blockedbyclient")
+            else:
+                # fallback交给其他路由（比如crawl4ai自己的），没有就正常发出
+                await route.fallback()
+
+        await page.route("**/*", handle)
+        return page
+
+    def stats(self) -> dict[str, Any]:
+        """累计拦截计数"""
+        return self._totals.as_dict()
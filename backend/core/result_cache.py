@@ -0,0 +1,252 @@
+"""
+爬取结果缓存
+Crawl Result Cache
+
+这个SB模块在Crawl4AIWrapper.crawl前面加一层两级缓存：进程内LRU + 本地SQLite
+This module puts a two-tier cache (in-process LRU + local SQLite) in front of Crawl4AIWrapper.crawl
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+
+class _MemoryEntry:
+    __slots__ = ("expires_at", "size", "result")
+
+    def __init__(self, expires_at: float, size: int, result: dict[str, Any]):
+        self.expires_at = expires_at
+        self.size = size
+        self.result = result
+
+
+class ResultCache:
+    """
+    两级结果缓存
+    Two-tier result cache
+
+    艹，热门URL反复爬纯属浪费！内存层直接返回dict对象（微秒级），磁盘层兜底进程重启，
+    两层都按字节数封顶，超了按LRU淘汰。
+    """
+
+    def __init__(
+        self,
+        default_ttl: float = 3600.0,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        disk_path: Optional[Path | str] = None,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            default_ttl: 默认过期时间（秒）
+            max_memory_bytes: 内存层字节上限（按结果JSON大小估算）
+            disk_path: 磁盘层SQLite文件路径（None表示只用内存层）
+            max_disk_bytes: 磁盘层字节上限
+        """
+        self.default_ttl = default_ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: OrderedDict[str, _MemoryEntry] = OrderedDict()
+        self._memory_bytes = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_lock = asyncio.Lock()
+        if disk_path is not None:
+            path = Path(disk_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, size INTEGER NOT NULL, "
+                "last_access REAL NOT NULL, value BLOB NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_results_expires_at ON results (expires_at)"
+            )
+            self._conn.commit()
+        self._disk_bytes = (
+            self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if self._conn is not None
+            else 0
+        )
+
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+    # ==================== 读 ====================
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """
+        读取缓存
+        Get cached result
+
+        Args:
+            key: 缓存键（见url_utils.crawl_cache_key）
+
+        Returns:
+            dict: 缓存的结果（浅拷贝），没有或已过期返回None
+        """
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return dict(entry.result)
+            self._stats["expired"] += 1
+            self._drop_memory(key)
+
+        if self._conn is not None:
+            row = await self._disk_call(self._disk_get, key, now)
+            if row is not None:
+                expires_at, size, result = row
+                self._stats["disk_hits"] += 1
+                # 提升到内存层
+                self._put_memory(key, _MemoryEntry(expires_at, size, result))
+                return dict(result)
+
+        self._stats["misses"] += 1
+        return None
+
+    # ==================== 写 ====================
+
+    async def put(self, key: str, result: dict[str, Any], ttl: Optional[float] = None) -> None:
+        """
+        写入缓存
+        Put result into cache
+
+        Args:
+            key: 缓存键
+            result: 爬取结果
+            ttl: 过期时间（秒），None使用默认值，<=0表示不缓存
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        blob = json.dumps(result, ensure_ascii=False, default=str).encode("utf-8")
+        expires_at = time.time() + ttl
+
+        # 存副本，调用方之后再改结果不会改到缓存里的
+        self._put_memory(key, _MemoryEntry(expires_at, len(blob), dict(result)))
+        if self._conn is not None:
+            await self._disk_call(self._disk_put, key, expires_at, blob)
+
+    def _put_memory(self, key: str, entry: _MemoryEntry) -> None:
+        if entry.size > self.max_memory_bytes:
+            return
+        self._drop_memory(key)
+        self._memory[key] = entry
+        self._memory_bytes += entry.size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.size
+            self._stats["memory_evictions"] += 1
+
+    def _drop_memory(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry.size
+
+    # ==================== 磁盘层（在线程池里执行） ====================
+
+    async def _disk_call(self, func, *args):
+        async with self._disk_lock:
+            return await asyncio.to_thread(func, *args)
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple[float, int, dict[str, Any]]]:
+        row = self._conn.execute(
+            "SELECT expires_at, size, value FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        expires_at, size, value = row
+        with self._conn:
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._disk_bytes -= size
+                self._stats["expired"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE results SET last_access = ? WHERE key = ?", (now, key)
+            )
+        return expires_at, size, json.loads(value)
+
+    def _disk_put(self, key: str, expires_at: float, blob: bytes) -> None:
+        if len(blob) > self.max_disk_bytes:
+            return
+
+        now = time.time()
+        with self._conn:
+            old = self._conn.execute(
+                "SELECT size FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if old is not None:
+                self._disk_bytes -= old[0]
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, expires_at, size, last_access, value) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, expires_at, len(blob), now, blob),
+            )
+            self._disk_bytes += len(blob)
+
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+
+            # 超了：先清过期的，再按最近访问时间淘汰到上限以内
+            expired = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM results WHERE expires_at <= ?", (now,)
+            ).fetchone()[0]
+            self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+            self._disk_bytes -= expired
+
+            for old_key, size in self._conn.execute(
+                "SELECT key, size FROM results ORDER BY last_access"
+            ).fetchall():
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                self._conn.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                self._disk_bytes -= size
+                self._stats["disk_evictions"] += 1
+
+    # ==================== 管理 ====================
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取命中和淘汰统计
+        Get hit and eviction statistics
+        """
+        hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+        total = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_bytes": self._disk_bytes,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        """关闭磁盘层连接"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
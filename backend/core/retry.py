@@ -0,0 +1,212 @@
+"""
+重试与熔断
+Retry and Circuit Breaking
+
+这个SB模块按错误类型决定是否重试（指数退避+随机抖动），并按域名熔断一直失败的站点
+This module retries failures by error class (exponential backoff with jitter)
+and trips a per-host circuit breaker on hosts that keep failing
+"""
+
+import random
+import time
+from typing import Any, Optional
+
+from .page_pool import is_crash_error
+from .politeness import get_host
+
+
+# 可重试的错误类型
+ERROR_CLASSES = ("timeout", "navigation", "server")
+
+_TIMEOUT_MARKERS = ("timeout", "timed out", "超时")
+_NAVIGATION_MARKERS = (
+    "net::err_",
+    "navigation",
+    "connection refused",
+    "connection reset",
+    "connecterror",
+    "name or service not known",
+    "dns",
+)
+
+
+def classify_error(result: dict[str, Any]) -> Optional[str]:
+    """
+    判断失败结果属于哪类可重试错误
+    Classify a failed result into a retryable error class
+
+    Args:
+        result: 爬取结果字典
+
+    Returns:
+        str: timeout / navigation / server，成功或不值得重试（比如404）返回None
+    """
+    status = result.get("status_code")
+    if status is not None and (status >= 500 or status == 429):
+        return "server"
+    if result.get("success"):
+        return None
+
+    error = (result.get("error") or "").lower()
+    if any(marker in error for marker in _TIMEOUT_MARKERS):
+        return "timeout"
+    if is_crash_error(error) or any(marker in error for marker in _NAVIGATION_MARKERS):
+        return "navigation"
+    return None
+
+
+class RetryPolicy:
+    """
+    重试策略
+    Retry policy
+
+    艹，偶发超时直接判失败太亏了！按错误类型给重试次数，退避时间用"全抖动"：
+    在[0, min(max_delay, base_delay * 2^attempt)]里随机取，一堆失败别同时醒来再打一波。
+    """
+
+    def __init__(
+        self,
+        retries: Optional[dict[str, int]] = None,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        """
+        初始化策略
+
+        Args:
+            retries: 各错误类型的最大重试次数，默认 timeout=2、navigation=1、server=3
+            base_delay: 第一次退避的基准时间（秒）
+            max_delay: 单次退避的上限（秒）
+        """
+        self.retries = {"timeout": 2, "navigation": 1, "server": 3}
+        if retries:
+            self.retries.update(retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def with_overrides(self, retries: Any) -> "RetryPolicy":
+        """
+        按crawl配置里的retries覆盖重试次数
+        Apply the per-crawl retries override
+
+        Args:
+            retries: 整数（所有类型统一次数）或 {错误类型: 次数}
+
+        Returns:
+            RetryPolicy: 新策略（retries为None时返回自己）
+        """
+        if retries is None:
+            return self
+        if isinstance(retries, int):
+            retries = {error_class: retries for error_class in ERROR_CLASSES}
+        return RetryPolicy({**self.retries, **retries}, self.base_delay, self.max_delay)
+
+    def should_retry(self, error_class: Optional[str], attempt: int) -> bool:
+        """第attempt次重试（从0开始）是否还允许"""
+        return error_class is not None and attempt < self.retries.get(error_class, 0)
+
+    def backoff(self, attempt: int) -> float:
+        """第attempt次重试前要等的时间（秒）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class _Circuit:
+    __slots__ = ("failures", "opened_until", "probe_at")
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_until = 0.0
+        # 上次放出探测请求的时间（探测请求被取消也不会永远卡住）
+        self.probe_at = 0.0
+
+
+class CircuitBreaker:
+    """
+    按域名熔断
+    Per-host circuit breaker
+
+    艹，站点挂了还一个个URL去撞，浏览器槽位全白占！连续失败failure_threshold次就熔断，
+    冷却期内这个域名直接快速失败；冷却完放一个探测请求过去，成功就恢复，失败接着熔断。
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 60.0):
+        """
+        初始化熔断器
+
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            cooldown: 熔断冷却时间（秒）
+        """
+        if failure_threshold < 1:
+            raise ValueError("艹，failure_threshold至少为1")
+
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._circuits: dict[str, _Circuit] = {}
+        self._stats = {"tripped": 0, "fast_failed": 0, "recovered": 0}
+
+    def allow(self, url: str) -> bool:
+        """
+        这个域名现在能不能发请求
+        Whether a request to this host may proceed now
+        """
+        circuit = self._circuits.get(get_host(url))
+        if circuit is None or circuit.failures < self.failure_threshold:
+            return True
+
+        # 冷却结束后每个冷却周期只放一个探测请求
+        now = time.monotonic()
+        if now >= circuit.opened_until and now - circuit.probe_at >= self.cooldown:
+            circuit.probe_at = now
+            return True
+
+        self._stats["fast_failed"] += 1
+        return False
+
+    def record(self, url: str, failed: bool) -> None:
+        """
+        记录一次请求结果（只有可重试类错误才算失败，404这类不算）
+        Record an outcome (only retryable error classes count as failures)
+        """
+        host = get_host(url)
+        circuit = self._circuits.get(host)
+
+        if not failed:
+            if circuit is not None:
+                if circuit.failures >= self.failure_threshold:
+                    self._stats["recovered"] += 1
+                # 健康域名不留状态，字典不会无限增长
+                del self._circuits[host]
+            return
+
+        if circuit is None:
+            circuit = self._circuits[host] = _Circuit()
+        circuit.failures += 1
+        if circuit.failures >= self.failure_threshold:
+            if circuit.failures == self.failure_threshold:
+                self._stats["tripped"] += 1
+            circuit.opened_until = time.monotonic() + self.cooldown
+
+    def retry_after(self, url: str) -> float:
+        """熔断还剩多少秒（没熔断返回0）"""
+        circuit = self._circuits.get(get_host(url))
+        if circuit is None or circuit.failures < self.failure_threshold:
+            return 0.0
+        return max(0.0, circuit.opened_until - time.monotonic())
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取熔断统计
+        Get circuit breaker statistics
+
+        Returns:
+            dict: 计数和当前熔断中的域名
+        """
+        return {
+            **self._stats,
+            "open_hosts": sorted(
+                host
+                for host, circuit in self._circuits.items()
+                if circuit.failures >= self.failure_threshold
+            ),
+        }
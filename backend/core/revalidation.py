@@ -0,0 +1,148 @@
+"""
+条件重验证
+Conditional Revalidation
+
+这个SB模块按URL保存ETag/Last-Modified/内容哈希和上一次的结果，页面没变时直接复用
+This module stores ETag/Last-Modified/content hash and the previous result per URL,
+so unchanged pages reuse the stored result
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def content_hash(content: str | bytes) -> str:
+    """
+    计算页面内容哈希
+    Compute page content hash
+
+    Args:
+        content: 页面内容
+
+    Returns:
+        str: 十六进制哈希
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8", errors="replace")
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class ValidatorRecord:
+    """
+    单个URL的验证信息
+    Validators of one URL
+    """
+
+    __slots__ = ("etag", "last_modified", "content_hash", "result")
+
+    def __init__(
+        self,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content_hash: str,
+        result: dict[str, Any],
+    ):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.result = result
+
+
+class ValidatorStore:
+    """
+    验证信息仓库（LRU，有上限）
+    Validator store (bounded LRU)
+
+    艹，监控任务天天重爬同一批URL，页面没变就别再下载渲染一遍了！
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        """
+        初始化仓库
+
+        Args:
+            max_entries: 最多保存多少个URL
+        """
+        self.max_entries = max_entries
+        self._records: OrderedDict[str, ValidatorRecord] = OrderedDict()
+        self._stats = {
+            "not_modified": 0,   # 服务器返回304
+            "unchanged": 0,      # 内容哈希没变
+            "changed": 0,        # 有旧记录但内容变了
+            "miss": 0,           # 没有旧记录
+        }
+
+    def get(self, key: str) -> Optional[ValidatorRecord]:
+        """获取URL的验证信息"""
+        record = self._records.get(key)
+        if record is not None:
+            self._records.move_to_end(key)
+        return record
+
+    def conditional_headers(self, key: str) -> dict[str, str]:
+        """
+        生成条件请求头
+        Build conditional request headers
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since
+        """
+        record = self._records.get(key)
+        headers = {}
+        if record is not None:
+            if record.etag:
+                headers["If-None-Match"] = record.etag
+            if record.last_modified:
+                headers["If-Modified-Since"] = record.last_modified
+        return headers
+
+    def put(
+        self,
+        key: str,
+        content_hash: str,
+        result: dict[str, Any],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """保存验证信息和结果"""
+        # 艹，存副本！调用方接着会往结果里加blocked/scroll/retries这些本次爬取才有的字段
+        self._records[key] = ValidatorRecord(etag, last_modified, content_hash, dict(result))
+        self._records.move_to_end(key)
+        while len(self._records) > self.max_entries:
+            self._records.popitem(last=False)
+
+    def reuse(self, key: str, reason: str) -> Optional[dict[str, Any]]:
+        """
+        复用上一次的结果
+        Reuse the previous result
+
+        Args:
+            key: 缓存键
+            reason: not_modified（304）或 unchanged（哈希相同）
+
+        Returns:
+            dict: 上一次结果的副本（带not_modified标记），没有记录返回None
+        """
+        record = self.get(key)
+        if record is None:
+            return None
+        self._stats[reason] += 1
+        return {**record.result, "not_modified": True}
+
+    def count(self, outcome: str) -> None:
+        """计数：changed/miss"""
+        self._stats[outcome] += 1
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取命中统计
+        Get hit/miss statistics
+        """
+        hits = self._stats["not_modified"] + self._stats["unchanged"]
+        total = hits + self._stats["changed"] + self._stats["miss"]
+        return {
+            **self._stats,
+            "entries": len(self._records),
+            "hit_rate": hits / total if total else 0.0,
+        }
@@ -0,0 +1,209 @@
+"""
+滚动加载
+Scroll-to-Load Driver
+
+这个SB模块在抓取HTML之前驱动无限滚动，内容不再增长或数量够了就提前停
+This module drives infinite scrolling before the HTML is captured, stopping early
+once content stops growing or the item quota is met
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from crawl4ai import AsyncWebCrawler
+
+
+# 读页面高度和目标元素数量
+_MEASURE_JS = """(sel) => [
+    document.documentElement.scrollHeight,
+    sel ? document.querySelectorAll(sel).length : 0,
+]"""
+
+_SCROLL_JS = "() => window.scrollTo(0, document.documentElement.scrollHeight)"
+
+# 等新内容出现：有目标选择器时看数量，没有时看页面高度
+_GROWTH_JS = """([height, count, sel]) => sel
+    ? document.querySelectorAll(sel).length > count
+    : document.documentElement.scrollHeight > height"""
+
+
+class ScrollPlan:
+    """
+    一次爬取的滚动计划
+    Scroll plan of one crawl
+    """
+
+    __slots__ = ("max_scrolls", "target", "quota", "settle_timeout")
+
+    def __init__(
+        self,
+        max_scrolls: int = 10,
+        target: Optional[str] = None,
+        quota: Optional[int] = None,
+        settle_timeout: float = 2.0,
+    ):
+        """
+        Args:
+            max_scrolls: 最多滚动次数
+            target: 目标元素的CSS选择器（按数量判断是否还在增长）
+            quota: 目标元素够这么多就停
+            settle_timeout: 每次滚动后等新内容出现的最长时间（秒）
+        """
+        self.max_scrolls = max_scrolls
+        self.target = target
+        self.quota = quota
+        self.settle_timeout = settle_timeout
+
+    @classmethod
+    def from_config(cls, spec: Any) -> Optional["ScrollPlan"]:
+        """
+        从crawl配置里的scroll解析滚动计划
+        Parse the crawl config "scroll" entry
+
+        Args:
+            spec: None/False、True，或 {"max_scrolls", "target", "quota", "settle_timeout"}
+
+        Returns:
+            ScrollPlan: 滚动计划，不滚动时返回None
+        """
+        if not spec:
+            return None
+        if spec is True:
+            return cls()
+        plan = cls(
+            max_scrolls=spec.get("max_scrolls", 10),
+            target=spec.get("target"),
+            quota=spec.get("quota"),
+            settle_timeout=spec.get("settle_timeout", 2.0),
+        )
+        return plan if plan.max_scrolls > 0 else None
+
+
+class ScrollReport:
+    """滚动过程记录（每一步的耗时、页面高度、目标数量和停止原因）"""
+
+    __slots__ = ("steps", "stopped", "items")
+
+    def __init__(self):
+        self.steps: list[dict[str, Any]] = []
+        self.stopped = "not_run"
+        self.items = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "scrolls": len(self.steps),
+            "stopped": self.stopped,
+            "items": self.items,
+            "total_ms": round(sum(step["ms"] for step in self.steps), 1),
+            "steps": list(self.steps),
+        }
+
+
+async def run_scroll(page, plan: ScrollPlan, report: ScrollReport) -> None:
+    """
+    在页面上执行滚动计划
+    Execute a scroll plan on a page
+
+    艹，固定滚max_scrolls次纯属浪费！每滚一次就等新内容出现，一出现马上下一步；
+    等满settle_timeout都没长，说明到底了，直接停。
+
+    停止原因: quota（数量够了）/ no_growth（不再增长）/ max_scrolls / error
+    """
+    height, count = await page.evaluate(_MEASURE_JS, plan.target)
+    report.items = count
+    if plan.quota and count >= plan.quota:
+        report.stopped = "quota"
+        return
+
+    for step in range(1, plan.max_scrolls + 1):
+        started = time.perf_counter()
+        await page.evaluate(_SCROLL_JS)
+        try:
+            await page.wait_for_function(
+                _GROWTH_JS,
+                arg=[height, count, plan.target],
+                timeout=plan.settle_timeout * 1000,
+            )
+            grew = True
+        except Exception:
+            # Playwright的TimeoutError：这一步没有新内容
+            grew = False
+
+        height, count = await page.evaluate(_MEASURE_JS, plan.target)
+        report.items = count
+        report.steps.append({
+            "step": step,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "height": height,
+            "items": count,
+        })
+
+        if not grew:
+            report.stopped = "no_growth"
+            return
+        if plan.quota and count >= plan.quota:
+            report.stopped = "quota"
+            return
+
+    report.stopped = "max_scrolls"
+
+
+class ScrollDriver:
+    """
+    滚动驱动（每个浏览器一个）
+    Scroll driver (one per browser)
+
+    通过crawl4ai的before_retrieve_html钩子在取HTML之前滚动；
+    和请求拦截一样，按标签页的会话ID查本次爬取激活的滚动计划。
+    """
+
+    def __init__(self):
+        # session_id -> (本次爬取的滚动计划, 本次爬取的记录)
+        self._active: dict[str, tuple[ScrollPlan, ScrollReport]] = {}
+
+    def install(self, crawler: AsyncWebCrawler) -> None:
+        """在浏览器上注册before_retrieve_html钩子"""
+        try:
+            crawler.crawler_strategy.set_hook("before_retrieve_html", self._before_retrieve_html)
+        except AttributeError:
+            pass
+
+    @contextmanager
+    def activate(
+        self,
+        session_id: str,
+        plan: Optional[ScrollPlan],
+    ) -> Iterator[Optional[ScrollReport]]:
+        """
+        在一次爬取期间给标签页激活滚动计划
+        Activate a scroll plan on a tab for the duration of one crawl
+
+        Yields:
+            ScrollReport: 本次爬取的滚动记录（没有计划时为None）
+        """
+        if plan is None:
+            yield None
+            return
+
+        report = ScrollReport()
+        self._active[session_id] = (plan, report)
+        try:
+            yield report
+        finally:
+            self._active.pop(session_id, None)
+
+    async def _before_retrieve_html(self, page, context=None, **kwargs):
+        """crawl4ai钩子：取HTML之前按计划滚动"""
+        config = kwargs.get("config")
+        active = self._active.get(getattr(config, "session_id", None))
+        if active is None:
+            return page
+
+        plan, report = active
+        try:
+            await run_scroll(page, plan, report)
+        except Exception as e:
+            # 滚动出错不影响抓取已经加载出来的内容
+            report.stopped = f"error: {str(e)}"
+        return page
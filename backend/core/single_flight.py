@@ -0,0 +1,91 @@
+"""
+并发请求合并
+Single-Flight Request Coalescing
+
+这个SB模块把同一时刻、同一缓存键的多个爬取合并成一次真正的抓取，所有调用方共享结果
+This module coalesces concurrent crawls with the same cache key into one real fetch
+whose result is shared by every caller
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    并发请求合并器
+    Single-flight coalescer
+
+    艹，突发流量里一堆客户端同时要同一个URL，开N个标签页纯属浪费！
+    第一个调用方真正去抓，后来的直接等它的结果；所有调用方都取消了才取消抓取。
+    """
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        """
+        执行或加入同一个键的抓取
+        Run or join the in-flight fetch for a key
+
+        Args:
+            key: 合并键（见url_utils.crawl_cache_key）
+            fn: 真正执行抓取的协程函数
+
+        Returns:
+            dict: 抓取结果（跟随者拿到的是浅拷贝，改了也不影响别人）
+        """
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight(asyncio.create_task(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, k=key, f=flight: self._forget(k, f))
+            self._stats["leaders"] += 1
+        else:
+            self._stats["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            # shield：某个调用方被取消不能连累其他人
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+        return result if leader else dict(result)
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取合并统计
+        Get coalescing statistics
+
+        Returns:
+            dict: leaders（真正抓取数）、coalesced（省掉的抓取数）、in_flight、saved_ratio
+        """
+        total = self._stats["leaders"] + self._stats["coalesced"]
+        return {
+            **self._stats,
+            "in_flight": len(self._flights),
+            "saved_ratio": self._stats["coalesced"] / total if total else 0.0,
+        }
@@ -0,0 +1,409 @@
+"""
+表格解析
+Table Parsing
+
+这个SB模块流式解析HTML表格：边解析边展开rowspan/colspan、识别表头，按列攒数据并推断列类型，
+能直接写CSV，装了pyarrow还能转Arrow/Parquet
+This module parses HTML tables incrementally: merged cells are resolved and header rows
+detected as rows stream in, values are accumulated per column with inferred column types,
+and tables can be written straight to CSV (or Arrow/Parquet when pyarrow is installed)
+"""
+
+import csv
+import re
+from typing import IO, Any, Iterable, Iterator, Optional, Union
+
+from lxml import etree
+
+from .normalizer import ColumnNormalizer, get_normalizer
+
+try:
+    import pyarrow  # noqa: F401
+    ARROW_AVAILABLE = True
+except ImportError:
+    # 艹，没装pyarrow就只能导CSV和JSON
+    ARROW_AVAILABLE = False
+
+
+# 每次喂给解析器的大小，解析器里积压的行不会超过一块
+CHUNK_SIZE = 64 * 1024
+
+# rowspan/colspan的上限（艹，有的页面写rowspan="9999"，别真开那么多格子）
+MAX_SPAN = 1000
+
+# 整列拼起来一次判断类型（跟归一化一样用记录分隔符）
+_SEP = "\x1e"
+_NUMBER = r"[-+]?[$€£¥￥]?\s?\d[\d,.'\u00a0\u202f ]*%?"
+_NUMBER_COLUMN_RE = re.compile(f"{_NUMBER}(?:{_SEP}{_NUMBER})*")
+_DATE = r"\d{4}[-/.年]\d{1,2}[-/.月]\d{1,2}日?(?:[T ][\d:]+)?"
+_DATE_COLUMN_RE = re.compile(f"{_DATE}(?:{_SEP}{_DATE})*")
+
+# 表示"没有数据"的占位符，推断类型时当空值
+_NULLS = frozenset({"-", "--", "—", "–", "/", "n/a", "N/A", "NA", "null", "无", "暂无"})
+
+HTMLSource = Union[str, bytes, Iterable[Union[str, bytes]]]
+
+
+def _cell_text(cell: Any) -> str:
+    return " ".join("".join(cell.itertext()).split())
+
+
+def _span(value: Optional[str], name: str) -> int:
+    try:
+        value = int(value or 1)
+    except ValueError:
+        return 1
+    # rowspan="0"表示一直到表格结束
+    return MAX_SPAN if value == 0 and name == "rowspan" else max(1, min(value, MAX_SPAN))
+
+
+class _RowResolver:
+    """一个表格的跨行单元格状态：把每个<tr>展开成完整的一行"""
+
+    __slots__ = ("carry",)
+
+    def __init__(self):
+        # 列号 -> [还要占几行, 值]
+        self.carry: dict[int, list] = {}
+
+    def _take(self, row: list, col: int) -> int:
+        while col in self.carry:
+            span = self.carry[col]
+            row.append(span[1])
+            span[0] -= 1
+            if span[0] == 0:
+                del self.carry[col]
+            col += 1
+        return col
+
+    def resolve(self, cells: list) -> list[Optional[str]]:
+        row: list[Optional[str]] = []
+        col = 0
+        for cell in cells:
+            if self.carry:
+                col = self._take(row, col)
+            # 没有子元素的格子直接取text，省掉itertext
+            if len(cell):
+                text = _cell_text(cell) or None
+            else:
+                text = (" ".join(cell.text.split()) if cell.text else "") or None
+            rowspan, colspan = cell.get("rowspan"), cell.get("colspan")
+            if rowspan is None and colspan is None:
+                # 绝大多数格子没有合并，走快速路径
+                row.append(text)
+                col += 1
+                continue
+            rowspan = _span(rowspan, "rowspan")
+            for _ in range(_span(colspan, "colspan")):
+                row.append(text)
+                if rowspan > 1:
+                    self.carry[col] = [rowspan - 1, text]
+                col += 1
+        # 右边还被上面的行占着的格子（中间空着的补None）
+        while self.carry and max(self.carry) >= col:
+            if col in self.carry:
+                col = self._take(row, col)
+            else:
+                row.append(None)
+                col += 1
+        return row
+
+
+def iter_rows(source: HTMLSource) -> Iterator[tuple[int, Optional[list[Optional[str]]], Any]]:
+    """
+    流式读取页面里所有表格的行（合并单元格已展开）
+    Stream the rows of every table on a page, merged cells resolved
+
+    艹，解析器按块喂，每处理完一行就把它从树里删掉，十万行的表格内存里也只有一块的量
+
+    Args:
+        source: HTML字符串/bytes，或者按块产出的可迭代对象
+
+    Yields:
+        tuple: (表格序号, 行值, 是否表头行)，表头行指在thead里或者全是th的行；
+               表格结束时产出(表格序号, None, 表格标题)
+    """
+    parser = etree.HTMLPullParser(events=("start", "end"), tag=("table", "tr", "caption"))
+    # 表格栈（嵌套表格各算各的）：[序号, 行展开器, 标题]
+    stack: list[list] = []
+    count = 0
+
+    if isinstance(source, (str, bytes)):
+        chunks: Iterable = (source[i:i + CHUNK_SIZE] for i in range(0, len(source), CHUNK_SIZE))
+    else:
+        chunks = source
+
+    def drain() -> Iterator[tuple[int, Optional[list[Optional[str]]], Any]]:
+        nonlocal count
+        for event, element in parser.read_events():
+            if element.tag == "table":
+                if event == "start":
+                    stack.append([count, _RowResolver(), None])
+                    count += 1
+                elif stack:
+                    index, _, caption = stack.pop()
+                    yield index, None, caption
+                    element.clear()
+            elif event != "end" or not stack:
+                continue
+            elif element.tag == "caption":
+                stack[-1][2] = _cell_text(element) or None
+            else:
+                cells = [c for c in element if c.tag == "td" or c.tag == "th"]
+                resolver = stack[-1][1]
+                # 艹，空<tr>也占一行：上面rowspan下来的格子要在这一行消耗掉，不然后面全错位
+                if cells or resolver.carry:
+                    parent = element.getparent()
+                    header = parent.tag == "thead" or (
+                        bool(cells) and all(c.tag == "th" for c in cells)
+                    )
+                    yield stack[-1][0], resolver.resolve(cells), header
+                # 处理完的行清掉，连同前面已经处理过的行
+                element.clear()
+                previous = element.getprevious()
+                while previous is not None and previous.tag == "tr":
+                    element.getparent().remove(previous)
+                    previous = element.getprevious()
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
+
+
+class Table:
+    """
+    列式存储的表格
+    Columnar table
+
+    headers和columns一一对应，columns[i]是第i列的全部值；types是推断出的列类型
+    （integer/number/date/text），finish()之后数值列是数字、日期列是ISO字符串
+    """
+
+    __slots__ = ("index", "caption", "headers", "columns", "types", "row_count", "_header_rows")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.caption: Optional[str] = None
+        self.headers: list[str] = []
+        self.columns: list[list[Any]] = []
+        self.types: list[str] = []
+        self.row_count = 0
+        self._header_rows: list[list[Optional[str]]] = []
+
+    def add_row(self, row: list[Optional[str]], header: bool = False) -> None:
+        """追加一行（数据行开始之前的表头行先攒着，合成列名）"""
+        if header and self.row_count == 0:
+            self._header_rows.append(row)
+            return
+        width = len(self.columns)
+        if len(row) > width:
+            # 这一行比前面的宽，新列前面补None
+            self.columns.extend([None] * self.row_count for _ in range(len(row) - width))
+        for column, value in zip(self.columns, row):
+            column.append(value)
+        for column in self.columns[len(row):]:
+            column.append(None)
+        self.row_count += 1
+
+    def finish(
+        self,
+        domain: Optional[str] = None,
+        normalizer: Optional[ColumnNormalizer] = None,
+    ) -> "Table":
+        """
+        收尾：没有表头时猜表头、合成列名、推断列类型并整列转换
+        Finish: infer headers, build column names, infer and convert column types
+
+        Args:
+            domain: 来源域名或URL（数字和日期格式按(域名, 列名)缓存）
+            normalizer: 归一化器，默认全局共享的那个
+        """
+        if not self._header_rows and self.row_count > 1 and _looks_like_header(self.columns):
+            # 没有th/thead：第一行全是非数字文本、下面有数字列，就当表头
+            self._header_rows.append([column.pop(0) for column in self.columns])
+            self.row_count -= 1
+
+        width = max([len(self.columns)] + [len(row) for row in self._header_rows])
+        while len(self.columns) < width:
+            self.columns.append([None] * self.row_count)
+        self.headers = _merge_headers(self._header_rows, width)
+        self._header_rows = []
+
+        normalizer = normalizer or get_normalizer()
+        self.types = []
+        for position, column in enumerate(self.columns):
+            kind = _infer_type(column)
+            if kind == "number":
+                values = normalizer.numbers(column, domain, self.headers[position])
+                if all(v is None or v.is_integer() for v in values):
+                    kind = "integer"
+                    values = [int(v) if v is not None else None for v in values]
+                self.columns[position] = values
+            elif kind == "date":
+                self.columns[position] = normalizer.dates(column, domain, field=self.headers[position])
+            self.types.append(kind)
+        return self
+
+    def rows(self) -> Iterator[tuple]:
+        """按行迭代（不复制整张表）"""
+        return zip(*self.columns)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        转成列式的dict（JSON友好）
+        Convert to a columnar, JSON-friendly dict
+        """
+        return {
+            "index": self.index,
+            "caption": self.caption,
+            "headers": self.headers,
+            "types": self.types,
+            "columns": self.columns,
+            "row_count": self.row_count,
+        }
+
+    def to_csv(self, out: IO[str]) -> None:
+        """
+        写成CSV（表头一行，然后逐行写，不先拼出整张表）
+        Write as CSV
+        """
+        writer = csv.writer(out)
+        writer.writerow(self.headers)
+        writer.writerows(self.rows())
+
+    def to_arrow(self) -> Any:
+        """
+        转成pyarrow.Table（列直接交给Arrow，不经过逐行转换）
+        Convert to a pyarrow.Table
+
+        Raises:
+            ImportError: 没装pyarrow
+        """
+        if not ARROW_AVAILABLE:
+            raise ImportError("艹，导出Arrow/Parquet需要先 pip install pyarrow")
+        import pyarrow as pa
+
+        return pa.table(dict(zip(_unique(self.headers), self.columns)))
+
+    def to_parquet(self, path: str) -> None:
+        """
+        写成Parquet文件
+        Write as a Parquet file
+
+        Raises:
+            ImportError: 没装pyarrow
+        """
+        table = self.to_arrow()
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path)
+
+
+def _looks_like_header(columns: list[list[Any]]) -> bool:
+    first = [column[0] for column in columns]
+    if not first or any(value is None or _NUMBER_COLUMN_RE.fullmatch(value) for value in first):
+        return False
+    return any(_infer_type(column[1:]) in ("number", "date") for column in columns)
+
+
+def _merge_headers(header_rows: list[list[Optional[str]]], width: int) -> list[str]:
+    """多行表头按列合并（"年份 / 收入"），跨列展开后重复的部分只留一个；没有列名的叫col_N"""
+    headers = []
+    for position in range(width):
+        parts: list[str] = []
+        for row in header_rows:
+            value = row[position] if position < len(row) else None
+            if value and value not in parts:
+                parts.append(value)
+        headers.append(" / ".join(parts) or f"col_{position + 1}")
+    return headers
+
+
+def _unique(headers: list[str]) -> list[str]:
+    """列名去重（Arrow不许重名）"""
+    seen: dict[str, int] = {}
+    names = []
+    for name in headers:
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+def _infer_type(column: list[Any]) -> str:
+    """
+    推断列类型：number/date/text（空值和n/a、-之类的占位符不参与判断，全空的算text）
+
+    艹，别一个格子一个格子地判断，整列拼起来一次fullmatch
+    """
+    values = [value for value in column if value is not None and value not in _NULLS]
+    if not values:
+        return "text"
+    joined = _SEP.join(values)
+    if _NUMBER_COLUMN_RE.fullmatch(joined):
+        # 整数还是小数要按域名的小数点写法转换之后才知道（"1.299"可能是一千二百九十九）
+        return "number"
+    if _DATE_COLUMN_RE.fullmatch(joined):
+        return "date"
+    return "text"
+
+
+def parse_tables(
+    source: HTMLSource,
+    base_url: Optional[str] = None,
+    min_rows: int = 1,
+) -> list[Table]:
+    """
+    解析页面里的所有表格
+    Parse every table on a page
+
+    Args:
+        source: HTML字符串/bytes，或者按块产出的可迭代对象
+        base_url: 页面URL（数字和日期格式按域名缓存）
+        min_rows: 数据行少于这个数的表格（一般是排版用的）不要
+
+    Returns:
+        list: Table列表，按表格在页面里出现的顺序
+    """
+    tables: dict[int, Table] = {}
+    finished: list[Table] = []
+    for index, row, extra in iter_rows(source):
+        table = tables.get(index)
+        if table is None:
+            table = tables[index] = Table(index)
+        if row is not None:
+            table.add_row(row, extra)
+            continue
+        # 表格结束
+        del tables[index]
+        table.caption = extra
+        if table.row_count >= min_rows:
+            finished.append(table.finish(base_url))
+
+    return sorted(finished, key=lambda t: t.index)
+
+
+def write_csv(source: HTMLSource, out: IO[str], table_index: int = 0) -> int:
+    """
+    把页面里的某个表格直接流式写成CSV（不攒列、不推断类型，内存里只有当前这一行）
+    Stream one table of a page straight to CSV
+
+    Args:
+        source: HTML字符串/bytes，或者按块产出的可迭代对象
+        out: 文本文件对象
+        table_index: 第几个表格（从0开始，按<table>出现的顺序）
+
+    Returns:
+        int: 写了多少行（含表头行）
+    """
+    writer = csv.writer(out)
+    written = 0
+    for index, row, _ in iter_rows(source):
+        if index != table_index:
+            continue
+        if row is None:
+            break
+        writer.writerow(["" if value is None else value for value in row])
+        written += 1
+    return written
@@ -6,6 +6,7 @@ Template Engine
 This module handles scenario template loading, validation, and application
 """
 
+import asyncio
 import json
 from typing import Any, Optional
 from pathlib import Path
@@ -13,7 +14,10 @@ from abc import ABC, abstractmethod
 
 from pydantic import BaseModel, Field, validator
 
-from .crawler import Crawl4AIWrapper
+from .crawler import DEFAULT_RESULT_FIELDS, Crawl4AIWrapper
+from .extractor import SELECTOR_TYPES, ExtractionPlan, compile_expression, compile_plan
+from .normalizer import NORMALIZE_KINDS, normalize_records
+from .resource_blocking import BUILTIN_PROFILES, RESOURCE_TYPES
 
 
 # ==================== 提取字段定义 ====================
@@ -28,18 +32,39 @@ class ExtractField(BaseModel):
     """
 
     name: str = Field(..., description="字段名称")
-    selector: str = Field(..., description="CSS选择器")
+    selector: str = Field(..., description="选择器表达式")
+    selector_type: str = Field(default="css", description="选择器类型: css/xpath/regex（regex在markdown上匹配）")
     type: str = Field(default="text", description="提取类型: text/number/link/image/attribute")
     attribute: Optional[str] = Field(None, description="当type为attribute时指定属性名")
     required: bool = Field(default=False, description="是否必需")
     multiple: bool = Field(default=False, description="是否提取多个值")
+    limit: Optional[int] = Field(None, ge=1, description="multiple时最多要多少个（滚动加载数量够了就停）")
+    normalize: Optional[str] = Field(None, description="归一化: number/price/date（价格额外给出<name>_currency）")
 
     @validator('type')
-    def validate_type(cls, v):
+    def validate_type(cls, v, values):
         """验证提取类型"""
         valid_types = {'text', 'number', 'link', 'image', 'attribute'}
         if v not in valid_types:
             raise ValueError(f'艹，无效的提取类型: {v}，必须是: {valid_types}')
+        if v == 'attribute' and values.get('selector_type') == 'regex':
+            raise ValueError('艹，正则匹配的是文本，没有属性可取，type不能为attribute')
+        return v
+
+    @validator('selector_type', always=True)
+    def validate_selector_type(cls, v, values):
+        """验证选择器类型并编译选择器（编译失败的模板不让保存，编译结果进共享缓存）"""
+        if v not in SELECTOR_TYPES:
+            raise ValueError(f'艹，无效的选择器类型: {v}，必须是: {SELECTOR_TYPES}')
+        if 'selector' in values:
+            compile_expression(values['selector'], v)
+        return v
+
+    @validator('normalize')
+    def validate_normalize(cls, v):
+        """验证归一化类型"""
+        if v is not None and v not in NORMALIZE_KINDS:
+            raise ValueError(f'艹，无效的归一化类型: {v}，必须是: {NORMALIZE_KINDS}')
         return v
 
     @validator('attribute')
@@ -50,6 +75,43 @@ class ExtractField(BaseModel):
         return v
 
 
+# ==================== 就绪条件 ====================
+
+# 等必需字段渲染出来的默认最长时间（秒）
+DEFAULT_READY_TIMEOUT = 10.0
+
+# wait_for的兜底超时比就绪条件多等这么久（秒）
+READY_TIMEOUT_GRACE = 5.0
+
+
+def build_ready_condition(selectors: list[str], timeout: float) -> str:
+    """
+    生成crawl4ai的wait_for就绪条件
+    Build a crawl4ai wait_for readiness condition
+
+    艹，超时了不能判爬取失败，已经渲染出来的内容照样要！所以条件自己记一个截止时间，
+    选择器全部出现或者过了截止时间都返回true，crawl4ai马上抓取HTML。
+
+    Args:
+        selectors: 必须出现的CSS选择器（写错的选择器当作已出现，不会卡住）
+        timeout: 最长等待时间（秒）
+
+    Returns:
+        str: "js:"开头的条件
+    """
+    return (
+        "js:() => {"
+        f"const sels = {json.dumps(selectors, ensure_ascii=False)};"
+        "const ready = sels.every(s => {"
+        "try { return document.querySelector(s) !== null; } catch (e) { return true; }"
+        "});"
+        "if (ready) return true;"
+        f"window.__crawlReadyDeadline = window.__crawlReadyDeadline || Date.now() + {int(timeout * 1000)};"
+        "return Date.now() > window.__crawlReadyDeadline;"
+        "}"
+    )
+
+
 # ==================== 高级配置定义 ====================
 
 class AdvancedConfig(BaseModel):
@@ -63,17 +125,26 @@ class AdvancedConfig(BaseModel):
 
     deep_crawl: bool = Field(default=False, description="是否深度爬取")
     max_pages: int = Field(default=10, description="最大页面数")
-    strategy: str = Field(default="bfs", description="爬取策略: bfs/dfs")
+    strategy: str = Field(default="bfs", description="爬取策略: bfs/dfs/best_first")
+    keywords: list[str] = Field(default_factory=list, description="best_first策略的URL打分关键词")
     proxy: Optional[str] = Field(None, description="代理地址")
-    delay: float = Field(default=0.0, description="请求延迟（秒）")
+    delay: float = Field(default=0.0, description="请求延迟（秒），同一域名两次请求的最小间隔")
+    max_per_host: Optional[int] = Field(None, description="同一域名的最大并发数，None不限（只受max_concurrent约束）")
+    cache_ttl: Optional[float] = Field(None, description="结果缓存过期时间（秒），None使用全局默认，0不缓存")
+    max_retries: Optional[int] = Field(None, ge=0, description="超时/导航错误/5xx的最大重试次数，None使用默认策略")
+    block_profile: Optional[str] = Field(None, description="请求拦截配置: none/trackers/lean/text/minimal")
+    block_resource_types: list[str] = Field(default_factory=list, description="额外拦截的资源类型（image/font/media等）")
+    block_url_patterns: list[str] = Field(default_factory=list, description="额外拦截的URL模式（子串，支持*通配）")
+    ready_timeout: float = Field(default=DEFAULT_READY_TIMEOUT, description="等必需字段渲染出来的最长时间（秒），0表示不等")
     scroll_to_load: bool = Field(default=False, description="是否滚动加载")
     max_scrolls: int = Field(default=10, description="最大滚动次数")
+    scroll_target: Optional[str] = Field(None, description="滚动加载时计数的元素选择器，默认取第一个multiple字段")
 
     @validator('strategy')
     def validate_strategy(cls, v):
         """验证爬取策略"""
-        if v not in {'bfs', 'dfs'}:
-            raise ValueError('艹，策略必须是 bfs 或 dfs')
+        if v not in {'bfs', 'dfs', 'best_first'}:
+            raise ValueError('艹，策略必须是 bfs、dfs 或 best_first')
         return v
 
     @validator('delay')
@@ -83,6 +154,43 @@ class AdvancedConfig(BaseModel):
             raise ValueError('艹，延迟不能为负数')
         return v
 
+    @validator('max_per_host')
+    def validate_max_per_host(cls, v):
+        """验证域名并发数"""
+        if v is not None and v < 1:
+            raise ValueError('艹，max_per_host至少为1')
+        return v
+
+    @validator('block_profile')
+    def validate_block_profile(cls, v):
+        """验证拦截配置名"""
+        if v is not None and v not in BUILTIN_PROFILES:
+            raise ValueError(f'艹，拦截配置必须是: {", ".join(BUILTIN_PROFILES)}')
+        return v
+
+    @validator('block_resource_types')
+    def validate_block_resource_types(cls, v):
+        """验证拦截的资源类型"""
+        unknown = set(v) - RESOURCE_TYPES
+        if unknown:
+            raise ValueError(f'艹，未知的资源类型: {", ".join(sorted(unknown))}')
+        if 'document' in v:
+            raise ValueError('艹，不能拦截document')
+        return v
+
+    def block_config(self) -> Optional[dict[str, Any]]:
+        """
+        转换成crawl配置里的block，什么都不拦时返回None
+        Convert to the crawl config "block" entry, None when nothing is blocked
+        """
+        if not (self.block_profile or self.block_resource_types or self.block_url_patterns):
+            return None
+        return {
+            "profile": self.block_profile,
+            "resource_types": self.block_resource_types,
+            "url_patterns": self.block_url_patterns,
+        }
+
 
 # ==================== 模板配置Schema ====================
 
@@ -100,6 +208,74 @@ class TemplateConfigSchema(BaseModel):
     fields: list[ExtractField] = Field(default_factory=list, description="提取字段列表")
     advanced: Optional[AdvancedConfig] = Field(None, description="高级配置")
 
+    def required_selectors(self) -> list[str]:
+        """必需字段的CSS选择器（去重，保持顺序；XPath和正则字段浏览器里等不了，不算）"""
+        return list(dict.fromkeys(
+            f.selector for f in self.fields if f.required and f.selector_type == "css"
+        ))
+
+    def scroll_config(self) -> Optional[dict[str, Any]]:
+        """
+        转换成crawl配置里的scroll，不滚动时返回None
+        Convert to the crawl config "scroll" entry, None when not scrolling
+
+        按第一个CSS选择器的multiple字段计数：元素不再增长，或者数量到了它的limit就停
+        """
+        advanced = self.advanced
+        if not advanced or not advanced.scroll_to_load or advanced.max_scrolls < 1:
+            return None
+
+        listing = next((f for f in self.fields if f.multiple and f.selector_type == "css"), None)
+        return {
+            "max_scrolls": advanced.max_scrolls,
+            "target": advanced.scroll_target or (listing.selector if listing else None),
+            "quota": listing.limit if listing else None,
+        }
+
+    def to_crawl_config(self) -> dict[str, Any]:
+        """
+        转换成Crawl4AIWrapper.crawl的配置
+        Convert to a Crawl4AIWrapper.crawl config
+
+        delay/max_per_host交给爬虫的域名调度器执行；必需字段的选择器变成就绪条件，
+        数据渲染出来就立刻抓取，不用干等整页加载；同一组选择器也放进ready_selectors，
+        HTTP快速通道拿它检查服务端HTML，缺了就回退浏览器
+
+        Returns:
+            dict: 爬取配置
+        """
+        crawl_config: dict[str, Any] = {}
+        advanced = self.advanced
+
+        if advanced:
+            if advanced.delay > 0:
+                crawl_config["delay"] = advanced.delay
+            if advanced.max_per_host is not None:
+                crawl_config["max_per_host"] = advanced.max_per_host
+            if advanced.cache_ttl is not None:
+                crawl_config["cache_ttl"] = advanced.cache_ttl
+            if advanced.max_retries is not None:
+                crawl_config["retries"] = advanced.max_retries
+            block = advanced.block_config()
+            if block:
+                crawl_config["block"] = block
+
+            scroll = self.scroll_config()
+            if scroll:
+                crawl_config["scroll"] = scroll
+
+        ready_timeout = advanced.ready_timeout if advanced else DEFAULT_READY_TIMEOUT
+        selectors = self.required_selectors()
+        if selectors:
+            # HTTP快速通道拿这些选择器检查服务端HTML，缺了就说明要JS渲染
+            crawl_config["ready_selectors"] = selectors
+        if selectors and ready_timeout > 0:
+            crawl_config["wait_for"] = build_ready_condition(selectors, ready_timeout)
+            # 就绪条件自己会在ready_timeout后放行，这里的超时只是兜底
+            crawl_config["wait_for_timeout"] = ready_timeout + READY_TIMEOUT_GRACE
+
+        return crawl_config
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -127,6 +303,164 @@ class TemplateConfigSchema(BaseModel):
         }
 
 
+# ==================== 模板提取 ====================
+
+def _template_crawl_config(
+    template_config: TemplateConfigSchema,
+    plan: Optional[ExtractionPlan],
+    overrides: dict[str, Any],
+) -> dict[str, Any]:
+    """模板的爬取配置；要提取字段时多要一份原始HTML"""
+    crawl_config = {**template_config.to_crawl_config(), **overrides}
+    if plan is not None:
+        include = crawl_config.get("include") or DEFAULT_RESULT_FIELDS
+        if "html" not in include:
+            crawl_config["include"] = [*include, "html"]
+    return crawl_config
+
+
+def _split_html(result: dict[str, Any], keep: bool = False) -> tuple[dict[str, Any], str]:
+    """
+    把原始HTML从结果里拿出来（只在提取时用，调用方自己要了html时才留在结果里）
+
+    艹，结果可能来自缓存或被合并请求共享，复制一份再改
+    """
+    html = result.get("html") or ""
+    return {key: value for key, value in result.items() if keep or key != "html"}, html
+
+
+def _normalize(
+    template_config: TemplateConfigSchema,
+    results: list[dict[str, Any]],
+    urls: list[str],
+) -> None:
+    """按字段的normalize整列归一化extracted_data（同一域名的记录一起转换）"""
+    kinds = {f.name: f.normalize for f in template_config.fields if f.normalize}
+    if kinds and results:
+        normalize_records([r["extracted_data"] for r in results], kinds, urls)
+
+
+def _attach_extracted(
+    result: dict[str, Any],
+    plan: Optional[ExtractionPlan],
+    extracted: Optional[dict[str, Any]],
+) -> dict[str, Any]:
+    result["extracted_data"] = extracted or {}
+    if plan is not None:
+        result["missing_fields"] = plan.missing_required(result["extracted_data"])
+    return result
+
+
+async def crawl_with_template(
+    url: str,
+    template_config: TemplateConfigSchema,
+    crawler: Crawl4AIWrapper,
+    **overrides: Any,
+) -> dict[str, Any]:
+    """
+    按模板爬取并提取字段
+    Crawl with a template and extract its fields
+
+    封装器带了提取进程池时在进程池里解析和提取，不占事件循环
+
+    Args:
+        url: 目标URL
+        template_config: 模板配置Schema
+        crawler: Crawl4AI封装实例
+        **overrides: 覆盖模板生成的爬取配置
+
+    Returns:
+        dict: 爬取结果，多了extracted_data（字段名 -> 值，带normalize的字段已归一化）
+              和missing_fields（没取到的必需字段）
+    """
+    plan = compile_plan(template_config.fields)
+    result = await crawler.crawl(url, _template_crawl_config(template_config, plan, overrides))
+    if not result.get("success"):
+        return result
+
+    result, html = _split_html(result, keep="html" in (overrides.get("include") or ()))
+    extracted = None
+    if plan is not None:
+        pool = crawler.extract_pool
+        markdown = result.get("markdown")
+        if pool is not None:
+            extracted = await pool.extract(plan, html, base_url=url, markdown=markdown)
+        else:
+            extracted = plan.extract(html, base_url=url, markdown=markdown)
+    result = _attach_extracted(result, plan, extracted)
+    _normalize(template_config, [result], [url])
+    return result
+
+
+async def crawl_batch_with_template(
+    urls: list[str],
+    template_config: TemplateConfigSchema,
+    crawler: Crawl4AIWrapper,
+    max_concurrent: int = 5,
+    **overrides: Any,
+) -> list[dict[str, Any]]:
+    """
+    按模板批量爬取并提取字段
+    Batch crawl with a template and extract its fields
+
+    爬完的页面攒够一批（进程池的batch_size）就整批送去提取，提取和后面的爬取同时进行；
+    全部提取完后带normalize的字段整列归一化
+
+    Args:
+        urls: URL列表
+        template_config: 模板配置Schema
+        crawler: Crawl4AI封装实例
+        max_concurrent: 最大爬取并发数
+        **overrides: 覆盖模板生成的爬取配置
+
+    Returns:
+        list: 每个URL的结果（同crawl_with_template），顺序与输入一致
+    """
+    plan = compile_plan(template_config.fields)
+    crawl_config = _template_crawl_config(template_config, plan, overrides)
+    pool = crawler.extract_pool
+    results: list[Optional[dict[str, Any]]] = [None] * len(urls)
+    pending: list[tuple[int, str, Optional[str]]] = []
+    jobs: list[asyncio.Task] = []
+
+    async def flush(batch: list[tuple[int, str, Optional[str]]]) -> None:
+        pages = [(html, urls[index], markdown) for index, html, markdown in batch]
+        extracted = await pool.extract_many(plan, pages)
+        for (index, _, _), data in zip(batch, extracted):
+            _attach_extracted(results[index], plan, data)
+
+    try:
+        async for index, result in crawler.crawl_batch_stream(urls, crawl_config, max_concurrent):
+            if not result.get("success"):
+                results[index] = result
+                continue
+
+            results[index], html = _split_html(result, keep="html" in (overrides.get("include") or ()))
+            markdown = result.get("markdown")
+            if plan is None:
+                _attach_extracted(results[index], None, None)
+            elif pool is None:
+                extracted = plan.extract(html, base_url=urls[index], markdown=markdown)
+                _attach_extracted(results[index], plan, extracted)
+            else:
+                pending.append((index, html, markdown))
+                if len(pending) >= pool.batch_size:
+                    jobs.append(asyncio.create_task(flush(pending)))
+                    pending = []
+
+        if pending:
+            jobs.append(asyncio.create_task(flush(pending)))
+        await asyncio.gather(*jobs)
+    finally:
+        for job in jobs:
+            job.cancel()
+
+    # 整批一起归一化，每个字段每个域名只转换一次
+    extracted = [i for i, result in enumerate(results) if result and "extracted_data" in result]
+    _normalize(template_config, [results[i] for i in extracted], [urls[i] for i in extracted])
+    return results
+
+
 # ==================== 模板引擎 ====================
 
 class TemplateEngine:
@@ -183,27 +517,31 @@ class TemplateEngine:
         Returns:
             dict: 爬取结果（包含提取的字段数据）
         """
-        # 艹，先爬取基础内容
-        crawl_config = {}
-
-        # 应用高级配置
-        if template_config.advanced:
-            if template_config.advanced.delay > 0:
-                crawl_config["delay"] = template_config.advanced.delay
+        return await crawl_with_template(url, template_config, crawler)
 
-        # 执行基础爬取
-        result = await crawler.crawl(url, crawl_config)
-
-        if not result.get("success"):
-            return result
+    async def apply_template_batch(
+        self,
+        urls: list[str],
+        template_config: TemplateConfigSchema,
+        crawler: Crawl4AIWrapper,
+        max_concurrent: int = 5,
+    ) -> list[dict[str, Any]]:
+        """
+        批量应用模板（提取按批送进进程池）
+        Apply a template to many URLs (extraction shipped to the process pool in batches)
 
-        # 艹，现在根据模板字段提取数据
-        extracted_data = {}
-        # TODO: 实现字段提取逻辑（需要使用CSS选择器或LLM提取）
+        Args:
+            urls: URL列表
+            template_config: 模板配置Schema
+            crawler: Crawl4AI封装实例
+            max_concurrent: 最大爬取并发数
 
-        # 临时返回原始结果
-        result["extracted_data"] = extracted_data
-        return result
+        Returns:
+            list: 每个URL的爬取结果（包含提取的字段数据），顺序与输入一致
+        """
+        return await crawl_batch_with_template(
+            urls, template_config, crawler, max_concurrent=max_concurrent
+        )
 
     def load_template_from_file(self, file_path: Path) -> Optional[TemplateConfigSchema]:
         """
@@ -331,3 +669,22 @@ class BaseScenario(ABC):
         if self._config_schema is None:
             self._config_schema = self.get_schema()
         return self._config_schema
+
+    def crawl_config(self, **overrides: Any) -> dict[str, Any]:
+        """
+        场景的爬取配置（来自Schema的高级配置和必需字段），可以再覆盖
+        Crawl config derived from the scenario schema, with optional overrides
+        """
+        return {**self.config_schema.to_crawl_config(), **overrides}
+
+    async def crawl_and_extract(
+        self,
+        url: str,
+        crawler: Crawl4AIWrapper,
+        **overrides: Any,
+    ) -> dict[str, Any]:
+        """
+        按场景Schema爬取并提取字段（结果里带extracted_data），可以覆盖爬取配置
+        Crawl with the scenario schema and extract its fields
+        """
+        return await crawl_with_template(url, self.config_schema, crawler, **overrides)
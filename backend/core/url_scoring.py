@@ -0,0 +1,147 @@
+"""
+URL打分
+URL Scoring
+
+这个SB模块给best_first深度爬取的候选链接打分，分数越高越先爬
+This module scores candidate links for best_first deep crawls; higher scores are crawled first
+"""
+
+import re
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+from urllib.parse import unquote, urlsplit
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9一-鿿]+")
+
+# 导航类页面的路径特征（艹，登录、标签、翻页这些页面基本没价值）
+_CHROME_RE = re.compile(
+    r"/(login|logout|signin|signup|register|account|cart|privacy|terms|cookie|"
+    r"tag|tags|category|categories|page|search|share|feed|rss)(/|$)",
+    re.IGNORECASE,
+)
+
+
+def _tokens(text: str) -> set[str]:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+class URLScorer(ABC):
+    """
+    URL打分器基类
+    URL Scorer base class
+
+    子类实现score()，返回0~1之间的分数；weight决定在组合打分器里的权重
+    """
+
+    def __init__(self, weight: float = 1.0):
+        self.weight = weight
+
+    @abstractmethod
+    def score(self, url: str, depth: int, text: str = "", inbound: int = 1) -> float:
+        """
+        给候选链接打分（子类必须实现）
+        Score a candidate link (must be implemented by subclasses)
+
+        Args:
+            url: 规范化后的URL
+            depth: 链接所在深度
+            text: 链接文字
+            inbound: 目前发现的指向该URL的链接数
+
+        Returns:
+            float: 0~1之间的分数
+        """
+        pass
+
+
+class PathDepthScorer(URLScorer):
+    """路径越浅分数越高，导航类路径直接降到0"""
+
+    def __init__(self, weight: float = 1.0, max_segments: int = 8):
+        super().__init__(weight)
+        self.max_segments = max_segments
+
+    def score(self, url: str, depth: int, text: str = "", inbound: int = 1) -> float:
+        path = urlsplit(url).path
+        if _CHROME_RE.search(path):
+            return 0.0
+        segments = len([p for p in path.split("/") if p])
+        return max(0.0, 1.0 - segments / self.max_segments)
+
+
+class KeywordScorer(URLScorer):
+    """URL路径里命中模板关键词的比例"""
+
+    def __init__(self, keywords: Iterable[str], weight: float = 1.0):
+        super().__init__(weight)
+        self.keywords = {k.lower() for k in keywords if k}
+
+    def score(self, url: str, depth: int, text: str = "", inbound: int = 1) -> float:
+        if not self.keywords:
+            return 0.0
+        tokens = _tokens(unquote(urlsplit(url).path))
+        return len(self.keywords & tokens) / len(self.keywords)
+
+
+class LinkTextScorer(URLScorer):
+    """链接文字和关键词的相关度"""
+
+    def __init__(self, keywords: Iterable[str], weight: float = 1.0):
+        super().__init__(weight)
+        self.keywords = {k.lower() for k in keywords if k}
+
+    def score(self, url: str, depth: int, text: str = "", inbound: int = 1) -> float:
+        if not self.keywords or not text:
+            return 0.0
+        return len(self.keywords & _tokens(text)) / len(self.keywords)
+
+
+class InboundLinkScorer(URLScorer):
+    """被越多页面链接的URL越重要（按saturation封顶）"""
+
+    def __init__(self, weight: float = 1.0, saturation: int = 10):
+        super().__init__(weight)
+        self.saturation = saturation
+
+    def score(self, url: str, depth: int, text: str = "", inbound: int = 1) -> float:
+        return min(inbound, self.saturation) / self.saturation
+
+
+class CompositeScorer(URLScorer):
+    """
+    组合打分器：各打分器按权重加权平均
+    Composite scorer: weighted average of its scorers
+    """
+
+    def __init__(self, scorers: list[URLScorer]):
+        super().__init__(1.0)
+        self.scorers = scorers
+        self._total_weight = sum(s.weight for s in scorers) or 1.0
+
+    def score(self, url: str, depth: int, text: str = "", inbound: int = 1) -> float:
+        return sum(
+            s.weight * s.score(url, depth, text, inbound) for s in self.scorers
+        ) / self._total_weight
+
+
+def default_scorer(keywords: Optional[Iterable[str]] = None) -> CompositeScorer:
+    """
+    默认打分器：路径深度 + 关键词 + 链接文字 + 入链数
+    Default scorer: path depth + keywords + link text + inbound links
+
+    Args:
+        keywords: 关键词（一般来自模板）
+
+    Returns:
+        CompositeScorer: 组合打分器
+    """
+    keywords = list(keywords or [])
+    scorers: list[URLScorer] = [
+        PathDepthScorer(weight=1.0),
+        InboundLinkScorer(weight=1.0),
+    ]
+    if keywords:
+        scorers.append(KeywordScorer(keywords, weight=2.0))
+        scorers.append(LinkTextScorer(keywords, weight=2.0))
+    return CompositeScorer(scorers)
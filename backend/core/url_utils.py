@@ -0,0 +1,328 @@
+"""
+URL规范化与去重
+URL Canonicalization and Deduplication
+
+这个SB模块把同一页面的不同写法归一，并用紧凑的指纹集合记录已见URL
+This module canonicalizes equivalent URLs and records seen URLs in a compact fingerprint set
+"""
+
+import hashlib
+import json
+import math
+from array import array
+from typing import Any, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+
+# 默认端口（规范化时去掉）
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# 跟踪参数（艹，这些参数不影响页面内容，全部去掉）
+TRACKING_PARAMS = frozenset({
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
+    "utm_id", "utm_name", "gclid", "dclid", "fbclid", "msclkid", "yclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "igshid", "spm", "ref_src",
+})
+
+
+def canonicalize_url(url: str, base: Optional[str] = None) -> str:
+    """
+    规范化URL
+    Canonicalize URL
+
+    - scheme和host转小写，去掉默认端口
+    - 去掉fragment和跟踪参数，其余query参数排序
+    - 空路径补成"/"，末尾斜杠统一去掉（根路径除外）
+
+    Args:
+        url: 原始URL（可以是相对路径）
+        base: 相对路径的基准URL（可选）
+
+    Returns:
+        str: 规范化后的URL；无法解析时原样返回
+    """
+    if base:
+        url = urljoin(base, url)
+
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    netloc = host
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+    if port is not None and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{netloc}:{port}"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    query_pairs = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    ]
+    query = urlencode(sorted(query_pairs))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+# 只影响调度、不影响结果内容的配置项，不参与缓存键
+NON_RESULT_CONFIG_KEYS = frozenset({
+    "delay", "max_per_host", "fetch_mode", "revalidate", "cache_mode", "cache_ttl", "adaptive",
+    "retries", "timeout",
+})
+
+
+def crawl_cache_key(url: str, config: Optional[dict[str, Any]] = None) -> str:
+    """
+    计算爬取结果的缓存键：规范化URL + 配置的规范哈希
+    Compute the crawl result cache key: canonical URL + canonical config hash
+
+    Args:
+        url: 目标URL
+        config: 爬取配置
+
+    Returns:
+        str: 缓存键
+    """
+    effective = {
+        k: v for k, v in (config or {}).items() if k not in NON_RESULT_CONFIG_KEYS
+    }
+    blob = json.dumps(effective, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.blake2b(blob.encode("utf-8"), digest_size=8).hexdigest()
+    return f"{canonicalize_url(url)}#{digest}"
+
+
+def url_fingerprint(url: str) -> int:
+    """
+    计算URL的64位指纹
+    Compute a 64-bit URL fingerprint
+
+    Args:
+        url: 已规范化的URL
+
+    Returns:
+        int: 64位指纹
+    """
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class BloomFilter:
+    """
+    布隆过滤器
+    Bloom Filter
+
+    固定内存，可能误判为"已见"（漏爬极少数页面），不会误判为"未见"
+    Fixed memory; may report false "seen" (skipping a few pages), never false "unseen"
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        初始化布隆过滤器
+
+        Args:
+            capacity: 预计容纳的元素数量
+            error_rate: 目标误判率
+        """
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("艹，capacity必须为正数，error_rate必须在(0, 1)之间")
+
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, item: str):
+        # 双重哈希：一次blake2b拆成两个64位哈希，生成k个位置
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> bool:
+        """
+        加入元素
+
+        Returns:
+            bool: 是否为新元素
+        """
+        added = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self._count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[pos // 8] & (1 << (pos % 8))
+            for pos in self._positions(item)
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def memory_bytes(self) -> int:
+        """位数组占用的字节数"""
+        return len(self._bits)
+
+
+class _FingerprintTable:
+    """
+    64位指纹的开放寻址哈希表
+    Open-addressing hash table of 64-bit fingerprints
+
+    艹，set[int]每个元素七十多字节，这里指纹直接存在array('Q')里，
+    负载因子不超过1/2，每个URL只占16~32字节。
+    """
+
+    __slots__ = ("_slots", "_mask", "_count")
+
+    def __init__(self, capacity: int = 1024):
+        self._slots = array("Q", bytes(8 * capacity))
+        self._mask = capacity - 1
+        self._count = 0
+
+    @staticmethod
+    def _key(fingerprint: int) -> int:
+        # 0 用来标记空槽，指纹恰好为0时当作1（2^-64的概率，无所谓）
+        return fingerprint or 1
+
+    def _probe(self, key: int) -> int:
+        """线性探测，返回key所在的槽或第一个空槽"""
+        slots, mask = self._slots, self._mask
+        i = key & mask
+        while True:
+            value = slots[i]
+            if value == key or value == 0:
+                return i
+            i = (i + 1) & mask
+
+    def add(self, fingerprint: int) -> bool:
+        """
+        加入指纹
+
+        Returns:
+            bool: 是否为新指纹
+        """
+        key = self._key(fingerprint)
+        i = self._probe(key)
+        if self._slots[i] == key:
+            return False
+        self._slots[i] = key
+        self._count += 1
+        if self._count * 2 > len(self._slots):
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._slots = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._slots) - 1
+        for key in old:
+            if key:
+                self._slots[self._probe(key)] = key
+
+    def __contains__(self, fingerprint: int) -> bool:
+        key = self._key(fingerprint)
+        return self._slots[self._probe(key)] == key
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def memory_bytes(self) -> int:
+        """槽数组占用的字节数"""
+        return len(self._slots) * self._slots.itemsize
+
+
+class SeenURLSet:
+    """
+    已见URL集合
+    Seen URL Set
+
+    艹，几百万个URL字符串放set里内存直接爆！前max_exact个64位指纹存进
+    紧凑的开放寻址表（精确），超出后转入固定大小的布隆过滤器，内存有上限。
+    """
+
+    def __init__(
+        self,
+        max_exact: int = 1_000_000,
+        bloom_capacity: int = 10_000_000,
+        bloom_error_rate: float = 0.001,
+    ):
+        """
+        初始化已见集合
+
+        Args:
+            max_exact: 精确指纹层最多容纳多少个URL
+            bloom_capacity: 布隆层预计容量（超出精确层后才创建）
+            bloom_error_rate: 布隆层目标误判率
+        """
+        self.max_exact = max_exact
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._exact = _FingerprintTable()
+        self._bloom: Optional[BloomFilter] = None
+
+    def add(self, url: str) -> bool:
+        """
+        规范化后加入URL（指纹同url_fingerprint(canonicalize_url(url))）
+        Canonicalize and add a URL
+
+        Args:
+            url: URL
+
+        Returns:
+            bool: 是否为新URL（之前没见过）
+        """
+        canonical = canonicalize_url(url)
+        fingerprint = url_fingerprint(canonical)
+
+        if fingerprint in self._exact:
+            return False
+        if self._bloom is not None and canonical in self._bloom:
+            return False
+
+        if len(self._exact) < self.max_exact:
+            self._exact.add(fingerprint)
+            return True
+
+        if self._bloom is None:
+            self._bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+        return self._bloom.add(canonical)
+
+    def add_fingerprint(self, fingerprint: int) -> None:
+        """
+        直接加入指纹（从断点恢复时用）
+        Add a raw fingerprint (used when restoring from a checkpoint)
+        """
+        self._exact.add(fingerprint)
+
+    def __contains__(self, url: str) -> bool:
+        canonical = canonicalize_url(url)
+        if url_fingerprint(canonical) in self._exact:
+            return True
+        return self._bloom is not None and canonical in self._bloom
+
+    def __len__(self) -> int:
+        return len(self._exact) + (len(self._bloom) if self._bloom else 0)
+
+    @property
+    def memory_bytes(self) -> int:
+        """精确层和布隆层一共占用的字节数"""
+        return self._exact.memory_bytes + (self._bloom.memory_bytes if self._bloom else 0)
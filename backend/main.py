@@ -12,6 +12,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from .models.database import init_db, close_db
+from .core.browser_pool import init_browser_pool, close_browser_pool
 from .api import crawl, templates, monitor
 
 
@@ -25,11 +26,15 @@ async def lifespan(app: FastAPI):
     print("[START] Starting Awesome-crawl4AI backend service...")
     await init_db()
     print("[OK] Database initialized")
+    pool = await init_browser_pool()
+    print(f"[OK] Browser pool warmed up ({pool.size} browsers)")
 
     yield
 
     # 关闭时清理
     print("[STOP] Shutting down service...")
+    await close_browser_pool()
+    print("[OK] Browser pool drained")
     await close_db()
     print("[OK] Service closed")
 
@@ -53,6 +53,7 @@ class AcademicCollector(BaseScenario):
                     name="publication_date",
                     selector="time, .date, .pub-date",
                     type="text",
+                    normalize="date",
                 ),
                 ExtractField(
                     name="pdf_url",
@@ -68,6 +69,7 @@ class AcademicCollector(BaseScenario):
             advanced=AdvancedConfig(
                 delay=1.5,
                 deep_crawl=False,  # 艹，论文一般不需要深度爬取
+                block_profile="text",
             ),
         )
 
@@ -82,13 +84,12 @@ class AcademicCollector(BaseScenario):
         Returns:
             dict: 提取结果
         """
-        result = await crawler.crawl(url)
+        result = await self.crawl_and_extract(url, crawler)
 
         if not result.get("success"):
             return result
 
         # TODO: 实现BibTeX格式化
-        # 暂时返回原始结果
         return result
 
 
@@ -50,6 +50,7 @@ class DocsArchiver(BaseScenario):
                 max_pages=100,     # 最多100页
                 strategy="bfs",     # BFS策略
                 delay=0.5,
+                block_profile="text",
             ),
         )
 
@@ -69,7 +70,8 @@ class DocsArchiver(BaseScenario):
             url,
             strategy="bfs",
             max_pages=50,
-            config={"cache_mode": "bypass"},
+            config=self.crawl_config(cache_mode="bypass"),
+            max_concurrent=4,
         )
 
         return result
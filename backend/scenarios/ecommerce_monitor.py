@@ -37,11 +37,13 @@ class EcommerceMonitor(BaseScenario):
                     selector=".price, [itemprop*='price'], .product-price",
                     type="text",
                     required=True,
+                    normalize="price",
                 ),
                 ExtractField(
                     name="original_price",
                     selector=".original-price, .was-price",
                     type="text",
+                    normalize="price",
                 ),
                 ExtractField(
                     name="stock_status",
@@ -52,6 +54,7 @@ class EcommerceMonitor(BaseScenario):
                     name="rating",
                     selector=".rating, [itemprop*='rating']",
                     type="text",
+                    normalize="number",
                 ),
                 ExtractField(
                     name="reviews_count",
@@ -69,6 +72,7 @@ class EcommerceMonitor(BaseScenario):
                 delay=2.0,  # 艹，电商网站反爬严格，延迟要长
                 scroll_to_load=True,  # 可能需要滚动加载评论
                 max_scrolls=3,
+                block_profile="lean",  # 图片可能要懒加载，只拦字体视频和统计
             ),
         )
 
@@ -83,14 +87,8 @@ class EcommerceMonitor(BaseScenario):
         Returns:
             dict: 提取结果
         """
-        result = await crawler.crawl(url)
-
-        if not result.get("success"):
-            return result
-
-        # TODO: 实现智能价格解析（去除符号、提取数字等）
-        # 暂时返回原始结果
-        return result
+        # 艹，价格在提取时已经归一化成数字（price_currency是货币代码），直接能做历史对比
+        return await self.crawl_and_extract(url, crawler)
 
 
 # 自动注册
@@ -48,6 +48,7 @@ class NewsCrawler(BaseScenario):
                     name="publish_date",
                     selector="time, .date, [datetime], .publish-date",
                     type="text",
+                    normalize="date",
                 ),
                 ExtractField(
                     name="tags",
@@ -59,6 +60,7 @@ class NewsCrawler(BaseScenario):
             advanced=AdvancedConfig(
                 delay=1.0,  # 艹，新闻网站要友好点，加1秒延迟
                 scroll_to_load=False,
+                block_profile="text",  # 只要文字，图片视频字体统计全拦掉
             ),
         )
 
@@ -73,15 +75,8 @@ class NewsCrawler(BaseScenario):
         Returns:
             dict: 提取结果
         """
-        # 艹，先爬取原始内容
-        result = await crawler.crawl(url)
-
-        if not result.get("success"):
-            return result
-
-        # TODO: 实现智能字段提取
-        # 暂时返回原始结果
-        return result
+        # 艹，爬取并按Schema的字段提取（结果里的extracted_data）
+        return await self.crawl_and_extract(url, crawler)
 
 
 # 自动注册
@@ -8,6 +8,8 @@ Specialized for intelligent table extraction from web pages
 
 from typing import Any
 from .base import BaseScenario
+from ..core.crawler import DEFAULT_RESULT_FIELDS
+from ..core.table_parser import parse_tables
 from ..core.template_engine import TemplateConfigSchema, ExtractField, AdvancedConfig
 
 
@@ -46,6 +48,7 @@ class TableExtractor(BaseScenario):
             ],
             advanced=AdvancedConfig(
                 delay=0.5,
+                block_profile="text",
             ),
         )
 
@@ -58,20 +61,19 @@ class TableExtractor(BaseScenario):
             crawler: Crawl4AI封装实例
 
         Returns:
-            dict: 提取结果（包含表格数据）
+            dict: 提取结果，tables是每个表格的列式数据
+                  （caption/headers/types/columns/row_count，合并单元格已展开，数值和日期列已转换）
         """
-        # 艹，表格提取需要使用Crawl4AI的表格功能
-        config = {
-            "word_count_threshold": 1,
-        }
-
-        result = await crawler.crawl(url, config)
+        # 艹，表格单元格字数少，别被字数阈值过滤掉
+        result = await self.crawl_and_extract(
+            url, crawler, word_count_threshold=1, include=[*DEFAULT_RESULT_FIELDS, "html"],
+        )
 
         if not result.get("success"):
             return result
 
-        # TODO: 实现智能表格解析（处理合并单元格等）
-        # 暂时返回原始结果
+        html = result.pop("html", None) or ""
+        result["tables"] = [table.to_dict() for table in parse_tables(html, base_url=url)]
         return result
 
 
@@ -22,15 +22,19 @@ class BatchCrawlRequest(BaseModel):
     urls: List[str] = Field(..., description="URL列表", min_length=1, max_length=100)
     template_id: Optional[int] = Field(None, description="使用的模板ID（可选）")
     config: Optional[Dict[str, Any]] = Field(None, description="爬取配置覆盖")
-    max_concurrent: int = Field(5, description="最大并发数", ge=1, le=20)
+    max_concurrent: int = Field(5, description="最大并发数（adaptive时是并发上限）", ge=1, le=20)
+    adaptive: bool = Field(False, description="是否按延迟和错误率自动调节并发（AIMD）")
+    deadline: Optional[float] = Field(None, description="整个批量的截止时间（秒），到点后没完成的URL记为超时失败", gt=0)
 
 
 class DeepCrawlRequest(BaseModel):
     """深度爬取请求"""
     url: str = Field(..., description="起始URL")
-    strategy: str = Field("bfs", description="爬取策略：bfs/dfs")
+    strategy: str = Field("bfs", description="爬取策略：bfs/dfs/best_first")
     max_pages: int = Field(10, description="最大页面数", ge=1, le=1000)
     max_depth: int = Field(3, description="最大深度", ge=1, le=10)
+    max_concurrent: int = Field(5, description="并发worker数量", ge=1, le=20)
+    keywords: Optional[List[str]] = Field(None, description="best_first策略的URL打分关键词")
     config: Optional[Dict[str, Any]] = Field(None, description="爬取配置")
 
 
@@ -6,6 +6,7 @@ Pytest Configuration and Fixtures
 """
 
 import asyncio
+import inspect
 import os
 import sys
 import tempfile
@@ -141,6 +142,50 @@ def mock_crawler():
     return crawler
 
 
+@pytest.fixture
+def fake_crawler():
+    """
+    不开浏览器的假爬虫封装器工厂 / Factory for browserless fake crawler wrappers
+
+    艹，批量、深度爬取、模板这些测试都只想换掉crawl()，别每个测试类自己再抄一个子类！
+
+    用法 / Usage:
+        crawler = fake_crawler(handler, **wrapper_kwargs)
+
+    handler(url, config)返回结果字典（可以是协程），测试中途可以直接换crawler.handler。
+    每个实例自己记录calls、cancelled、active、peak，测试之间互不干扰。
+    """
+    from core.crawler import Crawl4AIWrapper
+
+    class FakeCrawler(Crawl4AIWrapper):
+        def __init__(self, handler, **kwargs):
+            kwargs.setdefault("crawler", MagicMock())
+            kwargs.setdefault("page_pool", MagicMock())
+            super().__init__(**kwargs)
+            self.handler = handler
+            self.calls: list[str] = []
+            self.cancelled: list[str] = []
+            self.active = 0
+            self.peak = 0
+
+        async def crawl(self, url, config=None):
+            self.calls.append(url)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                result = self.handler(url, config)
+                if inspect.isawaitable(result):
+                    result = await result
+                return result
+            except asyncio.CancelledError:
+                self.cancelled.append(url)
+                raise
+            finally:
+                self.active -= 1
+
+    return FakeCrawler
+
+
 # ============================================
 # 测试数据 Fixtures / Test Data Fixtures
 # ============================================
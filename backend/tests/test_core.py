@@ -5,6 +5,8 @@ Core Module Tests
 艹，测试模板引擎和场景注册表！
 """
 
+from unittest.mock import MagicMock
+
 import pytest
 from pydantic import ValidationError
 
@@ -15,6 +17,20 @@ from core.template_engine import (
     TemplateEngine,
 )
 from core.scenario_registry import ScenarioRegistry, register_scenario, get_registry
+from core.politeness import HostScheduler, get_host
+from core.url_utils import BloomFilter, SeenURLSet, canonicalize_url
+from core.frontier import BestFirstFrontier, FrontierEntry
+from core.url_scoring import PathDepthScorer, default_scorer
+from core.http_fetcher import RenderModeLearner, needs_js_rendering
+from core.revalidation import ValidatorStore
+from core.result_cache import ResultCache
+from core.single_flight import SingleFlight
+from core.adaptive_limiter import AdaptiveLimiter, classify_result
+from core.retry import CircuitBreaker, RetryPolicy, classify_error
+from core.resource_blocking import RequestBlocker, resolve_profile
+from core.blocklist import DomainBlocklist
+from core.scroll_loader import ScrollPlan, ScrollReport, run_scroll
+from core.extractor import compile_plan, parse_number
 
 
 @pytest.mark.unit
@@ -187,6 +203,41 @@ class TestTemplateEngine:
         assert len(result["errors"]) > 0
 
 
+@pytest.mark.unit
+class TestReadinessCondition:
+    """就绪条件测试 / Readiness condition tests"""
+
+    def test_required_fields_become_wait_for(self):
+        """测试必需字段生成wait_for / Test required fields produce wait_for"""
+        schema = TemplateConfigSchema(
+            name="test",
+            fields=[
+                ExtractField(name="title", selector="h1", required=True),
+                ExtractField(name="body", selector="article p, .content", required=True),
+                ExtractField(name="tags", selector=".tags a"),
+            ],
+            advanced=AdvancedConfig(ready_timeout=3),
+        )
+        config = schema.to_crawl_config()
+        assert config["wait_for"].startswith("js:")
+        assert '"h1"' in config["wait_for"] and ".tags a" not in config["wait_for"]
+        assert "3000" in config["wait_for"]
+        assert config["wait_for_timeout"] > 3
+        assert config["ready_selectors"] == ["h1", "article p, .content"]
+
+    def test_no_condition_without_required_fields(self):
+        """测试没有必需字段或超时为0时不等 / Test no condition without required fields"""
+        schema = TemplateConfigSchema(
+            name="test",
+            fields=[ExtractField(name="title", selector="h1")],
+        )
+        assert "wait_for" not in schema.to_crawl_config()
+
+        schema.fields[0].required = True
+        schema.advanced = AdvancedConfig(ready_timeout=0)
+        assert "wait_for" not in schema.to_crawl_config()
+
+
 @pytest.mark.unit
 class TestScenarioRegistry:
     """ScenarioRegistry 测试 / ScenarioRegistry tests"""
@@ -265,6 +316,1603 @@ class TestScenarioRegistry:
         assert scenario is not None
 
 
+@pytest.mark.unit
+class TestHostScheduler:
+    """HostScheduler 测试 / HostScheduler tests"""
+
+    def test_get_host(self):
+        """测试域名提取 / Test host extraction"""
+        assert get_host("https://Example.COM:8080/a?b=1") == "example.com"
+        assert get_host("not a url") == ""
+
+    async def test_same_host_respects_delay(self):
+        """测试同域名最小间隔 / Test same-host minimum interval"""
+        import asyncio
+        import time
+
+        scheduler = HostScheduler()
+        starts = []
+
+        async def job():
+            async with scheduler.slot("https://a.com/x", delay=0.1):
+                starts.append(time.monotonic())
+
+        await asyncio.gather(job(), job(), job())
+
+        starts.sort()
+        assert starts[1] - starts[0] >= 0.09
+        assert starts[2] - starts[1] >= 0.09
+
+    async def test_concurrency_cap_per_host(self):
+        """测试域名并发上限，其他域名不受影响 / Test per-host cap, other hosts unaffected"""
+        import asyncio
+
+        scheduler = HostScheduler(max_per_host=1)
+        peak = {"a.com": 0, "b.com": 0}
+        active = {"a.com": 0, "b.com": 0}
+
+        async def job(host):
+            async with scheduler.slot(f"https://{host}/"):
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+                await asyncio.sleep(0.01)
+                active[host] -= 1
+
+        await asyncio.gather(*(job(h) for h in ["a.com", "b.com"] * 3))
+
+        assert peak == {"a.com": 1, "b.com": 1}
+
+    async def test_idle_hosts_are_pruned_after_delay(self):
+        """测试间隔内结束的域名状态到点后删掉 / Test idle host state is dropped once its delay passes"""
+        import asyncio
+
+        scheduler = HostScheduler(default_delay=0.05)
+        for host in ("a.com", "b.com"):
+            async with scheduler.slot(f"https://{host}/"):
+                pass
+        # 间隔还没过完，还得记着下次什么时候能发车
+        assert set(scheduler.stats()) == {"a.com", "b.com"}
+
+        async with scheduler.slot("https://a.com/"):
+            await asyncio.sleep(0.07)
+            # 有请求在用的域名到点也不删
+            assert "a.com" in scheduler.stats() and "b.com" not in scheduler.stats()
+        await asyncio.sleep(0.07)
+        assert scheduler.stats() == {}
+
+    async def test_default_is_unbounded(self):
+        """测试默认不限域名并发，只有显式给了上限才卡 / Test caps only apply when set"""
+        import asyncio
+
+        from core.template_engine import AdvancedConfig
+
+        scheduler = HostScheduler()
+        peak = {None: 0, 2: 0}
+        active = {None: 0, 2: 0}
+
+        async def job(cap):
+            async with scheduler.slot("https://a.com/", max_per_host=cap):
+                active[cap] += 1
+                peak[cap] = max(peak[cap], active[cap])
+                await asyncio.sleep(0.01)
+                active[cap] -= 1
+
+        await asyncio.gather(*(job(None) for _ in range(5)))
+        await asyncio.gather(*(job(2) for _ in range(5)))
+
+        assert peak == {None: 5, 2: 2}
+        assert AdvancedConfig().max_per_host is None
+
+
+@pytest.mark.unit
+class TestUrlUtils:
+    """URL 规范化与去重测试 / URL canonicalization and dedup tests"""
+
+    def test_canonicalize_equivalent_urls(self):
+        """测试等价URL归一 / Test equivalent URLs collapse"""
+        variants = [
+            "https://Example.com/a",
+            "https://example.com:443/a/",
+            "https://example.com/a#section",
+            "https://example.com/a?utm_source=x&utm_medium=y",
+        ]
+        assert {canonicalize_url(u) for u in variants} == {"https://example.com/a"}
+
+    def test_canonicalize_sorts_query_and_resolves_relative(self):
+        """测试query排序和相对路径 / Test query sorting and relative resolution"""
+        assert canonicalize_url("/p?b=2&a=1", base="http://x.com/dir/") == "http://x.com/p?a=1&b=2"
+        assert canonicalize_url("http://x.com:8080") == "http://x.com:8080/"
+
+    def test_seen_set_spills_to_bloom(self):
+        """测试超出精确层后转入布隆层 / Test spill into the bloom tier"""
+        seen = SeenURLSet(max_exact=10, bloom_capacity=1000)
+        for i in range(50):
+            assert seen.add(f"https://a.com/{i}") is True
+        assert seen.add("https://a.com/3/") is False
+        assert seen.add("https://a.com/42#top") is False
+        assert "https://a.com/42" in seen
+        assert len(seen) == 50
+
+    def test_seen_set_exact_tier_is_compact(self):
+        """测试精确层每个URL只占几十字节 / Test the exact tier stays compact"""
+        seen = SeenURLSet(max_exact=20_000)
+        for i in range(20_000):
+            assert seen.add(f"https://a.com/page/{i}") is True
+        assert all(f"https://a.com/page/{i}" in seen for i in range(0, 20_000, 97))
+        assert "https://a.com/page/20000" not in seen
+        assert seen.add("https://a.com/page/123") is False
+        assert len(seen) == 20_000
+        assert seen.memory_bytes <= 20_000 * 32
+
+    def test_bloom_filter_no_false_negatives(self):
+        """测试布隆过滤器无漏判 / Test bloom filter has no false negatives"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f"item-{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        assert all(item in bloom for item in items)
+
+
+@pytest.mark.unit
+class TestBestFirst:
+    """best_first 待爬队列与打分测试 / best_first frontier and scoring tests"""
+
+    def test_frontier_pops_highest_score(self):
+        """测试按分数出队 / Test pops by score"""
+        frontier = BestFirstFrontier()
+        for url, score in [("a", 0.1), ("b", 0.9), ("c", 0.5)]:
+            frontier.push(FrontierEntry(url, 1, score=score))
+
+        assert frontier.reprioritize("a", 1.0) is True
+        assert frontier.reprioritize("missing", 1.0) is False
+        assert [frontier.pop().url for _ in range(3)] == ["a", "b", "c"]
+        assert len(frontier) == 0
+
+    def test_navigation_chrome_scores_low(self):
+        """测试导航页分数低 / Test navigation chrome scores low"""
+        scorer = PathDepthScorer()
+        assert scorer.score("https://a.com/login", 1) == 0.0
+        assert scorer.score("https://a.com/docs", 1) > scorer.score("https://a.com/a/b/c/d", 1)
+
+    def test_keywords_boost_relevant_links(self):
+        """测试关键词加分 / Test keywords boost relevant links"""
+        scorer = default_scorer(["api", "guide"])
+        relevant = scorer.score("https://a.com/docs/api-guide", 1, "API guide")
+        other = scorer.score("https://a.com/docs/about", 1, "About us")
+        assert relevant > other
+
+
+@pytest.mark.unit
+class TestHttpFastPath:
+    """HTTP 快速通道测试 / HTTP fast path tests"""
+
+    def test_needs_js_rendering(self):
+        """测试JS渲染检测 / Test JS rendering detection"""
+        spa = '<html><body><div id="root"></div><script src="app.js"></script></body></html>'
+        article = "<html><body><article>" + "word " * 100 + "</article><script>x()</script></body></html>"
+        assert needs_js_rendering(spa) is True
+        assert needs_js_rendering(article) is False
+
+    def test_learner_remembers_js_hosts(self):
+        """测试按域名记住需要JS / Test learner remembers JS hosts"""
+        learner = RenderModeLearner(reprobe_every=3)
+        assert learner.prefer_http("https://spa.com/a") is True
+        learner.record("https://spa.com/a", needs_js=True)
+        assert [learner.prefer_http("https://spa.com/b") for _ in range(3)] == [False, False, True]
+
+    def test_learner_rechecks_static_hosts(self):
+        """测试静态域名定期走浏览器复查 / Test static hosts are periodically rechecked"""
+        learner = RenderModeLearner(reprobe_every=3)
+        learner.record("https://shop.com/a", needs_js=False, text_chars=300)
+        # HTTP探测结论没变，不重置复查计数
+        assert learner.prefer_http("https://shop.com/b") is True
+        learner.record("https://shop.com/b", needs_js=False, text_chars=300)
+        assert [learner.prefer_http("https://shop.com/c") for _ in range(2)] == [True, False]
+
+        assert learner.check_rendered("https://shop.com/c", "<p>" + "x" * 500 + "</p>") is False
+        assert learner.check_rendered("https://shop.com/c", "<p>" + "x" * 1000 + "</p>") is True
+        assert learner.prefer_http("https://shop.com/d") is False
+        assert learner.stats()["relearned"] == 1
+
+    def test_ready_selectors(self):
+        """测试就绪条件的选择器在静态HTML上检查 / Test readiness selectors on static HTML"""
+        from core.crawler import ready_selectors
+        from core.http_fetcher import missing_selectors
+
+        html = '<div class="item"><span class="price">9</span></div>'
+        assert missing_selectors(html, [".item .price", "h1", "[["]) == ["h1"]
+        assert missing_selectors("", [".price"]) == [".price"]
+
+        assert ready_selectors({}) == []
+        assert ready_selectors({"wait_for": "css:.price"}) == [".price"]
+        assert ready_selectors({"ready_selectors": ["h1"], "wait_for": "js:() => true"}) == ["h1"]
+        assert ready_selectors({"wait_for": "js:() => window.ready"}) is None
+
+    async def test_missing_ready_selector_falls_back_to_browser(self):
+        """测试HTTP拿到的HTML缺必需元素时回退浏览器并记住 / Test missing selectors fall back"""
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock
+
+        import httpx
+
+        from core.crawler import Crawl4AIWrapper
+        from core.http_fetcher import HttpFetcher
+
+        body = "<html><body><article>" + "word " * 100 + "</article>{}</body></html>"
+        fetcher = HttpFetcher()
+        fetcher.fetch = AsyncMock()
+
+        def serve(extra):
+            fetcher.fetch.return_value = httpx.Response(
+                200,
+                html=body.format(extra),
+                request=httpx.Request("GET", "https://shop.com/p"),
+            )
+
+        class Wrapper(Crawl4AIWrapper):
+            async def _crawl_browser(self, url, config, revalidate_key=None, recheck=False):
+                return {"success": True, "route": "browser"}
+
+        crawler = MagicMock()
+        crawler.arun = AsyncMock(return_value=SimpleNamespace(
+            success=True, status_code=200, html="", markdown=None, extracted_content=None,
+            links=None, media=None, metadata=None, screenshot=None,
+        ))
+        wrapper = Wrapper(
+            crawler=crawler, page_pool=MagicMock(), http_fetcher=fetcher, fetch_mode="auto"
+        )
+        config = {"ready_selectors": [".price"], "wait_for": "js:() => true"}
+
+        try:
+            serve('<span class="price">9</span>')
+            result = await wrapper._fetch_by_mode("https://shop.com/p", config, None)
+            assert "route" not in result and fetcher.learner.stats()["static_hosts"] == 1
+            # raw HTML的相对链接按最终URL解析
+            assert crawler.arun.call_args.kwargs["config"].base_url == "https://shop.com/p"
+
+            serve("")
+            result = await wrapper._fetch_by_mode("https://shop.com/p", config, None)
+            assert result["route"] == "browser"
+            assert fetcher.learner.stats()["js_hosts"] == 1
+
+            # 只有js:条件时不知道在等什么，直接走浏览器，不抓HTTP
+            fetcher.fetch.reset_mock()
+            result = await wrapper._fetch_by_mode(
+                "https://other.com/", {"wait_for": "js:() => window.ready"}, None
+            )
+            assert result["route"] == "browser"
+            fetcher.fetch.assert_not_called()
+        finally:
+            await fetcher.close()
+
+
+@pytest.mark.unit
+class TestValidatorStore:
+    """条件重验证测试 / Conditional revalidation tests"""
+
+    def test_conditional_headers_and_reuse(self):
+        """测试条件请求头和结果复用 / Test conditional headers and reuse"""
+        store = ValidatorStore()
+        assert store.conditional_headers("k") == {}
+        assert store.reuse("k", "not_modified") is None
+
+        store.put("k", "hash1", {"success": True, "markdown": "x"},
+                  etag='"abc"', last_modified="Wed, 21 Oct 2015 07:28:00 GMT")
+        headers = store.conditional_headers("k")
+        assert headers["If-None-Match"] == '"abc"'
+        assert "If-Modified-Since" in headers
+
+        reused = store.reuse("k", "not_modified")
+        assert reused["markdown"] == "x"
+        assert reused["not_modified"] is True
+        assert store.stats()["not_modified"] == 1
+
+    def test_put_stores_a_copy(self):
+        """测试之后改结果不影响存下的副本 / Test later mutations don't leak into the stored result"""
+        store = ValidatorStore()
+        result = {"success": True, "markdown": "x"}
+        store.put("k", "hash1", result)
+        result["retries"] = 2
+        result["blocked"] = {"requests": 3}
+
+        reused = store.reuse("k", "unchanged")
+        assert "retries" not in reused and "blocked" not in reused
+
+    def test_lru_bound(self):
+        """测试容量上限 / Test capacity bound"""
+        store = ValidatorStore(max_entries=2)
+        for key in ["a", "b", "c"]:
+            store.put(key, key, {"success": True})
+        assert store.get("a") is None
+        assert store.stats()["entries"] == 2
+
+
+@pytest.mark.unit
+class TestResultCache:
+    """结果缓存测试 / Result cache tests"""
+
+    async def test_memory_lru_and_ttl(self):
+        """测试内存层LRU和过期 / Test memory LRU and TTL"""
+        import asyncio
+
+        cache = ResultCache(default_ttl=60, max_memory_bytes=200)
+        await cache.put("a", {"success": True, "markdown": "a" * 80})
+        await cache.put("b", {"success": True, "markdown": "b" * 80})
+        await cache.put("c", {"success": True, "markdown": "c" * 80})
+        assert await cache.get("a") is None
+        assert (await cache.get("c"))["markdown"] == "c" * 80
+
+        await cache.put("short", {"success": True}, ttl=0.01)
+        await asyncio.sleep(0.02)
+        assert await cache.get("short") is None
+
+        await cache.put("skip", {"success": True}, ttl=0)
+        assert await cache.get("skip") is None
+
+    async def test_disk_survives_restart(self, tmp_path):
+        """测试磁盘层跨实例保留 / Test disk tier survives a new instance"""
+        path = tmp_path / "results.db"
+        cache = ResultCache(disk_path=path)
+        await cache.put("k", {"success": True, "title": "标题"})
+        cache.close()
+
+        cache = ResultCache(disk_path=path)
+        assert (await cache.get("k"))["title"] == "标题"
+        assert cache.stats()["disk_hits"] == 1
+        assert (await cache.get("k"))["title"] == "标题"
+        assert cache.stats()["memory_hits"] == 1
+        cache.close()
+
+
+    async def test_put_stores_a_copy(self):
+        """测试写入后改结果不影响缓存 / Test mutating a result after put leaves the cache alone"""
+        cache = ResultCache()
+        result = {"success": True, "markdown": "x"}
+        await cache.put("k", result)
+        result["retries"] = 1
+        assert "retries" not in await cache.get("k")
+
+    def test_only_ok_pages_are_cacheable(self):
+        """测试只缓存2xx/3xx且没有可重试错误的结果 / Test only clean 2xx/3xx results are cacheable"""
+        from core.crawler import is_cacheable
+
+        assert is_cacheable({"success": True, "status_code": 200}) is True
+        assert is_cacheable({"success": True, "status_code": 304}) is True
+        assert is_cacheable({"success": True, "status_code": 404}) is False
+        assert is_cacheable({"success": True, "status_code": 503}) is False
+        assert is_cacheable({"success": True, "status_code": None}) is False
+        assert is_cacheable({"success": False, "status_code": 200, "error": "x"}) is False
+
+@pytest.mark.unit
+class TestSingleFlight:
+    """并发请求合并测试 / Single-flight coalescing tests"""
+
+    async def test_concurrent_calls_share_one_fetch(self):
+        """测试并发相同请求只抓一次 / Test concurrent identical calls fetch once"""
+        import asyncio
+
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"success": True, "markdown": "x"}
+
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+        assert calls == 1
+        assert all(r["markdown"] == "x" for r in results)
+        assert flight.stats()["coalesced"] == 4
+        assert flight.stats()["in_flight"] == 0
+
+        await flight.do("k", fetch)
+        assert calls == 2
+
+    async def test_one_cancelled_caller_does_not_cancel_others(self):
+        """测试取消一个调用方不影响其他人 / Test cancelling one caller spares the rest"""
+        import asyncio
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return {"success": True}
+
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert (await second)["success"] is True
+
+
+@pytest.mark.unit
+class TestAdaptiveLimiter:
+    """AIMD自适应限流测试 / AIMD adaptive limiter tests"""
+
+    def test_classify_result(self):
+        """测试结果归类 / Test result classification"""
+        assert classify_result({"success": True}) == "ok"
+        assert classify_result({"success": True, "status_code": 429}) == "overload"
+        assert classify_result({"success": False, "error": "Timeout 30000ms exceeded"}) == "overload"
+        assert classify_result({"success": False, "error": "404"}) == "error"
+        assert classify_result({"success": True}, memory_pressure=True) == "overload"
+
+    async def test_increase_then_back_off(self):
+        """测试健康时加窗、过载时减半 / Test additive increase and multiplicative decrease"""
+        limiter = AdaptiveLimiter(initial_limit=2, host_initial_limit=2, cooldown=0)
+        for _ in range(10):
+            async with limiter.slot("https://a.com/x"):
+                pass
+        grown = limiter.stats()["global_limit"]
+        assert grown > 2
+
+        async with limiter.slot("https://a.com/x") as permit:
+            permit.outcome = "overload"
+        assert limiter.stats()["global_limit"] == pytest.approx(grown * 0.5, abs=0.01)
+
+    async def test_slow_host_only_shrinks_its_own_window(self):
+        """测试延迟变慢只减域名窗口 / Test latency overload shrinks only the host window"""
+        limiter = AdaptiveLimiter(initial_limit=4, host_initial_limit=4, cooldown=0)
+        window = limiter._host_window("a.com")
+        limiter._feedback(window, "ok", 0.1, "http")
+        limiter._feedback(window, "ok", 0.1, "http")
+        global_limit, host_limit = limiter._global.limit, window.limit
+
+        # 浏览器慢一个数量级是正常的，有自己的基线，不算过载
+        limiter._feedback(window, "ok", 2.0, "browser")
+        assert window.limit > host_limit
+
+        host_limit = window.limit
+        limiter._feedback(window, "ok", 1.0, "http")
+        assert window.limit == pytest.approx(host_limit * 0.5)
+        assert limiter._global.limit >= global_limit
+        assert limiter.stats()["overload"] == 1
+
+    async def test_host_window_caps_concurrency(self):
+        """测试域名窗口限制并发 / Test the host window caps concurrency"""
+        import asyncio
+
+        limiter = AdaptiveLimiter(initial_limit=8, host_initial_limit=1, host_max_limit=1)
+        active = peak = 0
+
+        async def job():
+            nonlocal active, peak
+            async with limiter.slot("https://a.com/x"):
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.005)
+                active -= 1
+
+        await asyncio.gather(*(job() for _ in range(4)))
+        assert peak == 1
+
+
+@pytest.mark.unit
+class TestRetry:
+    """重试和熔断测试 / Retry and circuit breaker tests"""
+
+    def test_classify_error(self):
+        """测试错误归类 / Test error classification"""
+        assert classify_error({"success": True, "status_code": 200}) is None
+        assert classify_error({"success": True, "status_code": 502}) == "server"
+        assert classify_error({"success": False, "error": "Timeout 30000ms exceeded"}) == "timeout"
+        assert classify_error({"success": False, "error": "net::ERR_NAME_NOT_RESOLVED"}) == "navigation"
+        assert classify_error({"success": False, "error": "HTTP 404", "status_code": 404}) is None
+
+    def test_policy_overrides_and_backoff(self):
+        """测试重试次数覆盖和退避上限 / Test retry overrides and backoff cap"""
+        policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+        assert policy.should_retry("server", 2)
+        assert not policy.should_retry(None, 0)
+        assert not policy.with_overrides(0).should_retry("timeout", 0)
+        assert all(0 <= policy.backoff(10) <= 4.0 for _ in range(20))
+
+    def test_circuit_breaker_trips_and_recovers(self):
+        """测试熔断和探测恢复 / Test tripping and probe recovery"""
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=0)
+        breaker.record("https://dead.com/a", failed=True)
+        assert breaker.allow("https://dead.com/b")
+        breaker.record("https://dead.com/b", failed=True)
+        assert breaker.stats()["open_hosts"] == ["dead.com"]
+        assert breaker.allow("https://ok.com/")
+
+        # 冷却为0：放一个探测请求，成功就恢复
+        assert breaker.allow("https://dead.com/c")
+        breaker.record("https://dead.com/c", failed=False)
+        assert breaker.stats()["open_hosts"] == []
+        assert breaker.stats()["recovered"] == 1
+
+    def test_circuit_breaker_fast_fails_during_cooldown(self):
+        """测试冷却期内快速失败 / Test fast-fail during cooldown"""
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=60)
+        breaker.record("https://dead.com/a", failed=True)
+        assert not breaker.allow("https://dead.com/b")
+        assert breaker.stats()["fast_failed"] == 1
+
+
+@pytest.mark.unit
+class TestResourceBlocking:
+    """资源拦截测试 / Resource blocking tests"""
+
+    def test_resolve_profile(self):
+        """测试配置解析和匹配 / Test profile resolution and matching"""
+        assert resolve_profile(None) is None
+        assert resolve_profile("none") is None
+
+        text = resolve_profile("text")
+        assert text.blocks("image", "https://a.com/x.png")
+        assert text.blocks("script", "https://www.google-analytics.com/analytics.js")
+        assert not text.blocks("script", "https://a.com/app.js")
+
+        custom = resolve_profile({"profile": "lean", "url_patterns": ["*.cdn.com/ads/*"]})
+        assert custom.blocks("font", "https://a.com/x.woff2")
+        assert custom.blocks("image", "https://img.cdn.com/ads/banner.png")
+        assert not custom.blocks("image", "https://img.cdn.com/photo.png")
+
+        with pytest.raises(ValueError):
+            resolve_profile("nope")
+        with pytest.raises(ValueError):
+            resolve_profile({"resource_types": ["document"]})
+
+    async def test_route_handler_counts_blocked(self):
+        """测试路由按会话激活并计数 / Test the route handler is per session and counts"""
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock
+
+        blocker = RequestBlocker()
+        page = MagicMock()
+        page.route = AsyncMock()
+        await blocker._on_page_created(page, config=SimpleNamespace(session_id="s1"))
+        handle = page.route.call_args.args[1]
+
+        def make_route(resource_type):
+            return MagicMock(
+                request=SimpleNamespace(resource_type=resource_type, url="https://a.com/x"),
+                abort=AsyncMock(),
+                fallback=AsyncMock(),
+            )
+
+        # 没激活配置时全部放行
+        route = make_route("image")
+        await handle(route)
+        route.fallback.assert_awaited_once()
+
+        with blocker.activate("s1", resolve_profile("text")) as stats:
+            image, script = make_route("image"), make_route("script")
+            await handle(image)
+            await handle(script)
+        image.abort.assert_awaited_once()
+        script.fallback.assert_awaited_once()
+        assert stats.as_dict()["blocked"] == 1
+        assert blocker.stats()["bytes_saved_estimate"] > 0
+
+
+@pytest.mark.unit
+class TestDomainBlocklist:
+    """域名黑名单测试 / Domain blocklist tests"""
+
+    def test_load_easylist_and_hosts(self, tmp_path):
+        """测试两种格式的加载和后缀匹配 / Test loading both formats and suffix matching"""
+        path = tmp_path / "list.txt"
+        path.write_text(
+            "! EasyList comment\n"
+            "||tracker.com^\n"
+            "||ads.example.org^$third-party\n"
+            "||example.net/banner/*\n"
+            "@@||ok.tracker.com^\n"
+            "# hosts comment\n"
+            "0.0.0.0 metrics.site.io\n"
+            "127.0.0.1 localhost\n"
+            "plain-host.cn\n",
+            encoding="utf-8",
+        )
+        blocklist = DomainBlocklist()
+        assert blocklist.load(path) == 4
+
+        assert blocklist.match_url("https://tracker.com/t.js")
+        assert blocklist.match_url("https://cdn.tracker.com/t.js")
+        assert not blocklist.match_url("https://ok.tracker.com/t.js")
+        assert not blocklist.match_url("https://nottracker.com/")
+        assert blocklist.match_url("https://ads.example.org/x")
+        assert not blocklist.match_url("https://example.org/x")
+        assert not blocklist.match_url("https://example.net/banner/1.png")
+        assert blocklist.match_url("http://metrics.site.io:8080/p")
+        assert blocklist.match_url("https://PLAIN-HOST.cn/")
+        assert not blocklist.match_url("http://localhost/")
+
+    def test_parent_rule_replaces_subdomain_rules(self):
+        """测试父域名规则合并子域名规则时计数正确 / Test size stays right when a parent rule subsumes children"""
+        blocklist = DomainBlocklist(["a.ads.com", "b.ads.com", "x.y.ads.com", "other.com"])
+        assert len(blocklist) == 4
+        blocklist.add("ads.com")
+        assert len(blocklist) == 2
+        blocklist.add("cdn.ads.com")
+        assert len(blocklist) == 2
+        assert blocklist.match_host("x.y.ads.com")
+
+    def test_profile_uses_blocklist(self):
+        """测试拦截配置查黑名单、放过主页面 / Test profiles consult the blocklist"""
+        blocklist = DomainBlocklist(["tracker.com"])
+        profile = resolve_profile("trackers")
+        assert profile.blocks("script", "https://x.tracker.com/a.js", blocklist)
+        assert not profile.blocks("script", "https://site.com/a.js", blocklist)
+        assert not resolve_profile({"profile": "trackers", "blocklist": False}).blocks(
+            "script", "https://x.tracker.com/a.js", blocklist
+        )
+
+
+@pytest.mark.unit
+class TestScrollLoader:
+    """滚动加载测试 / Scroll loader tests"""
+
+    def test_plan_from_config(self):
+        """测试滚动计划解析 / Test scroll plan parsing"""
+        assert ScrollPlan.from_config(None) is None
+        assert ScrollPlan.from_config({"max_scrolls": 0}) is None
+        assert ScrollPlan.from_config(True).max_scrolls == 10
+
+        schema = TemplateConfigSchema(
+            name="test",
+            fields=[ExtractField(name="items", selector=".item", multiple=True, limit=30)],
+            advanced=AdvancedConfig(scroll_to_load=True, max_scrolls=5),
+        )
+        plan = ScrollPlan.from_config(schema.to_crawl_config()["scroll"])
+        assert (plan.max_scrolls, plan.target, plan.quota) == (5, ".item", 30)
+
+    @staticmethod
+    def make_page(counts, grows):
+        """假页面：每次测量依次返回counts里的数量，每次等待按grows决定是否超时"""
+        from unittest.mock import AsyncMock
+
+        measures = iter(counts)
+        waits = iter(grows)
+
+        async def evaluate(script, arg=None):
+            return [1000, next(measures)] if "querySelectorAll" in script else None
+
+        async def wait_for_function(script, arg=None, timeout=None):
+            if not next(waits):
+                raise TimeoutError("Timeout exceeded")
+
+        page = MagicMock()
+        page.evaluate = AsyncMock(side_effect=evaluate)
+        page.wait_for_function = AsyncMock(side_effect=wait_for_function)
+        return page
+
+    async def test_stops_when_quota_met(self):
+        """测试数量够了提前停 / Test early stop once the quota is met"""
+        page = self.make_page([10, 20, 30], [True, True])
+        report = ScrollReport()
+        await run_scroll(page, ScrollPlan(max_scrolls=10, target=".item", quota=25), report)
+        assert report.stopped == "quota"
+        assert report.as_dict()["scrolls"] == 2
+        assert report.items == 30
+
+    async def test_stops_when_no_growth(self):
+        """测试不再增长就停 / Test early stop once content stops growing"""
+        page = self.make_page([10, 20, 20], [True, False])
+        report = ScrollReport()
+        await run_scroll(page, ScrollPlan(max_scrolls=10, target=".item"), report)
+        assert report.stopped == "no_growth"
+        assert [step["items"] for step in report.steps] == [20, 20]
+
+
+@pytest.mark.unit
+class TestResultProjection:
+    """结果字段投影测试 / Result field projection tests"""
+
+    def test_resolve_include(self):
+        """测试include规范化 / Test include normalization"""
+        from core.crawler import resolve_include
+
+        assert resolve_include(None) is None
+        assert resolve_include({"metadata", "markdown"}) == ["markdown", "metadata"]
+        assert resolve_include("links") == ["links"]
+        with pytest.raises(ValueError):
+            resolve_include(["cookies"])
+
+    def test_format_result_projection(self):
+        """测试只组装要的字段 / Test only requested fields are built"""
+        from types import SimpleNamespace
+        from core.crawler import Crawl4AIWrapper
+
+        wrapper = Crawl4AIWrapper(crawler=MagicMock(), page_pool=MagicMock())
+        result = SimpleNamespace(
+            success=True,
+            status_code=200,
+            markdown=SimpleNamespace(raw_markdown="# hi", fit_markdown=""),
+            extracted_content=None,
+            links={"internal": [], "external": []},
+            media={"images": [{"src": "a.png"}]},
+            metadata={"title": "t"},
+            screenshot="iVBORw0KGgo=",
+        )
+
+        lean = wrapper._format_result(result, ["markdown", "metadata"])
+        assert set(lean) == {"success", "status_code", "markdown", "metadata"}
+        assert lean["markdown"] == "# hi"
+
+        full = wrapper._format_result(result)
+        assert "media" in full and "screenshot" in full
+        assert "html" not in full
+
+
+@pytest.mark.unit
+class TestTimeouts:
+    """超时测试 / Timeout tests"""
+
+    async def test_fetch_timeout(self):
+        """测试单次抓取超时转成失败结果 / Test a hanging fetch becomes a timed out failure"""
+        import asyncio
+        from core.crawler import Crawl4AIWrapper
+
+        class HangingCrawler(Crawl4AIWrapper):
+            async def _fetch_by_mode(self, url, config, revalidate_key, permit=None):
+                await asyncio.sleep(10)
+
+        crawler = HangingCrawler(crawler=MagicMock(), page_pool=MagicMock())
+        result = await crawler._fetch("https://a.com", {"timeout": 0.05}, None)
+        assert result["timed_out"] and not result["success"]
+
+    def test_page_timeout_fires_before_hard_timeout(self):
+        """测试crawl4ai的导航超时比外层硬超时早 / Test the inner page timeout has a margin"""
+        from core.crawler import Crawl4AIWrapper
+
+        crawler = Crawl4AIWrapper(crawler=MagicMock(), page_pool=MagicMock(), page_timeout=60)
+        assert crawler._build_run_config({}).page_timeout == 55000
+        assert crawler._build_run_config({"timeout": 2}).page_timeout == 1600
+
+    async def test_batch_deadline_returns_partial_results(self, fake_crawler):
+        """测试批量截止时间返回部分结果 / Test the batch deadline returns partial results"""
+        import asyncio
+
+        urls = ["https://a.com/fast", "https://a.com/slow", "https://a.com/late"]
+        delays = dict(zip(urls, [0.01, 10, 0.01]))
+        crawler = fake_crawler(lambda url, config: asyncio.sleep(delays[url], {"success": True}))
+
+        results = await crawler.crawl_batch(urls, max_concurrent=2, deadline=0.2)
+        assert results[0]["success"]
+        assert results[1]["timed_out"] and "已取消" in results[1]["error"]
+        assert results[2]["success"]
+
+        results = await crawler.crawl_batch(urls, max_concurrent=1, deadline=0.2)
+        assert results[1]["timed_out"]
+        assert results[2]["timed_out"] and "未开始" in results[2]["error"]
+
+    async def test_cancelled_lease_abandons_page(self):
+        """测试被取消的爬取不把标签页放回池子 / Test a cancelled crawl does not return its tab"""
+        import asyncio
+        from core.page_pool import PagePool
+
+        pool = PagePool(MagicMock(), max_pages=1)
+
+        async def hang():
+            async with pool.lease():
+                await asyncio.sleep(10)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(hang(), 0.05)
+        stats = pool.stats()
+        assert stats["abandoned"] == 1 and stats["idle"] == 0
+
+
+@pytest.mark.unit
+class TestExtractor:
+    """字段提取测试 / Field extraction tests"""
+
+    HTML = """<html><body>
+        <h1 class="title"> Hello
+            World </h1>
+        <span class="price">¥1,299.50</span>
+        <ul><li class="item"><a href="/a">A</a></li><li class="item"><a href="/b">B</a></li>
+            <li class="item"><a href="https://x.com/c">C</a></li></ul>
+        <img class="cover" data-src="/img/1.png">
+        <meta name="author" content="Bob">
+    </body></html>"""
+
+    def test_extract_all_types(self):
+        """测试各类型字段一次提取 / Test every field type in one pass"""
+        plan = compile_plan([
+            ExtractField(name="title", selector="h1.title", required=True),
+            ExtractField(name="price", selector=".price", type="number"),
+            ExtractField(name="links", selector=".item a", type="link", multiple=True, limit=2),
+            ExtractField(name="cover", selector="img.cover", type="image"),
+            ExtractField(
+                name="author", selector="meta[name=author]", type="attribute", attribute="content"
+            ),
+            ExtractField(name="missing", selector=".nope", required=True),
+        ])
+        data = plan.extract(self.HTML, base_url="https://site.com/p/1")
+        assert data["title"] == "Hello World"
+        assert data["price"] == 1299.5
+        assert data["links"] == ["https://site.com/a", "https://site.com/b"]
+        assert data["cover"] == "https://site.com/img/1.png"
+        assert data["author"] == "Bob"
+        assert data["missing"] is None
+        assert plan.missing_required(data) == ["missing"]
+
+    def test_single_pass_matches_xpath(self):
+        """测试共享遍历和XPath结果一致 / Test the shared walk agrees with XPath"""
+        from core.extractor import parse_html
+
+        plan = compile_plan([
+            ExtractField(name="items", selector="ul > li.item a, h1", multiple=True),
+            ExtractField(name="first", selector="li:first-child a", type="link"),
+            ExtractField(name="meta", selector="[name^=auth]", type="attribute", attribute="content"),
+        ])
+        assert plan.fields[0].chains is not None and plan.fields[1].chains is None
+        tree = parse_html(self.HTML)
+        data = plan.extract(self.HTML, base_url="https://site.com/")
+        assert data == {f.name: f.evaluate(tree, "https://site.com/") for f in plan.fields}
+        assert data["items"] == ["Hello World", "A", "B", "C"]
+        assert data["first"] == "https://site.com/a"
+
+    def test_plan_is_compiled_once(self):
+        """测试相同字段定义共享同一个计划 / Test equal field definitions share a plan"""
+        fields = [ExtractField(name="title", selector="h1")]
+        assert compile_plan(fields) is compile_plan([ExtractField(name="title", selector="h1")])
+        assert compile_plan([]) is None
+        assert compile_plan(fields).extract("") == {"title": None}
+
+    def test_invalid_selector_rejected(self):
+        """测试无效选择器在建模板时就报错 / Test invalid selectors fail at schema time"""
+        with pytest.raises(ValidationError):
+            ExtractField(name="bad", selector="div[")
+        assert parse_number("共 12,345 条") == 12345
+        assert parse_number("n/a") is None
+
+
+@pytest.mark.unit
+class TestExtractionPool:
+    """提取进程池测试 / Extraction process pool tests"""
+
+    def test_plan_pickles_to_cached_plan(self):
+        """测试计划pickle后只带字段定义 / Test plans pickle as their field definitions"""
+        import pickle
+
+        plan = compile_plan([ExtractField(name="title", selector="h1")])
+        assert pickle.loads(pickle.dumps(plan)) is plan
+
+    async def test_extract_many_in_worker_processes(self):
+        """测试批量提取在子进程里跑且保持顺序 / Test batch extraction runs in workers, in order"""
+        from core.extract_pool import ExtractionPool
+
+        plan = compile_plan([ExtractField(name="title", selector="h1")])
+        pool = ExtractionPool(max_workers=1, batch_size=2, inline_below=0)
+        try:
+            pages = [(f"<h1>页面{i}</h1>", f"https://a.com/{i}") for i in range(5)]
+            results = await pool.extract_many(plan, pages)
+            assert [r["title"] for r in results] == [f"页面{i}" for i in range(5)]
+            assert pool.stats()["jobs"] == 3 and pool.stats()["inline"] == 0
+        finally:
+            pool.close()
+
+    async def test_batch_with_template(self, fake_crawler):
+        """测试按模板批量爬取并提取 / Test batch crawling with a template"""
+        from core.extract_pool import ExtractionPool
+        from core.template_engine import crawl_batch_with_template
+
+        def handler(url, config):
+            if url.endswith("/bad"):
+                return {"success": False, "error": "boom"}
+            assert "html" in config["include"]
+            return {"success": True, "html": f"<h1>{url}</h1>", "markdown": ""}
+
+        crawler = fake_crawler(handler, extract_pool=ExtractionPool(max_workers=1, batch_size=2))
+        schema = TemplateConfigSchema(
+            name="test", fields=[ExtractField(name="title", selector="h1", required=True)]
+        )
+        urls = ["https://a.com/1", "https://a.com/bad", "https://a.com/2", "https://a.com/3"]
+        results = await crawl_batch_with_template(urls, schema, crawler)
+        assert [r.get("extracted_data", {}).get("title") for r in results] == [
+            urls[0], None, urls[2], urls[3]
+        ]
+        assert "html" not in results[0] and results[0]["missing_fields"] == []
+        assert not results[1]["success"]
+
+
+@pytest.mark.unit
+class TestSelectorTypes:
+    """XPath和正则字段测试 / XPath and regex field tests"""
+
+    HTML = """<html><body>
+        <h1>Hello</h1>
+        <ul><li><a href="/a">A</a></li><li><a href="/b">B</a></li></ul>
+        <p>价格：¥1,299.50</p>
+    </body></html>"""
+
+    def test_xpath_fields(self):
+        """测试XPath字段（文本、属性、函数结果都是普通字符串） / Test XPath fields"""
+        plan = compile_plan([
+            ExtractField(name="title", selector="//h1/text()", selector_type="xpath"),
+            ExtractField(name="count", selector="count(//li)", selector_type="xpath", type="number"),
+            ExtractField(
+                name="links", selector="//li/a/@href", selector_type="xpath",
+                type="link", multiple=True,
+            ),
+        ])
+        data = plan.extract(self.HTML, base_url="https://site.com/")
+        assert data == {
+            "title": "Hello", "count": 2.0,
+            "links": ["https://site.com/a", "https://site.com/b"],
+        }
+        assert type(data["title"]) is str
+
+    def test_regex_fields(self):
+        """测试正则字段在markdown上匹配，没有markdown用文档文本 / Test regex over markdown or text"""
+        plan = compile_plan([
+            ExtractField(name="price", selector=r"价格[:：]\s*¥?([\d,.]+)", selector_type="regex", type="number"),
+            ExtractField(name="lines", selector=r"^- (.+)$", selector_type="regex", multiple=True, limit=2),
+        ])
+        assert plan.needs_markdown
+        markdown = "价格: 88\n- one\n- two\n- three"
+        assert plan.extract(self.HTML, markdown=markdown) == {"price": 88.0, "lines": ["one", "two"]}
+        assert plan.extract(self.HTML)["price"] == 1299.5
+        assert plan.extract("", markdown=markdown)["price"] == 88.0
+
+    def test_validation_and_cache(self):
+        """测试表达式编译失败不让保存、编译结果共享 / Test validation and the shared cache"""
+        from core.extractor import compile_expression
+
+        for kwargs in (
+            {"selector": "//h1[", "selector_type": "xpath"},
+            {"selector": "(", "selector_type": "regex"},
+            {"selector": "a", "selector_type": "jsonpath"},
+            {"selector": "id=(\\d+)", "selector_type": "regex", "type": "attribute", "attribute": "x"},
+        ):
+            with pytest.raises(ValidationError):
+                ExtractField(name="bad", **kwargs)
+
+        assert compile_expression("//h1", "xpath") is compile_expression("//h1", "xpath")
+        schema = TemplateConfigSchema(name="test", fields=[
+            ExtractField(name="a", selector="//h1", selector_type="xpath", required=True),
+            ExtractField(name="b", selector="h2", required=True),
+        ])
+        assert schema.required_selectors() == ["h2"]
+
+    async def test_regex_in_worker_process(self):
+        """测试markdown随任务送进子进程 / Test markdown is shipped to worker processes"""
+        from core.extract_pool import ExtractionPool
+
+        plan = compile_plan([
+            ExtractField(name="title", selector="h1"),
+            ExtractField(name="code", selector=r"code=(\w+)", selector_type="regex"),
+        ])
+        pool = ExtractionPool(max_workers=1, inline_below=0)
+        try:
+            results = await pool.extract_many(plan, [
+                ("<h1>A</h1>", None, "code=x1"),
+                ("<h1>B</h1>", None),
+            ])
+            assert results == [{"title": "A", "code": "x1"}, {"title": "B", "code": None}]
+        finally:
+            pool.close()
+
+
+@pytest.mark.unit
+class TestNormalizer:
+    """字段归一化测试 / Field normalization tests"""
+
+    def test_numbers_and_locales(self):
+        """测试货币符号、千分位、地区小数点、万 / Test symbols, separators, locales"""
+        from core.normalizer import ColumnNormalizer
+
+        normalizer = ColumnNormalizer()
+        assert normalizer.numbers(
+            ["¥1,299.50", "$ 12", "-3.5元", "暂无报价", "1.2万", None, 7, ""], "a.com"
+        ) == [1299.5, 12.0, -3.5, None, 12000.0, None, 7.0, None]
+        assert normalizer.numbers(["1.299,50 €", "12,5", "1 234,5"], "de.com") == [1299.5, 12.5, 1234.5]
+        # 分不清的"2.000"按域名记住的写法算
+        assert normalizer.numbers(["2.000"], "https://de.com/p/1") == [2000.0]
+        assert normalizer.numbers(["2.000"], "a.com") == [2.0]
+        assert normalizer.stats()["format_hits"] == 2
+
+    def test_leading_decimal_minus_signs_and_ambiguous_groups(self):
+        """测试".5"、排版负号、分不清的空格分组 / Test leading decimals, typographic minus, ambiguous groups"""
+        from core.normalizer import ColumnNormalizer
+
+        normalizer = ColumnNormalizer()
+        # 省略整数部分的小数
+        assert normalizer.numbers([".5", "-.25", "rating .8/1"], "a.com") == [0.5, -0.25, 0.8]
+        # U+2212负号和U+2013短横线当负号
+        assert normalizer.numbers(["\u22123.5", "\u20134", "1.5"], "a.com") == [-3.5, -4.0, 1.5]
+        assert normalizer.numbers(["\u22122,5", "1.299,00"], "de.com") == [-2.5, 1299.0]
+        # "."小数点的列里"1 234,5"分不清是千分位还是两个数，返回None而不是1.0
+        assert normalizer.numbers(["1 234,5 €", "9.99 €", "Rs. 100"], "a.com") == [None, 9.99, 100.0]
+
+    def test_column_evidence_overrides_cached_decimal(self):
+        """测试列里有明确证据时不被记住的小数点写法带偏 / Test contrary evidence re-votes"""
+        from core.normalizer import ColumnNormalizer
+
+        normalizer = ColumnNormalizer()
+        assert normalizer.prices(["1.299,00 €", "12,50 €"], "de.com") == ([1299.0, 12.5], "EUR")
+        assert normalizer.numbers(["4.5 out of 5", "3.9"], "de.com") == [4.5, 3.9]
+        # 分不清的列用最近一次明确的写法
+        assert normalizer.numbers(["2.000"], "de.com") == [2.0]
+        # 按字段分开记：price字段还是逗号小数点
+        assert normalizer.prices(["1.299,00 €"], "de.com", "price") == ([1299.0], "EUR")
+        assert normalizer.numbers(["4.5"], "de.com", "rating") == [4.5]
+        assert normalizer.prices(["2.000 €"], "de.com", "price") == ([2000.0], "EUR")
+
+    def test_prices_and_dates(self):
+        """测试价格货币和各种日期格式 / Test price currencies and date formats"""
+        from datetime import datetime
+
+        from core.normalizer import ColumnNormalizer
+
+        normalizer = ColumnNormalizer()
+        assert normalizer.prices(["€ 9,99", "€ 1.009,00"], "shop.fr") == ([9.99, 1009.0], "EUR")
+        now = datetime(2024, 5, 1, 12, 0)
+        assert normalizer.dates([
+            "2024-01-15", "2024/1/5 08:30", "发布于 2024年3月2日", "Jan 15, 2024",
+            "15 March 2024", "3小时前", "2 days ago", "昨天", "n/a", None,
+        ], "news.com", now=now) == [
+            "2024-01-15", "2024-01-05T08:30:00", "2024-03-02", "2024-01-15", "2024-03-15",
+            "2024-05-01T09:00:00", "2024-04-29", "2024-04-30", None, None,
+        ]
+        # 有一个日大于12就能确定日在前
+        assert normalizer.dates(["25/12/2024", "03/04/2024"], "eu.com") == ["2024-12-25", "2024-04-03"]
+
+    def test_normalize_records(self):
+        """测试按字段整列归一化一批记录 / Test column-wise normalization of records"""
+        from core.normalizer import ColumnNormalizer, normalize_records
+
+        records = [
+            {"price": "$1,000.5", "sizes": ["1", "2.5"]},
+            {"price": "$3", "sizes": []},
+            {"price": None},
+        ]
+        normalize_records(
+            records, {"price": "price", "sizes": "number"},
+            ["https://a.com/1", "https://a.com/2", "https://b.com/1"], ColumnNormalizer(),
+        )
+        assert records[0] == {"price": 1000.5, "sizes": [1.0, 2.5], "price_currency": "USD"}
+        assert records[1]["price"] == 3.0 and records[2] == {"price": None}
+
+        with pytest.raises(ValidationError):
+            ExtractField(name="x", selector="p", normalize="currency")
+
+    async def test_template_normalizes_fields(self, fake_crawler):
+        """测试模板提取后按normalize归一化 / Test templates normalize extracted fields"""
+        from core.template_engine import crawl_with_template
+
+        html = "<b class='p'>￥2,499.00</b><time>2024年6月1日</time>"
+        crawler = fake_crawler(lambda url, config: {"success": True, "html": html})
+        schema = TemplateConfigSchema(name="test", fields=[
+            ExtractField(name="price", selector=".p", normalize="price"),
+            ExtractField(name="date", selector="time", normalize="date"),
+        ])
+        result = await crawl_with_template("https://shop.cn/item/1", schema, crawler)
+        assert result["extracted_data"] == {
+            "price": 2499.0, "price_currency": "CNY", "date": "2024-06-01",
+        }
+
+
+@pytest.mark.unit
+class TestTableParser:
+    """表格解析测试 / Table parser tests"""
+
+    HTML = """<table><caption>销售额</caption>
+        <thead><tr><th rowspan="2">地区</th><th colspan="2">2024</th></tr>
+            <tr><th>Q1</th><th>Q2</th></tr></thead>
+        <tbody><tr><td rowspan="2">华北</td><td>1,200</td><td>$3.5</td></tr>
+            <tr><td>900</td><td>-</td></tr>
+            <tr><td>华南</td><td colspan="2">n/a</td></tr></tbody>
+    </table>"""
+
+    def test_merged_cells_and_types(self):
+        """测试合并单元格展开、多行表头、列类型 / Test spans, multi-row headers, column types"""
+        from core.table_parser import parse_tables
+
+        (table,) = parse_tables(self.HTML, base_url="https://stats.com/")
+        assert table.caption == "销售额"
+        assert table.headers == ["地区", "2024 / Q1", "2024 / Q2"]
+        assert table.types == ["text", "integer", "number"]
+        assert table.columns == [["华北", "华北", "华南"], [1200, 900, None], [3.5, None, None]]
+        assert list(table.rows())[0] == ("华北", 1200, 3.5)
+
+    def test_empty_row_consumes_rowspan(self):
+        """测试空<tr>也消耗跨行单元格 / Test an empty <tr> still advances the rowspan grid"""
+        from core.table_parser import iter_rows
+
+        html = """<table><tr><th>组</th><th>值</th></tr>
+            <tr><td rowspan="3">A</td><td>1</td></tr>
+            <tr></tr>
+            <tr><td>3</td></tr>
+            <tr><td>B</td><td>4</td></tr></table>"""
+        rows = [row for _, row, _ in iter_rows(html) if row is not None]
+        assert rows == [["组", "值"], ["A", "1"], ["A"], ["A", "3"], ["B", "4"]]
+
+    def test_header_inference_and_nesting(self):
+        """测试没有th时推断表头、嵌套表格各算各的 / Test header inference and nested tables"""
+        from core.table_parser import parse_tables
+
+        html = """<table><tr><td>名称</td><td>日期</td></tr>
+            <tr><td>A<table><tr><td>x</td></tr></table></td><td>2024/1/5</td></tr>
+            <tr><td>B</td><td>2024-02-01</td></tr></table>"""
+        outer, inner = parse_tables(html)
+        assert outer.headers == ["名称", "日期"] and outer.types == ["text", "date"]
+        assert outer.columns[1] == ["2024-01-05", "2024-02-01"]
+        assert inner.headers == ["col_1"] and inner.row_count == 1
+
+    def test_stream_to_csv(self):
+        """测试分块流式写CSV / Test streaming chunks straight to CSV"""
+        import io
+
+        from core.table_parser import write_csv
+
+        rows = "".join(f"<tr><td>{i}</td><td>item {i}</td></tr>" for i in range(2000))
+        html = f"<table><tr><th>id</th><th>name</th></tr>{rows}</table>".encode()
+        chunks = (html[i:i + 1000] for i in range(0, len(html), 1000))
+        out = io.StringIO()
+        assert write_csv(chunks, out) == 2001
+        lines = out.getvalue().splitlines()
+        assert lines[0] == "id,name" and lines[-1] == "1999,item 1999"
+
+        out = io.StringIO()
+        assert write_csv(self.HTML, out) == 5
+        assert out.getvalue().splitlines()[2] == '华北,"1,200",$3.5'
+
+    def test_arrow_export(self):
+        """测试Arrow导出（没装pyarrow时报ImportError） / Test Arrow export"""
+        from core.table_parser import ARROW_AVAILABLE, parse_tables
+
+        (table,) = parse_tables(self.HTML)
+        if not ARROW_AVAILABLE:
+            with pytest.raises(ImportError):
+                table.to_arrow()
+            return
+        arrow = table.to_arrow()
+        assert arrow.column_names == table.headers and arrow.num_rows == 3
+
+
+@pytest.mark.unit
+class TestBatchStream:
+    """流式批量爬取测试 / Streaming batch crawl tests"""
+
+    @staticmethod
+    def make_crawler(fake_crawler, delays):
+        """按URL睡不同时间的假爬虫 / Fake crawler sleeping per URL"""
+        import asyncio
+
+        return fake_crawler(
+            lambda url, config: asyncio.sleep(delays[url], {"success": True, "url": url})
+        )
+
+    async def test_completion_order_and_window(self, fake_crawler):
+        """测试按完成顺序产出(下标, 结果)，惰性迭代器下在飞任务不超过上限 / Test order, tags, window"""
+        delays = {f"https://a.com/{i}": 0.01 * (6 - i) for i in range(6)}
+        crawler = self.make_crawler(fake_crawler, delays)
+        pulled = []
+
+        def lazy_urls():
+            for url in delays:
+                pulled.append(url)
+                yield url
+
+        stream = crawler.crawl_batch_stream(lazy_urls(), max_concurrent=2)
+        first_index, first = await stream.__anext__()
+        # 只从迭代器里取了窗口那么多个URL，没有一次性展开
+        assert len(pulled) == 2
+        results = [(first_index, first)] + [item async for item in stream]
+
+        assert crawler.peak == 2
+        assert sorted(index for index, _ in results) == list(range(6))
+        assert all(result["url"] == f"https://a.com/{index}" for index, result in results)
+        # 第1个比第0个快，先产出
+        assert [index for index, _ in results[:2]] == [1, 0]
+
+    async def test_early_aclose_cancels_pending(self, fake_crawler):
+        """测试调用方提前退出时取消还在飞的任务 / Test early aclose cancels in-flight tasks"""
+        delays = {"https://a.com/fast": 0.0, "https://a.com/slow1": 5, "https://a.com/slow2": 5}
+        crawler = self.make_crawler(fake_crawler, delays)
+
+        stream = crawler.crawl_batch_stream(list(delays), max_concurrent=3)
+        index, result = await stream.__anext__()
+        await stream.aclose()
+
+        assert (index, result["url"]) == (0, "https://a.com/fast")
+        assert sorted(crawler.cancelled) == ["https://a.com/slow1", "https://a.com/slow2"]
+        assert crawler.active == 0
+
+
+@pytest.mark.unit
+class TestPagePool:
+    """标签页池测试 / Page pool tests"""
+
+    @staticmethod
+    def make_pool(memory_mb=1.0, **kwargs):
+        """假crawler_strategy：借出时登记会话，kill_session时删掉 / Fake crawler strategy"""
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock
+
+        from core.page_pool import PagePool
+
+        sessions = {}
+        manager = SimpleNamespace(sessions=sessions)
+
+        async def kill_session(session_id):
+            sessions.pop(session_id, None)
+
+        strategy = SimpleNamespace(
+            browser_manager=manager,
+            kill_session=AsyncMock(side_effect=kill_session),
+        )
+        pool = PagePool(SimpleNamespace(crawler_strategy=strategy), **kwargs)
+
+        def open_tab(session_id, context=None):
+            """模拟crawl4ai第一次用这个session_id时建标签页 / Simulate crawl4ai creating the tab"""
+            if session_id not in sessions:
+                page = MagicMock()
+                page.evaluate = AsyncMock(return_value=memory_mb * 1024 * 1024)
+                page.goto = AsyncMock()
+                context = context or MagicMock(clear_cookies=AsyncMock())
+                sessions[session_id] = (context, page, 0.0)
+            return sessions[session_id]
+
+        return pool, strategy, open_tab
+
+    async def test_reuse_resets_tab(self):
+        """测试复用前重置标签页 / Test a released tab is reset before reuse"""
+        pool, _, open_tab = self.make_pool()
+
+        async with pool.lease() as first:
+            context, page, _ = open_tab(first.session_id)
+        async with pool.lease() as second:
+            open_tab(second.session_id)
+
+        assert second.session_id == first.session_id
+        page.goto.assert_awaited_with("about:blank")
+        context.clear_cookies.assert_awaited()
+        assert any("localStorage.clear" in call.args[0] for call in page.evaluate.await_args_list)
+        stats = pool.stats()
+        assert (stats["created"], stats["reused"], stats["live"], stats["idle"]) == (1, 1, 1, 1)
+
+    async def test_shared_context_keeps_cookies(self):
+        """测试context被别的会话共用时不清cookie / Test shared contexts keep cookies"""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        pool, _, open_tab = self.make_pool(max_pages=2)
+        shared = MagicMock(clear_cookies=AsyncMock())
+        release = asyncio.Event()
+
+        async def hold():
+            async with pool.lease() as lease:
+                open_tab(lease.session_id, shared)
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        async with pool.lease() as lease:
+            open_tab(lease.session_id, shared)
+        release.set()
+        await holder
+
+        # 第一个归还时另一个标签页还在爬，不清；第二个归还时没人在用了才清
+        assert shared.clear_cookies.await_count == 1
+
+    async def test_navigation_and_memory_eviction(self):
+        """测试按导航次数和内存回收 / Test eviction by navigations and memory"""
+        pool, strategy, open_tab = self.make_pool(max_navigations=2)
+        for _ in range(3):
+            async with pool.lease() as lease:
+                open_tab(lease.session_id)
+        stats = pool.stats()
+        assert (stats["created"], stats["evicted"], stats["memory_evicted"]) == (2, 1, 0)
+        strategy.kill_session.assert_awaited_once()
+
+        pool, strategy, open_tab = self.make_pool(memory_mb=600, max_memory_mb=512)
+        async with pool.lease() as lease:
+            open_tab(lease.session_id)
+        stats = pool.stats()
+        assert (stats["evicted"], stats["memory_evicted"], stats["live"]) == (1, 1, 0)
+
+    async def test_crash_and_failed_reset_replace_tab(self):
+        """测试崩溃和重置失败的标签页被换掉 / Test crashed and unresettable tabs are replaced"""
+        pool, strategy, open_tab = self.make_pool()
+
+        with pytest.raises(RuntimeError):
+            async with pool.lease() as lease:
+                open_tab(lease.session_id)
+                raise RuntimeError("Target crashed")
+        crashed = lease.session_id
+
+        async with pool.lease() as lease:
+            _, page, _ = open_tab(lease.session_id)
+            page.goto.side_effect = RuntimeError("navigation failed")
+        assert lease.session_id != crashed
+
+        stats = pool.stats()
+        assert (stats["created"], stats["crashed"], stats["reset_failed"], stats["live"]) == (2, 1, 1, 0)
+        assert strategy.kill_session.await_count == 2
+
+
+@pytest.mark.unit
+class TestBrowserPool:
+    """浏览器池测试 / Browser pool tests"""
+
+    @staticmethod
+    def make_pool(monkeypatch, size=2, failing=()):
+        """假AsyncWebCrawler，只记录启动和关闭 / Fake AsyncWebCrawler recording start and close"""
+        from types import SimpleNamespace
+
+        import core.browser_pool as browser_pool
+
+        launched = []
+
+        class FakeWebCrawler:
+            def __init__(self, config=None):
+                self.number = len(launched)
+                self.entered = False
+                self.exited = False
+                self.crawler_strategy = SimpleNamespace()
+                launched.append(self)
+
+            async def __aenter__(self):
+                if self.number in failing:
+                    raise RuntimeError("launch failed")
+                self.entered = True
+                return self
+
+            async def __aexit__(self, *exc):
+                self.exited = True
+
+        monkeypatch.setattr(browser_pool, "AsyncWebCrawler", FakeWebCrawler)
+        monkeypatch.setattr(browser_pool, "CACHE_ENABLED", False)
+        monkeypatch.setattr(browser_pool, "EXTRACT_WORKERS", 0)
+        pool = browser_pool.BrowserPool(size=size, tabs_per_browser=3)
+        pool.launched = launched
+        return pool
+
+    async def test_failed_start_closes_launched_browsers(self, monkeypatch):
+        """测试有浏览器启动失败时关掉已经起来的 / Test a failed start closes the launched browsers"""
+        pool = self.make_pool(monkeypatch, size=3, failing={1})
+        with pytest.raises(RuntimeError, match="launch failed"):
+            await pool.start()
+
+        assert [(c.entered, c.exited) for c in pool.launched] == [
+            (True, True), (False, False), (True, True),
+        ]
+        assert pool.stats()["started"] is False and pool._crawlers == []
+
+    async def test_start_and_shared_acquire(self, monkeypatch):
+        """测试启动后借出不排队，借给负载最小的浏览器 / Test acquire never queues, picks least loaded"""
+        import asyncio
+
+        from core.blocklist import default_blocklist
+
+        pool = self.make_pool(monkeypatch)
+        with pytest.raises(RuntimeError):
+            async with pool.acquire():
+                pass
+
+        default_blocklist.cache_clear()
+        await pool.start()
+        # 黑名单在启动时就加载好了，请求拦截时不再读文件
+        assert default_blocklist.cache_info().currsize == 1
+        crawlers = list(pool._crawlers)
+        assert len(crawlers) == 2 and all(c.entered for c in crawlers)
+        assert all(pool._page_pools[id(c)].max_pages == 3 for c in crawlers)
+
+        release = asyncio.Event()
+        used = []
+
+        async def borrow():
+            async with pool.acquire() as wrapper:
+                used.append(wrapper._crawler)
+                await release.wait()
+
+        tasks = [asyncio.create_task(borrow()) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        # 5个请求只有2个浏览器，也全部立刻借到
+        assert len(used) == 5
+        stats = pool.stats()
+        assert (stats["in_use"], stats["idle"], sorted(stats["leases"])) == (5, 0, [2, 3])
+        assert {id(c) for c in used} == {id(c) for c in crawlers}
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert (pool.stats()["in_use"], pool.stats()["idle"]) == (0, 2)
+        await pool.close()
+
+    async def test_close_drains_then_closes(self, monkeypatch):
+        """测试关闭时先等借出的归还，超时也照样关 / Test close drains, then closes even on timeout"""
+        import asyncio
+
+        pool = self.make_pool(monkeypatch)
+        await pool.start()
+        crawlers = list(pool._crawlers)
+        release = asyncio.Event()
+
+        async def borrow():
+            async with pool.acquire():
+                await release.wait()
+
+        holder = asyncio.create_task(borrow())
+        await asyncio.sleep(0)
+        closing = asyncio.create_task(pool.close(drain_timeout=1))
+        await asyncio.sleep(0.01)
+        # 还有借出的，不关浏览器，也不再借出
+        assert not closing.done() and not any(c.exited for c in crawlers)
+        with pytest.raises(RuntimeError):
+            async with pool.acquire():
+                pass
+
+        release.set()
+        await asyncio.gather(holder, closing)
+        assert all(c.exited for c in crawlers)
+        assert pool.stats()["started"] is False
+
+        # 借出的一直不还：等到drain_timeout就强行关
+        await pool.start()
+        crawlers = list(pool._crawlers)
+        release.clear()
+        holder = asyncio.create_task(borrow())
+        await asyncio.sleep(0)
+        await pool.close(drain_timeout=0.01)
+        assert all(c.exited for c in crawlers)
+        release.set()
+        await holder
+
+
+@pytest.mark.unit
+class TestDeepCrawl:
+    """deep_crawl 测试 / deep_crawl tests"""
+
+    @staticmethod
+    async def five_links(url, config=None):
+        """每页都链出5个子页面 / Every page links to five children"""
+        import asyncio
+
+        await asyncio.sleep(0.01)
+        return {
+            "success": True,
+            "links": {"internal": [{"href": f"{url}/{i}"} for i in range(5)]},
+        }
+
+    async def test_max_pages_exact(self, fake_crawler):
+        """测试页面数严格不超过max_pages / Test max_pages is never exceeded"""
+        crawler = fake_crawler(self.five_links)
+        result = await crawler.deep_crawl(
+            "https://a.com", max_pages=23, max_depth=5, max_concurrent=4
+        )
+        assert result["total_pages"] == 23
+        assert crawler.peak <= 4
+
+    async def test_max_depth(self, fake_crawler):
+        """测试深度限制 / Test depth limit"""
+        crawler = fake_crawler(self.five_links)
+        result = await crawler.deep_crawl(
+            "https://a.com", max_pages=100, max_depth=1, max_concurrent=3
+        )
+        assert result["total_pages"] == 6
+        assert max(r["depth"] for r in result["results"]) == 1
+
+    async def test_fetches_original_urls(self, fake_crawler):
+        """测试爬原URL、只按规范化URL去重 / Test original URLs are fetched, canonical ones only dedupe"""
+        pages = {
+            "https://a.com/Docs/": [{"href": "intro"}, {"href": "/Docs/?utm_source=x"}],
+            "https://a.com/Docs/intro": [{"href": "../Docs/intro/#top"}],
+        }
+
+        def handler(url, config=None):
+            return {"success": True, "links": {"internal": pages.get(url, [])}}
+
+        crawler = fake_crawler(handler)
+        result = await crawler.deep_crawl("https://a.com/Docs/", max_pages=10)
+        assert crawler.calls == ["https://a.com/Docs/", "https://a.com/Docs/intro"]
+        assert [r["url"] for r in result["results"]] == crawler.calls
+
+    async def test_resume_from_checkpoint(self, tmp_path, fake_crawler):
+        """测试断点续爬不重爬已完成页面 / Test resume skips completed pages"""
+        checkpoint = tmp_path / "crawl.db"
+        fetched = []
+
+        class Crash(Exception):
+            pass
+
+        async def crawl_then_die(url, config=None):
+            if len(fetched) == 8:
+                raise Crash
+            fetched.append(url)
+            return await self.five_links(url, config)
+
+        crawler = fake_crawler(crawl_then_die)
+        with pytest.raises(Crash):
+            await crawler.deep_crawl(
+                "https://a.com", max_pages=20, max_depth=3,
+                max_concurrent=1, checkpoint_path=checkpoint,
+            )
+
+        before = list(fetched)
+        fetched.clear()
+        crawler.handler = lambda url, config=None: fetched.append(url) or self.five_links(url, config)
+        result = await crawler.resume_deep_crawl(checkpoint, max_concurrent=2)
+
+        assert result["total_pages"] == 20
+        assert not set(before) & set(fetched)
+
+    async def test_best_first_inlinks_survive_resume(self, tmp_path, fake_crawler):
+        """测试best_first的入链数跟着断点恢复 / Test best_first in-link counts survive a resume"""
+        from core.checkpoint import CrawlCheckpoint
+        from core.url_scoring import URLScorer
+
+        class Crash(Exception):
+            pass
+
+        class RecordingScorer(URLScorer):
+            def __init__(self):
+                super().__init__()
+                self.seen = []
+
+            def score(self, url, depth, text="", inbound=1):
+                self.seen.append((url.rsplit("/", 1)[-1], inbound))
+                return 0.1 if url.endswith("/q") else 1.0
+
+        pages = {
+            "https://a.com": ["/p", "/q", "/r"],
+            "https://a.com/p": ["/q"],
+            "https://a.com/r": ["/q"],
+        }
+
+        crash_on = {"https://a.com/r"}
+
+        def handler(url, config=None):
+            if url in crash_on:
+                raise Crash
+            return {"success": True, "links": {"internal": [{"href": h} for h in pages.get(url, [])]}}
+
+        checkpoint = tmp_path / "crawl.db"
+        crawler = fake_crawler(handler)
+        with pytest.raises(Crash):
+            await crawler.deep_crawl(
+                "https://a.com", strategy="best_first", max_pages=10, max_concurrent=1,
+                checkpoint_path=checkpoint, scorer=RecordingScorer(),
+            )
+
+        state = CrawlCheckpoint(checkpoint)
+        restored = state.load()
+        state.close()
+        assert restored.inlinks["https://a.com/q"] == (2, "")
+
+        crash_on.clear()
+        scorer = RecordingScorer()
+        result = await crawler.resume_deep_crawl(checkpoint, max_concurrent=1, scorer=scorer)
+        assert ("q", 3) in scorer.seen
+        assert result["total_pages"] == 4
+
+    async def test_checkpoint_not_reused_across_crawls(self, tmp_path, fake_crawler):
+        """测试完成的断点重新爬、别的爬取的断点报错 / Test finished or foreign checkpoints are not resumed"""
+        crawler = fake_crawler(self.five_links)
+        checkpoint = tmp_path / "crawl.db"
+        await crawler.deep_crawl("https://a.com", max_pages=3, checkpoint_path=checkpoint)
+
+        # 已完成的断点：清空重新爬，不返回a.com的结果
+        result = await crawler.deep_crawl("https://b.com", max_pages=3, checkpoint_path=checkpoint)
+        assert result["total_pages"] == 3
+        assert all(r["url"].startswith("https://b.com") for r in result["results"])
+
+        # 另一次未完成的爬取：报错，不动断点文件
+        async def crash(url, config=None):
+            if url != "https://c.com":
+                raise RuntimeError("boom")
+            return await self.five_links(url, config)
+
+        crawler.handler = crash
+        with pytest.raises(RuntimeError):
+            await crawler.deep_crawl("https://c.com", max_pages=5, checkpoint_path=checkpoint)
+        crawler.handler = self.five_links
+        with pytest.raises(ValueError):
+            await crawler.deep_crawl("https://a.com", max_pages=5, checkpoint_path=checkpoint)
+        with pytest.raises(ValueError):
+            await crawler.deep_crawl(
+                "https://c.com", strategy="dfs", max_pages=5, checkpoint_path=checkpoint
+            )
+        result = await crawler.deep_crawl("https://c.com", max_pages=5, checkpoint_path=checkpoint)
+        assert result["total_pages"] == 5
+
+
 @pytest.mark.integration
 class TestScenarioIntegration:
     """场景集成测试 / Scenario integration tests"""